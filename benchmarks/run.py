@@ -0,0 +1,326 @@
+"""
+End-to-end benchmark of RepoSage's own (non-LLM) work.
+
+Generates a synthetic repository, then times CLI startup and every
+stage on it: clone (cold and incremental), scan, classify_files,
+detect_languages, each detector, the parallel pre-pass (cold and
+cached), the context digests, the crew with a stubbed LLM and report
+generation.
+
+    PYTHONPATH=src python -m benchmarks.run --profile medium
+    PYTHONPATH=src python -m benchmarks.run --save-baseline
+    PYTHONPATH=src python -m benchmarks.run --compare benchmarks/baseline.json
+
+Each stage reports the best wall and CPU time over ``--repeat`` runs.
+Comparing against a baseline exits non-zero when any stage is slower
+than the baseline by more than ``--tolerance``.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from benchmarks.synthetic_repo import PROFILES, generate_repo  # noqa: E402
+
+from reposage.analysis.context_builder import build_task_context  # noqa: E402
+from reposage.analysis.findings_cache import FindingsCache  # noqa: E402
+from reposage.analysis.prepass import PERFORMANCE_DETECTORS, SECURITY_DETECTORS, run_prepass  # noqa: E402
+from reposage.tools.file_classifier import classify_files  # noqa: E402
+from reposage.tools.file_context import FileContext  # noqa: E402
+from reposage.tools.file_scanner import enumerate_files, scan_repo_path  # noqa: E402
+from reposage.tools.git_index import file_churn  # noqa: E402
+from reposage.tools.keywords import match_keywords  # noqa: E402
+from reposage.tools.language_detector import detect_languages  # noqa: E402
+from reposage.tools.repo_cloner import clone_repository, release_checkout  # noqa: E402
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# Slowdown tolerated before a stage counts as a regression
+TOLERANCE = 0.5
+
+# Differences below this many seconds are noise, whatever the ratio
+NOISE_FLOOR = 0.02
+
+
+def _measure(fn: Callable, repeat: int) -> Dict:
+    best_wall = best_cpu = float("inf")
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        best_wall = min(best_wall, time.perf_counter() - wall)
+        best_cpu = min(best_cpu, time.process_time() - cpu)
+    return {"wall_s": round(best_wall, 4), "cpu_s": round(best_cpu, 4)}
+
+
+def _stub_outputs(scan: Dict, prepass: Dict) -> Dict:
+    """Crew-shaped outputs built from the pre-pass, for report generation."""
+    return {
+        "scan_repository": scan,
+        "analyze_architecture": {
+            "architecture_type": "modular monolith",
+            "key_modules": scan["main_directories"][:10],
+            "service_interactions": [],
+            "detected_design_patterns": ["layered"],
+            "runtime_flow_summary": "synthetic",
+        },
+        "security_analysis": {"issues": [
+            {
+                "issue": f["issue"],
+                "severity": f["severity"],
+                "affected_files": [f["file"]],
+                "recommended_fix": f["recommended_fix"],
+            }
+            for f in prepass["security"][:50]
+        ]},
+        "performance_analysis": {"issues": [
+            {
+                "issue": f["issue"],
+                "severity": f["severity"],
+                "affected_file": f["file"],
+                "likely_symptoms": f.get("likely_symptoms"),
+                "recommended_fix": f["recommended_fix"],
+            }
+            for f in prepass["performance"][:50]
+        ]},
+        "plan_roadmap": {"immediate_fixes": [], "short_term": [], "medium_term": []},
+    }
+
+
+def run_benchmarks(profile: str, repeat: int, work_dir: str, crew: bool = True) -> Dict:
+    shape = PROFILES[profile]
+    source = Path(work_dir) / "source"
+    repo_info = generate_repo(str(source), **shape)
+    repo_url = source.resolve().as_uri()
+    clone_dir = Path(work_dir) / "clones"
+
+    stages: Dict[str, Dict] = {}
+
+    # interpreter start plus CLI imports; must stay free of crewai
+    stages["cli_startup"] = _measure(
+        lambda: subprocess.run(
+            [sys.executable, "-m", "reposage.main", "--help"],
+            stdout=subprocess.DEVNULL, check=True,
+        ),
+        repeat,
+    )
+
+    # clone: cold runs start from an empty cache each time, incremental
+    # runs only fetch into the existing mirror
+    cold_dirs = iter(range(repeat))
+    stages["clone_cold"] = _measure(
+        lambda: clone_repository(repo_url, base_dir=f"{clone_dir}-cold{next(cold_dirs)}"), repeat
+    )
+    stages["clone_incremental"] = _measure(
+        lambda: clone_repository(repo_url, base_dir=str(clone_dir)), repeat
+    )
+    repo_path = clone_repository(repo_url, base_dir=str(clone_dir))
+    release_checkout(repo_url)
+
+    stages["scan_repository"] = _measure(
+        lambda: scan_repo_path(repo_path, enumerate_files(repo_path)), repeat
+    )
+    entries = enumerate_files(repo_path)
+    scan = scan_repo_path(repo_path, entries)
+    files: List[str] = scan["files"]
+
+    stages["classify_files"] = _measure(lambda: classify_files.func(files), repeat)
+    stages["detect_languages"] = _measure(lambda: detect_languages.func(files), repeat)
+
+    # single-threaded detector costs, with file reads kept out of the timings
+    contents = {}
+    for rel_path in files:
+        with open(os.path.join(repo_path, rel_path), "rb") as fh:
+            contents[rel_path] = fh.read().decode("utf-8", errors="ignore")
+
+    stages["keyword_matching"] = _measure(
+        lambda: [match_keywords(c) for c in contents.values()], repeat
+    )
+
+    def warm_contexts():
+        # fresh contexts per run, with keyword hits already computed
+        contexts = [FileContext.from_text(f, c) for f, c in contents.items()]
+        for ctx in contexts:
+            ctx.hits
+        return contexts
+
+    for name, detector in {**SECURITY_DETECTORS, **PERFORMANCE_DETECTORS}.items():
+        runs = iter([warm_contexts() for _ in range(repeat)])
+        stages[f"detector:{name}"] = _measure(
+            lambda d=detector, runs=runs: [d(ctx) for ctx in next(runs)], repeat
+        )
+
+    stages["prepass_cold"] = _measure(lambda: run_prepass(repo_path, files), repeat)
+
+    cache_path = Path(work_dir) / "findings.sqlite"
+    blob_index = {e.path: e.blob_sha for e in entries if e.blob_sha}
+    with FindingsCache(str(cache_path)) as cache:
+        run_prepass(repo_path, files, cache=cache, blob_index=blob_index)
+        stages["prepass_cached"] = _measure(
+            lambda: run_prepass(repo_path, files, cache=cache, blob_index=blob_index), repeat
+        )
+
+    prepass = run_prepass(repo_path, files)
+    churn = file_churn(repo_path)
+    stages["context_builder"] = _measure(
+        lambda: [
+            build_task_context(task, scan, prepass, churn)
+            for task in ("architecture", "security", "performance")
+        ],
+        repeat,
+    )
+
+    if crew:
+        from reposage.llm.stub import StubLLM
+        from reposage.crew import RepoSageCrew
+
+        inputs = {"repo": repo_path}
+        for task in ("architecture", "security", "performance"):
+            inputs[f"{task}_context"] = build_task_context(task, scan, prepass, churn)
+
+        def kickoff():
+            c = RepoSageCrew(llm=StubLLM()).crew()
+            c.verbose = False
+            for agent in c.agents:
+                agent.verbose = False
+            c.kickoff(inputs=inputs)
+
+        stages["crew_stub_llm"] = _measure(kickoff, repeat)
+
+    from reposage.output.result import build_result
+    from reposage.output.summary_generator import generate_summary_json
+    from reposage.output.report_generator import generate_report_md
+    from reposage.output.report_pdf_generator import generate_report_pdf
+    from reposage.pipeline import write_artifacts
+
+    outputs = _stub_outputs(scan, prepass)
+    out_dir = Path(work_dir) / "outputs"
+    stages["report:build_result"] = _measure(lambda: build_result(outputs), repeat)
+    result = build_result(outputs)
+    stages["report:summary_json"] = _measure(
+        lambda: generate_summary_json(result, output_path=out_dir / "summary.json"), repeat
+    )
+    stages["report:markdown"] = _measure(
+        lambda: generate_report_md(result, output_path=out_dir / "report.md"), repeat
+    )
+    stages["report:pdf"] = _measure(
+        lambda: generate_report_pdf(result, output_path=out_dir / "report.pdf"), repeat
+    )
+    # all three, rendered concurrently
+    stages["report:write_artifacts"] = _measure(
+        lambda: write_artifacts(outputs, out_dir / "all"), repeat
+    )
+
+    return {
+        "profile": profile,
+        "repo": repo_info,
+        "findings": {
+            "security": len(prepass["security"]),
+            "performance": len(prepass["performance"]),
+        },
+        "repeat": repeat,
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "stages": stages,
+    }
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return one line per stage that regressed against ``baseline``."""
+    regressions = []
+    for stage, current in result["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if before is None:
+            continue
+        slower = current["wall_s"] - before["wall_s"]
+        if slower > NOISE_FLOOR and current["wall_s"] > before["wall_s"] * (1 + tolerance):
+            regressions.append(
+                f"{stage}: {before['wall_s']:.4f}s -> {current['wall_s']:.4f}s "
+                f"({current['wall_s'] / max(before['wall_s'], 1e-9):.2f}x)"
+            )
+    return regressions
+
+
+def _print_table(result: Dict, baseline: Dict):
+    print(f"\n📊 RepoSage benchmark — profile {result['profile']} "
+          f"({result['repo']['files']} files)\n")
+    print(f"{'stage':<30}{'wall (s)':>10}{'cpu (s)':>10}{'baseline':>10}")
+    for stage, timing in result["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {}).get("wall_s")
+        before = f"{before:.4f}" if before is not None else "-"
+        print(f"{stage:<30}{timing['wall_s']:>10.4f}{timing['cpu_s']:>10.4f}{before:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RepoSage benchmarks")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="medium")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (default: 3)")
+    parser.add_argument("--no-crew", action="store_true", help="Skip the stubbed crew stage")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=str(BASELINE_PATH),
+        help="Compare against a baseline file (default: benchmarks/baseline.json)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=str(BASELINE_PATH),
+        help="Store the results as the baseline for this profile",
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="reposage-bench-") as work_dir:
+        result = run_benchmarks(args.profile, args.repeat, work_dir, crew=not args.no_crew)
+
+    baseline_file = args.compare or args.save_baseline
+    baselines = {}
+    if baseline_file and Path(baseline_file).exists():
+        baselines = json.loads(Path(baseline_file).read_text())
+    baseline = baselines.get(args.profile, {})
+
+    _print_table(result, baseline)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2))
+
+    if args.save_baseline:
+        baselines[args.profile] = result
+        Path(args.save_baseline).write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"\n✅ Baseline for '{args.profile}' written to {args.save_baseline}")
+        return 0
+
+    if args.compare:
+        if not baseline:
+            print(f"\n⚠️  No baseline for profile '{args.profile}' in {args.compare}")
+            return 0
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\n✅ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Synthetic repository generator for the benchmarks.
+
+Builds a git repository of a chosen size and shape, with a known number
+of planted secrets, N+1 queries and blocking I/O calls, so detector
+output and stage timings are comparable from run to run.
+"""
+
+import os
+import random
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+# Named shapes used by the benchmark runner and the baseline
+PROFILES: Dict[str, Dict] = {
+    "small": {"files": 300, "depth": 3, "secrets": 5, "n_plus_one": 5, "sync_io": 10},
+    "medium": {"files": 3000, "depth": 5, "secrets": 25, "n_plus_one": 25, "sync_io": 60},
+    "large": {"files": 20000, "depth": 7, "secrets": 100, "n_plus_one": 100, "sync_io": 300},
+}
+
+DEFAULT_LANGUAGES = {"py": 0.55, "js": 0.25, "java": 0.1, "go": 0.1}
+
+_PLAIN = {
+    "py": "def handler_{n}(items):\n    total = 0\n    return total + len(items)\n",
+    "js": "function handler{n}(items) {{\n  return items.length;\n}}\n",
+    "java": "class Handler{n} {{\n  int size(int[] items) {{ return items.length; }}\n}}\n",
+    "go": "package handlers\n\nfunc Handler{n}(items []int) int {{\n\treturn len(items)\n}}\n",
+}
+
+_SECRET = 'api_key = "sk{n:014d}abcdefghij"\n'
+
+_N_PLUS_ONE = (
+    "for user in users:\n"
+    "    orders = db.query(Order).filter(user_id=user.id)\n"
+    "    rows = cursor.execute(\"select * from items where order_id=%s\")\n"
+)
+
+_SYNC_IO = "import time, requests\n\ndef poll_{n}():\n    time.sleep(1)\n    return requests.get(URL)\n"
+
+_EXTRA = {
+    "requirements.txt": "flask==3.0\nsqlalchemy==2.0\n",
+    "package.json": '{"name": "synthetic", "version": "1.0.0"}\n',
+    "config/settings.yaml": "debug: false\nport: 8080\n",
+    "app.py": "from flask import Flask\napp = Flask(__name__)\n",
+    "README.md": "# Synthetic repository\n",
+}
+
+
+def _git(repo: Path, *args: str):
+    subprocess.run(
+        ["git", "-C", str(repo), *args],
+        check=True,
+        capture_output=True,
+        env={
+            **os.environ,
+            "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+            "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@example.com",
+        },
+    )
+
+
+def generate_repo(
+    root: str,
+    files: int = 3000,
+    depth: int = 5,
+    languages: Optional[Dict[str, float]] = None,
+    secrets: int = 25,
+    n_plus_one: int = 25,
+    sync_io: int = 60,
+    seed: int = 0,
+    commit: bool = True,
+) -> Dict:
+    """
+    Write a synthetic repository to ``root`` and (by default) commit it.
+    Returns the shape, including how many of each pattern were planted.
+    """
+    rng = random.Random(seed)
+    languages = languages or DEFAULT_LANGUAGES
+    exts, weights = zip(*languages.items())
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+
+    # a fixed pool of directories, so file count and depth vary independently
+    dirs = [Path(".")]
+    for i in range(max(1, files // 20)):
+        parent = rng.choice(dirs)
+        if len(parent.parts) < depth:
+            dirs.append(parent / f"pkg{i}")
+
+    planted = {"secrets": secrets, "n_plus_one": n_plus_one, "sync_io": sync_io}
+    kinds = (
+        ["secret"] * secrets + ["n_plus_one"] * n_plus_one + ["sync_io"] * sync_io
+    )
+    kinds += ["plain"] * max(0, files - len(_EXTRA) - len(kinds))
+    rng.shuffle(kinds)
+
+    for n, kind in enumerate(kinds):
+        ext = "py" if kind != "plain" else rng.choices(exts, weights)[0]
+        body = _PLAIN[ext].format(n=n)
+        if kind == "secret":
+            body = _SECRET.format(n=n) + body
+        elif kind == "n_plus_one":
+            body += _N_PLUS_ONE
+        elif kind == "sync_io":
+            body += _SYNC_IO.format(n=n)
+
+        path = root_path / rng.choice(dirs) / f"module_{n}.{ext}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+
+    for rel_path, body in _EXTRA.items():
+        path = root_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+
+    if commit:
+        _git(root_path, "init", "-q", "-b", "main")
+        _git(root_path, "add", "-A")
+        _git(root_path, "commit", "-q", "-m", "synthetic repository")
+
+    return {
+        "files": len(kinds) + len(_EXTRA),
+        "depth": depth,
+        "languages": dict(languages),
+        "planted": planted,
+        "seed": seed,
+    }
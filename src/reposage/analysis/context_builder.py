@@ -0,0 +1,243 @@
+"""
+Token-budgeted repository digests for the analysis tasks.
+
+Instead of handing every agent the full scan output, each task gets a
+digest of the files most relevant to it: entry points, configs and
+dependency manifests, files with detector findings, and files that
+change often. Files are ranked per task and added until the token
+budget is spent, so prompt size stays flat as repositories grow.
+"""
+
+import json
+import math
+import os
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from reposage.analysis.fingerprint import dedupe_findings
+
+# Default per-task budget for the digest
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Rough token estimate for JSON-ish English text; avoids a tokenizer
+# dependency and errs on the generous side for paths and code.
+CHARS_PER_TOKEN = 4
+
+# Cap on each repository-level list in the digest header; halved until
+# the header fits the budget
+HEADER_LIST_LIMIT = 40
+
+# Cap on the file type and language tables in the digest header
+HEADER_TABLE_LIMIT = 15
+
+# Findings listed per file; the rest are counted
+FINDINGS_PER_FILE = 5
+
+SEVERITY_WEIGHT = {"High": 3, "Medium": 2, "Low": 1}
+
+# Triage lists of the scan whose files are not ranked
+SKIPPED_LISTS = ("binary_files", "generated_files", "oversized_files")
+
+# How much each signal counts towards a file's rank, per task
+TASK_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "architecture": {
+        "changed": 8, "entry_point": 10, "dependency": 6, "config": 3,
+        "security": 0, "performance": 0, "churn": 2, "depth": 3,
+    },
+    "security": {
+        "changed": 5, "entry_point": 3, "dependency": 2, "config": 4,
+        "security": 4, "performance": 0, "churn": 1, "depth": 0,
+    },
+    "performance": {
+        "changed": 5, "entry_point": 3, "dependency": 1, "config": 0,
+        "security": 0, "performance": 4, "churn": 1.5, "depth": 0,
+    },
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _findings_by_file(findings: List[Dict]) -> Dict[str, List[Dict]]:
+    by_file = defaultdict(list)
+    for f in findings:
+        if f.get("file"):
+            by_file[f["file"]].append(f)
+    return by_file
+
+
+def rank_files(
+    task: str,
+    scan: Dict,
+    prepass: Dict,
+    churn: Optional[Dict[str, int]] = None,
+) -> List[Dict]:
+    """
+    Score every scanned file for ``task`` and return the ones with any
+    signal, most relevant first. Each entry carries the reasons it ranked.
+    """
+    weights = TASK_WEIGHTS[task]
+    churn = churn or {}
+    entry_points = set(scan.get("entry_points") or [])
+    configs = set(scan.get("config_files") or [])
+    dependencies = set(scan.get("dependency_files") or [])
+    # diff mode: files the change touches
+    changed = set(scan.get("changed_files") or [])
+    findings = {
+        "security": _findings_by_file(prepass.get("security") or []),
+        "performance": _findings_by_file(prepass.get("performance") or []),
+    }
+    # binary, oversized and generated files only show up as counts
+    skipped = set().union(*(scan.get(key) or [] for key in SKIPPED_LISTS))
+
+    ranked = []
+    for path in scan.get("files") or []:
+        if path in skipped and path not in findings["security"]:
+            continue
+        score = 0.0
+        reasons = []
+
+        for signal, members in (
+            ("changed", changed),
+            ("entry_point", entry_points),
+            ("dependency", dependencies),
+            ("config", configs),
+        ):
+            if path in members and weights[signal]:
+                score += weights[signal]
+                reasons.append(signal)
+
+        file_findings = []
+        for family in ("security", "performance"):
+            hits = findings[family].get(path) or []
+            if hits and weights[family]:
+                score += weights[family] * sum(SEVERITY_WEIGHT.get(f.get("severity"), 1) for f in hits)
+                reasons.append(f"{len(hits)} {family} findings")
+                # repeats of one issue in the file are listed once
+                file_findings.extend(dedupe_findings(hits, family))
+
+        commits = churn.get(path, 0)
+        if commits and weights["churn"]:
+            score += weights["churn"] * math.log2(1 + commits)
+            reasons.append(f"changed in {commits} recent commits")
+
+        if weights["depth"]:
+            # shallow files say more about overall structure, so they
+            # fill any budget left after the stronger signals
+            score += weights["depth"] / (1 + path.count(os.sep))
+
+        if score:
+            ranked.append({
+                "path": path,
+                "score": round(score, 2),
+                "reasons": reasons,
+                "findings": file_findings,
+            })
+
+    ranked.sort(key=lambda e: (-e["score"], e["path"]))
+    return ranked
+
+
+def _header(scan: Dict, limit: int = HEADER_LIST_LIMIT) -> Dict:
+    files = scan.get("files") or []
+    extensions = Counter(os.path.splitext(f)[1] or os.path.basename(f) for f in files)
+    table_limit = min(limit, HEADER_TABLE_LIMIT)
+
+    def capped(key):
+        items = scan.get(key) or []
+        return items[:limit] + (
+            [f"... {len(items) - limit} more"] if len(items) > limit else []
+        )
+
+    header = {
+        "repo_path": scan.get("repo_path"),
+        "total_files": scan.get("total_files_scanned", len(files)),
+        "file_types": dict(extensions.most_common(table_limit)),
+        # byte share of each language, largest first
+        "languages": {
+            language: stats["share"]
+            for language, stats in list((scan.get("languages") or {}).items())[:table_limit]
+        },
+        "main_directories": capped("main_directories"),
+        "entry_points": capped("entry_points"),
+        "config_files": capped("config_files"),
+        "dependency_files": capped("dependency_files"),
+    }
+    if scan.get("changed_files"):
+        header["changed_files"] = capped("changed_files")
+    skipped = {
+        key.split("_")[0]: len(scan[key]) for key in SKIPPED_LISTS if scan.get(key)
+    }
+    if skipped:
+        header["skipped_files"] = skipped
+    return header
+
+
+def _finding_entry(finding: Dict) -> Dict:
+    entry = {
+        k: finding[k]
+        for k in ("detector", "issue", "severity", "line_start", "line_end")
+        if finding.get(k) is not None
+    }
+    if finding.get("occurrences", 1) > 1:
+        entry["occurrences"] = finding["occurrences"]
+        if finding.get("lines"):
+            entry["lines"] = finding["lines"]
+    elif finding.get("line") is not None:
+        entry["line"] = finding["line"]
+    return entry
+
+
+def _file_entry(ranked: Dict) -> Dict:
+    entry = {"path": ranked["path"]}
+    if ranked["reasons"]:
+        entry["why"] = ranked["reasons"]
+    findings = sorted(
+        ranked["findings"], key=lambda f: -SEVERITY_WEIGHT.get(f.get("severity"), 0)
+    )
+    if findings:
+        entry["findings"] = [_finding_entry(f) for f in findings[:FINDINGS_PER_FILE]]
+        if len(findings) > FINDINGS_PER_FILE:
+            entry["more_findings"] = len(findings) - FINDINGS_PER_FILE
+    return entry
+
+
+def build_task_context(
+    task: str,
+    scan: Dict,
+    prepass: Dict,
+    churn: Optional[Dict[str, int]] = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> str:
+    """
+    Render the digest for ``task`` ("architecture", "security" or
+    "performance") as compact JSON of at most ``token_budget`` tokens
+    (estimated). The repository header always comes first, with its
+    lists shortened until it fits; ranked files follow until the budget
+    runs out. Only a budget smaller than the header's counts alone is
+    exceeded.
+    """
+    limit = HEADER_LIST_LIMIT
+    while True:
+        digest = {"repository": _header(scan, limit), "relevant_files": []}
+        used = estimate_tokens(json.dumps(digest, separators=(",", ":")))
+        if used <= token_budget or limit == 0:
+            break
+        limit //= 2
+    ranked = rank_files(task, scan, prepass, churn)
+
+    included = 0
+    for item in ranked:
+        entry = _file_entry(item)
+        cost = estimate_tokens(json.dumps(entry, separators=(",", ":")))
+        if used + cost > token_budget:
+            break
+        digest["relevant_files"].append(entry)
+        used += cost
+        included += 1
+
+    if included < len(ranked):
+        digest["omitted_relevant_files"] = len(ranked) - included
+
+    return json.dumps(digest, separators=(",", ":"))
@@ -0,0 +1,173 @@
+"""
+Diff mode: analyze only the files a change touches.
+
+``resolve_diff`` lists the files changed since the merge base of a base
+ref and the head, as a pull request shows them. The scan, the detector
+pre-pass and the task digests then only see those files plus a few
+related entry points and configs, so a run costs in proportion to the
+diff, not the repository. ``base_findings`` runs the detectors over the
+base version of the changed files and ``compare_findings`` splits the
+head's findings into new and resolved ones.
+"""
+
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+
+from reposage.analysis.findings_cache import FindingsCache, strip_file, with_file
+from reposage.analysis.prepass import RULESET_VERSION, analyze_context
+from reposage.tools.file_context import FileContext
+from reposage.tools.file_scanner import CONFIG_EXTS, DEP_FILES, ENTRY_NAMES
+from reposage.tools.git_index import IndexEntry, changed_files, merge_base, read_blobs, rev_parse, tree_blobs
+
+# Unchanged entry points, configs and manifests added around the diff
+DIFF_CONTEXT_LIMIT = 20
+
+FAMILIES = ("security", "performance")
+
+
+def resolve_diff(repo_path: str, base: str, head: Optional[str] = None) -> Dict:
+    """
+    Files changed between the merge base of ``base`` and ``head`` and
+    ``head``, as ``{"base", "head", "merge_base", "changed": {path:
+    "A" | "M" | "D"}}``. ``head`` must be the commit checked out at
+    ``repo_path``; without it the working tree (uncommitted and
+    untracked files included) is compared. Raises RuntimeError when a
+    ref does not resolve.
+    """
+    base_commit = rev_parse(repo_path, base)
+    if base_commit is None:
+        raise RuntimeError(f"base ref {base} not found in {repo_path}")
+
+    head_commit = rev_parse(repo_path, head or "HEAD")
+    if head_commit is None:
+        raise RuntimeError(f"head ref {head or 'HEAD'} not found in {repo_path}")
+    if head is not None and head_commit != rev_parse(repo_path, "HEAD"):
+        # findings are read from the working tree, so it must be the head
+        raise RuntimeError(f"{repo_path} is not checked out at {head}")
+
+    common = merge_base(repo_path, base_commit, head_commit)
+    if common is None:
+        raise RuntimeError(f"{base} and {head or 'HEAD'} share no history")
+
+    changed = changed_files(repo_path, common, head_commit if head else None)
+    if changed is None:
+        raise RuntimeError(f"git diff {common[:12]} failed in {repo_path}")
+
+    return {
+        "base": base,
+        "head": head or "working tree",
+        "merge_base": common,
+        "changed": changed,
+    }
+
+
+def _is_context(rel_path: str) -> bool:
+    name = os.path.basename(rel_path)
+    return name in ENTRY_NAMES or name in DEP_FILES or os.path.splitext(name)[1] in CONFIG_EXTS
+
+
+def context_files(
+    paths: List[str], changed: Dict[str, str], limit: int = DIFF_CONTEXT_LIMIT
+) -> List[str]:
+    """
+    Unchanged entry points, configs and dependency manifests in the
+    directory of a changed file or any directory above it, shallowest
+    first, at most ``limit``.
+    """
+    ancestors = {""}
+    for path in changed:
+        parent = os.path.dirname(path)
+        while parent and parent not in ancestors:
+            ancestors.add(parent)
+            parent = os.path.dirname(parent)
+
+    related = [
+        p for p in paths
+        if p not in changed and os.path.dirname(p) in ancestors and _is_context(p)
+    ]
+    related.sort(key=lambda p: (p.count(os.sep), p))
+    return related[:limit]
+
+
+def diff_entries(entries: List[IndexEntry], diff: Dict) -> List[IndexEntry]:
+    """
+    The entries of changed files plus their context files. Records the
+    head's ``changed_files``, ``deleted_files`` and ``context_files`` in
+    ``diff``.
+    """
+    changed = diff["changed"]
+    context = set(context_files([e.path for e in entries], changed))
+
+    present = {e.path for e in entries}
+    diff["changed_files"] = sorted(p for p, status in changed.items() if status != "D" and p in present)
+    diff["deleted_files"] = sorted(p for p, status in changed.items() if status == "D")
+    diff["context_files"] = sorted(context)
+
+    keep = context | set(diff["changed_files"])
+    return [e for e in entries if e.path in keep]
+
+
+def base_findings(
+    repo_path: str,
+    commit: str,
+    paths: List[str],
+    cache: Optional[FindingsCache] = None,
+) -> Dict[str, List[Dict]]:
+    """
+    Detector findings for ``paths`` as they are in ``commit``, read
+    straight from git. Blobs already in ``cache`` are not read.
+    """
+    blobs = tree_blobs(repo_path, commit, paths)
+    cached = cache.get_findings(set(blobs.values()), RULESET_VERSION) if cache is not None else {}
+    contents = read_blobs(repo_path, sorted({sha for sha in blobs.values() if sha not in cached}))
+
+    fresh = {}
+    for path, sha in blobs.items():
+        if sha in contents and sha not in fresh:
+            result = analyze_context(FileContext.from_bytes(path, contents[sha], blob_sha=sha))
+            fresh[sha] = {family: strip_file(result[family]) for family in FAMILIES}
+
+    if cache is not None:
+        cache.put_findings(fresh, RULESET_VERSION)
+
+    findings = {family: [] for family in FAMILIES}
+    for path, sha in sorted(blobs.items()):
+        hit = cached.get(sha) or fresh.get(sha)
+        if hit is not None:
+            for family in FAMILIES:
+                findings[family].extend(with_file(hit[family], path))
+    return findings
+
+
+def _key(finding: Dict):
+    # line numbers shift with unrelated edits, so they are not compared
+    return (finding.get("file"), finding.get("detector"), finding.get("issue"))
+
+
+def compare_findings(base: Dict[str, List[Dict]], head: Dict[str, List[Dict]]) -> Dict:
+    """
+    ``{"new_findings": {family: [...]}, "resolved_findings": {family:
+    [...]}}``: head findings with no match in the base and base findings
+    with no match in the head. Findings match on file, detector and
+    issue, counting repeats.
+    """
+    new, resolved = {}, {}
+    for family in FAMILIES:
+        before, after = base.get(family) or [], head.get(family) or []
+
+        unmatched = Counter(_key(f) for f in before)
+        new[family] = []
+        for finding in after:
+            if unmatched[_key(finding)]:
+                unmatched[_key(finding)] -= 1
+            else:
+                new[family].append(finding)
+
+        resolved[family] = []
+        for finding in before:
+            if unmatched[_key(finding)]:
+                unmatched[_key(finding)] -= 1
+                resolved[family].append(finding)
+
+    return {"new_findings": new, "resolved_findings": resolved}
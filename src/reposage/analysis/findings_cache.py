@@ -0,0 +1,126 @@
+"""
+On-disk cache of detector findings and file summaries, keyed by git blob id.
+
+Blob ids are content hashes, so a file that has not changed between runs
+maps to the same entry no matter where it lives or which repo it is in.
+Findings are additionally keyed by the detector ruleset version, so
+changing a detector invalidates only its stale entries.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS findings (
+    blob_sha    TEXT NOT NULL,
+    ruleset     TEXT NOT NULL,
+    security    TEXT NOT NULL,
+    performance TEXT NOT NULL,
+    PRIMARY KEY (blob_sha, ruleset)
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    blob_sha TEXT PRIMARY KEY,
+    summary  TEXT NOT NULL
+);
+"""
+
+# SQLite limits the number of bound parameters per statement
+_BATCH = 500
+
+
+class FindingsCache:
+    """
+    SQLite-backed findings cache. Only the process that created it
+    should use it; pre-pass workers hand their results back instead.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # =======================
+    # DETECTOR FINDINGS
+    # =======================
+
+    def get_findings(self, blob_shas: Iterable[str], ruleset: str) -> Dict[str, Dict]:
+        """
+        Return ``{blob_sha: {"security": [...], "performance": [...]}}``
+        for every blob already analyzed under ``ruleset``.
+        """
+        shas = list(dict.fromkeys(blob_shas))
+        found = {}
+
+        for i in range(0, len(shas), _BATCH):
+            batch = shas[i:i + _BATCH]
+            rows = self._conn.execute(
+                "SELECT blob_sha, security, performance FROM findings "
+                f"WHERE ruleset = ? AND blob_sha IN ({','.join('?' * len(batch))})",
+                [ruleset, *batch],
+            )
+            for sha, security, performance in rows:
+                found[sha] = {
+                    "security": json.loads(security),
+                    "performance": json.loads(performance),
+                }
+
+        return found
+
+    def put_findings(self, entries: Dict[str, Dict], ruleset: str):
+        """Store ``{blob_sha: {"security": [...], "performance": [...]}}``."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?)",
+                [
+                    (sha, ruleset, json.dumps(data["security"]), json.dumps(data["performance"]))
+                    for sha, data in entries.items()
+                ],
+            )
+
+    # =======================
+    # FILE SUMMARIES
+    # =======================
+
+    def get_summaries(self, blob_shas: Iterable[str]) -> Dict[str, str]:
+        shas = list(dict.fromkeys(blob_shas))
+        found = {}
+
+        for i in range(0, len(shas), _BATCH):
+            batch = shas[i:i + _BATCH]
+            rows = self._conn.execute(
+                "SELECT blob_sha, summary FROM summaries "
+                f"WHERE blob_sha IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            found.update(dict(rows))
+
+        return found
+
+    def put_summaries(self, summaries: Dict[str, str]):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?)",
+                list(summaries.items()),
+            )
+
+
+def strip_file(findings: List[Dict]) -> List[Dict]:
+    """Drop the path from findings so they can be shared by identical blobs."""
+    return [{k: v for k, v in f.items() if k != "file"} for f in findings]
+
+
+def with_file(findings: List[Dict], file_path: str) -> List[Dict]:
+    """Re-attach a path to findings loaded from the cache."""
+    return [{**f, "file": file_path} for f in findings]
@@ -0,0 +1,184 @@
+"""
+Finding fingerprints and deduplication across detectors, agents and files.
+
+A fingerprint hashes a finding's rule, its normalized location and its
+code snippet: the line a detector matched (secrets masked), or nothing
+for agent issues. The rule is the detector and its full
+issue title ("secret_scanner:hardcoded secret detected: aws access key"),
+or the normalized issue text for agent findings, so only findings that
+are clearly the same merge; an SQL injection and a debug flag in one file
+stay two findings. The location is the normalized file path. Line numbers
+are left out, so a finding survives edits above it, and one issue
+repeated on identical lines merges; ``dedupe_findings`` keeps the line
+numbers as a list instead.
+
+``dedupe_findings`` merges findings with the same fingerprint into one
+that carries an ``occurrences`` count, its ``lines`` and its
+``sources`` ("detector" and/or "llm"). It works on detector findings and
+on crew-shaped issues alike. A detector finding is folded into an agent
+issue only when both name the same file and the issue's wording matches
+that finding's specific rule in ``FOLD_RULES`` (its secret type, N+1).
+"""
+
+import hashlib
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Agent wording that marks a secret as committed, not merely weak or unvalidated
+_HARDCODED = r"hard\s*-?\s*coded|committed|embedded|in (?:source|code|the repo)"
+
+# Secret scanner type -> how an agent names that type of secret
+_SECRET_TYPES = {
+    "aws access key": r"\baws\b|\bakia",
+    "generic api key": r"\bapi[ _-]?keys?\b",
+    "jwt secret": r"\bjwt\b",
+    "password assignment": r"\bpasswords?\b",
+    "private key": r"\bprivate keys?\b",
+}
+
+# detector -> {issue title: patterns an agent issue must all match to be
+# restating it}; one narrow rule per title, never one per family
+FOLD_RULES = {
+    "secret_scanner": {
+        f"hardcoded secret detected: {name}": (_HARDCODED, words)
+        for name, words in _SECRET_TYPES.items()
+    },
+    "n_plus_one": {
+        title: (r"\bn\s*\+\s*1\b",)
+        for title in (
+            "database query inside a loop (n+1)",
+            "database query inside nested loops (n+1)",
+            "possible n+1 database query pattern",
+        )
+    },
+}
+
+_FOLD_RULES = {
+    detector: {
+        title: [re.compile(p, re.IGNORECASE) for p in patterns]
+        for title, patterns in rules.items()
+    }
+    for detector, rules in FOLD_RULES.items()
+}
+
+SEVERITY_ORDER = {"High": 3, "Medium": 2, "Low": 1}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    return _WHITESPACE.sub(" ", str(text or "")).strip().lower()
+
+
+def rule_id(family: str, finding: Dict) -> str:
+    """
+    The rule a finding reports: ``detector:title`` for detector findings,
+    ``llm:issue text`` for agent findings, both normalized.
+    """
+    return f"{finding.get('detector') or 'llm'}:{normalize_text(finding.get('issue'))}"
+
+
+def normalize_path(path: Optional[str], repo_path: Optional[str] = None) -> str:
+    """Repository-relative, normalized form of a path an agent or detector wrote."""
+    if not path:
+        return ""
+    path = str(path).strip().strip("`'\"").replace("\\", "/")
+    if repo_path and os.path.isabs(path):
+        path = os.path.relpath(path, repo_path)
+    return os.path.normpath(path) if path else ""
+
+
+def finding_files(finding: Dict) -> List[str]:
+    """Files of a detector finding or crew issue, whichever shape it has."""
+    if finding.get("affected_files"):
+        return list(finding["affected_files"])
+    file = finding.get("affected_file") or finding.get("file")
+    return [file] if file else []
+
+
+def fingerprint(
+    family: str,
+    finding: Dict,
+    files: Optional[Iterable[str]] = None,
+    repo_path: Optional[str] = None,
+) -> str:
+    """
+    Fingerprint of a finding at ``files`` (default: its own files).
+    Stable across runs, wording and line shifts.
+    """
+    if files is None:
+        files = finding_files(finding)
+    location = ",".join(sorted({normalize_path(f, repo_path) for f in files}))
+    snippet = normalize_text(finding.get("snippet"))
+    key = "\0".join((family, rule_id(family, finding), location, snippet))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _lines(finding: Dict) -> List[int]:
+    lines = finding.get("lines")
+    if lines:
+        return list(lines)
+    line = finding.get("line") or finding.get("line_start")
+    return [line] if line else []
+
+
+def _sources(finding: Dict) -> List[str]:
+    return finding.get("sources") or ["detector" if finding.get("detector") else "llm"]
+
+
+def _merge_into(merged: Dict, finding: Dict):
+    merged["occurrences"] += finding.get("occurrences") or 1
+    if SEVERITY_ORDER.get(finding.get("severity"), 0) > SEVERITY_ORDER.get(merged.get("severity"), 0):
+        merged["severity"] = finding["severity"]
+    for source in _sources(finding):
+        if source not in merged["sources"]:
+            merged["sources"].append(source)
+    lines = set(merged.get("lines") or []) | set(_lines(finding))
+    if lines:
+        merged["lines"] = sorted(lines)
+
+
+def dedupe_findings(
+    findings: Iterable[Dict],
+    family: str,
+    fold: Optional[Iterable[Dict]] = None,
+    repo_path: Optional[str] = None,
+) -> List[Dict]:
+    """
+    ``findings`` with duplicates merged, in first-seen order. Findings in
+    ``fold`` (detector findings next to the crew's issues) are merged into
+    the first agent issue in the same file that matches their
+    ``FOLD_RULES`` patterns, and are never added on their own.
+    """
+    groups: Dict[str, Dict] = {}
+    for finding in findings:
+        fp = fingerprint(family, finding, repo_path=repo_path)
+        merged = groups.get(fp)
+        if merged is None:
+            merged = groups[fp] = {
+                **finding,
+                "fingerprint": fp,
+                "occurrences": 0,
+                "sources": [],
+            }
+            merged.pop("lines", None)
+        _merge_into(merged, finding)
+
+    # agent issues only; a detector finding is never folded twice
+    foldable = [
+        (merged, {normalize_path(f, repo_path) for f in finding_files(merged)})
+        for merged in groups.values() if "detector" not in merged["sources"]
+    ]
+    for finding in fold or []:
+        patterns = _FOLD_RULES.get(finding.get("detector"), {}).get(normalize_text(finding.get("issue")))
+        if not patterns:
+            continue
+        files = {normalize_path(f, repo_path) for f in finding_files(finding)}
+        for merged, merged_files in foldable:
+            issue = str(merged.get("issue") or "")
+            if files & merged_files and all(p.search(issue) for p in patterns):
+                _merge_into(merged, finding)
+                break
+
+    return list(groups.values())
@@ -0,0 +1,222 @@
+"""
+Deterministic detector pre-pass.
+
+Runs every heuristic detector over every scanned file before the crew
+starts, so the security and performance agents receive complete findings
+instead of sampling files one tool call at a time.
+
+With a FindingsCache, files whose blob id was already analyzed under the
+current ruleset are not read at all.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+from typing import Callable, Dict, List, Optional
+
+from reposage.analysis.findings_cache import FindingsCache, strip_file, with_file
+from reposage.tools.git_index import blob_ids, hash_file
+from reposage.tools.file_context import FileContext
+from reposage.tools.file_triage import GENERATED, LARGE_FILE_BYTES, OVERSIZED_BYTES, SKIPPED_KINDS
+from reposage.tools.keywords import KEYWORD_FAMILIES
+from reposage.tools.security.secret_scanner import SECRET_PATTERNS, find_secrets
+from reposage.tools.security.auth_heuristics import find_auth_issues
+from reposage.tools.security.endpoint_heuristics import find_unsafe_endpoints
+
+from reposage.tools.performance.n_plus_one import find_n_plus_one
+from reposage.tools.performance.pagination_check import find_missing_pagination
+from reposage.tools.performance.sync_io import find_sync_io
+
+# Detectors share one FileContext per file, so its content is read,
+# decoded, lower-cased, keyword-matched and parsed once
+Detector = Callable[[FileContext], List[Dict]]
+
+SECURITY_DETECTORS: Dict[str, Detector] = {
+    "secret_scanner": find_secrets,
+    "auth_heuristics": find_auth_issues,
+    "endpoint_heuristics": find_unsafe_endpoints,
+}
+
+PERFORMANCE_DETECTORS: Dict[str, Detector] = {
+    "n_plus_one": find_n_plus_one,
+    "pagination_check": find_missing_pagination,
+    "sync_io": find_sync_io,
+}
+
+# Files handed to a worker per task; keeps IPC overhead low on big repos
+CHUNK_SIZE = 64
+
+# Bump when detector logic changes in a way the keyword and pattern
+# tables below do not capture; it invalidates all cached findings.
+DETECTOR_REVISION = 6
+
+
+def _ruleset_version() -> str:
+    payload = json.dumps(
+        {
+            "revision": DETECTOR_REVISION,
+            "keywords": KEYWORD_FAMILIES,
+            "secrets": SECRET_PATTERNS,
+            "large_file_bytes": LARGE_FILE_BYTES,
+            "oversized_bytes": OVERSIZED_BYTES,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+RULESET_VERSION = _ruleset_version()
+
+
+def analyze_context(ctx: FileContext) -> Dict[str, List[Dict]]:
+    """
+    Run all six detectors over one file. The detectors share ``ctx``,
+    so keyword matching and parsing happen once. Binary and oversized
+    files are skipped; generated files are only checked for secrets.
+    """
+    result = {"security": [], "performance": [], "bytes_read": 0}
+    if ctx.kind in SKIPPED_KINDS:
+        return result
+    result["bytes_read"] = ctx.size
+
+    security, performance = SECURITY_DETECTORS, PERFORMANCE_DETECTORS
+    if ctx.kind == GENERATED:
+        # machine-written code: only committed secrets matter
+        security, performance = {"secret_scanner": find_secrets}, {}
+
+    for name, detector in security.items():
+        for finding in detector(ctx):
+            finding["detector"] = name
+            result["security"].append(finding)
+
+    for name, detector in performance.items():
+        for finding in detector(ctx):
+            finding["detector"] = name
+            result["performance"].append(finding)
+
+    return result
+
+
+def analyze_file(repo_path: str, rel_path: str) -> Dict[str, List[Dict]]:
+    """Read one file from ``repo_path`` and run ``analyze_context`` on it."""
+    return analyze_context(FileContext.open(repo_path, rel_path))
+
+
+def _analyze_chunk(repo_path: str, rel_paths: List[str]) -> List[Dict]:
+    return [analyze_file(repo_path, rel_path) for rel_path in rel_paths]
+
+
+def _hash_chunk(repo_path: str, rel_paths: List[str]) -> List[Optional[str]]:
+    return [hash_file(os.path.join(repo_path, rel_path)) for rel_path in rel_paths]
+
+
+@contextmanager
+def _worker_pool(max_workers: Optional[int], file_count: int):
+    if max_workers == 1 or file_count <= CHUNK_SIZE:
+        yield None
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            yield pool
+
+
+def _map_chunks(pool, fn, repo_path: str, rel_paths: List[str]) -> List:
+    chunks = [rel_paths[i:i + CHUNK_SIZE] for i in range(0, len(rel_paths), CHUNK_SIZE)]
+
+    if pool is None:
+        parts = [fn(repo_path, chunk) for chunk in chunks]
+    else:
+        parts = pool.map(fn, repeat(repo_path), chunks)
+
+    return [item for part in parts for item in part]
+
+
+def _sort_key(finding: Dict):
+    return (finding.get("file", ""), finding.get("detector", ""), finding.get("issue", ""))
+
+
+def run_prepass(
+    repo_path: str,
+    files: List[str],
+    max_workers: Optional[int] = None,
+    cache: Optional[FindingsCache] = None,
+    blob_index: Optional[Dict[str, str]] = None,
+) -> Dict:
+    """
+    Run all detectors over ``files`` (paths relative to ``repo_path``)
+    across a process pool and return the aggregated findings.
+
+    When ``cache`` is given, blob ids come from ``blob_index`` or the git
+    index (or are hashed for untracked and modified files), cached findings
+    are reused,
+    and only new blobs are analyzed. Cached file summaries are returned
+    under ``file_summaries``.
+
+    Output is sorted, so the same tree always yields the same findings
+    regardless of worker scheduling.
+    """
+    repo_path = os.path.abspath(repo_path)
+
+    summary = {
+        "files_analyzed": 0,
+        "files_cached": 0,
+        "bytes_read": 0,
+        "security": [],
+        "performance": [],
+        "blob_ids": {},
+        "file_summaries": {},
+    }
+
+    blobs: Dict[str, str] = {}
+    cached: Dict[str, Dict] = {}
+
+    with _worker_pool(max_workers, len(files)) as pool:
+        if cache is not None:
+            indexed = blob_index if blob_index is not None else blob_ids(repo_path)
+            blobs = {f: indexed[f] for f in files if f in indexed}
+
+            unhashed = [f for f in files if f not in blobs]
+            for rel_path, sha in zip(unhashed, _map_chunks(pool, _hash_chunk, repo_path, unhashed)):
+                if sha:
+                    blobs[rel_path] = sha
+
+            cached = cache.get_findings(blobs.values(), RULESET_VERSION)
+
+        pending = [f for f in files if blobs.get(f) not in cached]
+        results = _map_chunks(pool, _analyze_chunk, repo_path, pending)
+
+    for rel_path in files:
+        hit = cached.get(blobs.get(rel_path))
+        if hit is not None:
+            summary["files_cached"] += 1
+            summary["security"].extend(with_file(hit["security"], rel_path))
+            summary["performance"].extend(with_file(hit["performance"], rel_path))
+
+    fresh = {}
+    for rel_path, result in zip(pending, results):
+        summary["files_analyzed"] += 1
+        summary["bytes_read"] += result["bytes_read"]
+        summary["security"].extend(result["security"])
+        summary["performance"].extend(result["performance"])
+
+        if rel_path in blobs:
+            fresh[blobs[rel_path]] = {
+                "security": strip_file(result["security"]),
+                "performance": strip_file(result["performance"]),
+            }
+
+    if cache is not None:
+        cache.put_findings(fresh, RULESET_VERSION)
+        known = cache.get_summaries(blobs.values())
+        summary["file_summaries"] = {
+            rel_path: known[sha] for rel_path, sha in blobs.items() if sha in known
+        }
+
+    summary["blob_ids"] = blobs
+    summary["security"].sort(key=_sort_key)
+    summary["performance"].sort(key=_sort_key)
+
+    return summary
+
@@ -0,0 +1,275 @@
+"""
+Batch mode: analyze every repository listed in a manifest in one process.
+
+Manifest format, one repository per line::
+
+    https://github.com/org/service-a.git
+    https://github.com/org/service-b.git  release/2.x
+    ./local/checkout
+    # comments and blank lines are ignored
+
+Clone/scan/pre-pass (CPU and disk) and the crew (LLM, network bound) run
+in separate bounded pools, so repos are prepared while others wait on
+the model. At most ``llm_workers + PREPARED_BUFFER`` repos are prepared,
+waiting or under analysis at once. A failing repo is retried, then
+recorded in the index without affecting the rest.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from reposage.analysis.context_builder import DEFAULT_TOKEN_BUDGET
+from reposage.history import RunStore
+from reposage.llm.response_store import ResponseStore
+from reposage.pipeline import DEFAULT_CACHE_DIR, prepare_repo, run_crew, write_artifacts
+from reposage.tools.repo_cloner import normalize_url, release_checkout
+from reposage.tracing import Tracer
+
+# Repos prepared (cloned, scanned, pre-scanned) at the same time
+CPU_WORKERS = 2
+
+# Crews running at the same time
+LLM_WORKERS = 4
+
+# Repos prepared ahead of a free crew slot. Prepared repos hold their scan
+# and a pinned checkout until their crew finishes, so the CPU stage may
+# only run this far ahead of the LLM stage.
+PREPARED_BUFFER = 2
+
+# Extra attempts per stage after a failure
+RETRIES = 2
+
+# Seconds before the first retry; doubles on each attempt
+RETRY_BACKOFF = 5
+
+
+def read_manifest(path: str) -> List[Dict]:
+    """
+    Parse a manifest into ``[{"source", "ref", "is_url"}]``. Duplicate
+    lines are dropped, including the same URL spelled with and without a
+    trailing slash or ``.git``. A repository may appear with only one
+    ref, since each URL has a single cached worktree.
+    """
+    jobs = []
+    # repository key (see repo_cloner.normalize_url) -> (source, ref)
+    seen = {}
+
+    for lineno, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+
+        parts = line.split()
+        source, ref = parts[0], (parts[1] if len(parts) > 1 else None)
+        is_url = "://" in source or source.startswith("git@")
+        key = normalize_url(source) if is_url else str(Path(source).resolve())
+        if key in seen:
+            listed, listed_ref = seen[key]
+            if listed_ref != ref:
+                raise ValueError(
+                    f"{path}:{lineno}: {source} is already listed as {listed} with ref {listed_ref!r}"
+                )
+            continue
+        seen[key] = (source, ref)
+
+        jobs.append({
+            "source": source,
+            "ref": ref,
+            "is_url": is_url,
+        })
+
+    return jobs
+
+
+def _slug(job: Dict) -> str:
+    name = job["source"].rstrip("/").split("/")[-1].removesuffix(".git") or "repo"
+    digest = hashlib.sha1(f"{job['source']}@{job['ref'] or ''}".encode()).hexdigest()[:8]
+    return f"{name}-{digest}"
+
+
+def _repo_key(job: Dict) -> str:
+    # the name a repo is recorded under in the run history
+    return job["source"] if job["is_url"] else str(Path(job["source"]).resolve())
+
+
+def _with_retries(fn: Callable, retries: int, *args, **kwargs):
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def _prepare(job: Dict, workers: Optional[int], cache_dir: Optional[str], context_tokens: int):
+    # one tracer per repo, carried from the CPU pool to the LLM pool
+    tracer = Tracer()
+    with tracer.activate():
+        if job["is_url"]:
+            prepared = prepare_repo(
+                repo=job["source"], ref=job["ref"], workers=workers,
+                cache_dir=cache_dir, context_tokens=context_tokens,
+            )
+        else:
+            prepared = prepare_repo(
+                path=job["source"], workers=workers,
+                cache_dir=cache_dir, context_tokens=context_tokens,
+            )
+    prepared["tracer"] = tracer
+    return prepared
+
+
+def _prepare_slot(slots: threading.Semaphore, retries: int, *args):
+    # holds a slot from before the clone until the crew is done with it
+    slots.acquire()
+    try:
+        return _with_retries(_prepare, retries, *args)
+    except Exception:
+        slots.release()
+        raise
+
+
+def _analyze_slot(slots: threading.Semaphore, job: Dict, retries: int, *args):
+    try:
+        return _with_retries(_analyze, retries, *args)
+    finally:
+        if job["is_url"]:
+            release_checkout(job["source"])
+        slots.release()
+
+
+def _analyze(
+    prepared: Dict, out_dir: Path, llm_store, replay: bool, trace: bool, history, source: str
+) -> Dict:
+    tracer = prepared["tracer"]
+    with tracer.activate():
+        outputs = run_crew(prepared, llm_store=llm_store, replay=replay)
+        write_artifacts(
+            outputs, out_dir, pdf=False, tracer=tracer, history=history, repo=source
+        )
+    if trace:
+        tracer.export(out_dir / "trace.json")
+    return json.loads((out_dir / "summary.json").read_text(encoding="utf-8"))
+
+
+def run_batch(
+    manifest: str,
+    out_dir: str = "outputs",
+    cpu_workers: int = CPU_WORKERS,
+    llm_workers: int = LLM_WORKERS,
+    retries: int = RETRIES,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+    context_tokens: int = DEFAULT_TOKEN_BUDGET,
+    llm_store: Optional[ResponseStore] = None,
+    replay: bool = False,
+    trace: bool = False,
+    history: Optional[RunStore] = None,
+) -> Dict:
+    """
+    Analyze every repo in ``manifest``, writing ``summary.json`` and
+    ``report.md`` to ``out_dir/<repo>/`` and an aggregate
+    ``out_dir/index.json``. Returns the index. ``trace`` also writes
+    each repo's ``trace.json``; ``history`` records every analyzed repo.
+    """
+    jobs = read_manifest(manifest)
+    out_root = Path(out_dir)
+    out_root.mkdir(parents=True, exist_ok=True)
+
+    if workers is None:
+        # the pre-pass pools of concurrent repos share the CPUs
+        workers = max(1, (os.cpu_count() or 1) // max(cpu_workers, 1))
+
+    results: Dict[int, Dict] = {}
+    for i, job in enumerate(jobs):
+        results[i] = {
+            "source": job["source"],
+            "ref": job["ref"],
+            "output_dir": str(out_root / _slug(job)),
+            "status": "pending",
+        }
+
+    def fail(i: int, stage: str, started: float, exc: Exception):
+        if jobs[i]["is_url"]:
+            release_checkout(jobs[i]["source"])
+        message = (str(exc).strip().splitlines() or [""])[0]
+        results[i].update({
+            "status": "failed",
+            "failed_stage": stage,
+            "error": f"{type(exc).__name__}: {message}",
+            "seconds": round(time.perf_counter() - started, 2),
+        })
+        print(f"❌ {jobs[i]['source']}: {results[i]['error']}")
+
+    slots = threading.BoundedSemaphore(llm_workers + PREPARED_BUFFER)
+    started = {}
+    with ThreadPoolExecutor(max_workers=cpu_workers) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=llm_workers) as llm_pool:
+
+        prepared_futures = {}
+        for i, job in enumerate(jobs):
+            started[i] = time.perf_counter()
+            future = cpu_pool.submit(
+                _prepare_slot, slots, retries,
+                job, workers, cache_dir, context_tokens,
+            )
+            prepared_futures[future] = i
+
+        crew_futures = {}
+        for future in as_completed(prepared_futures):
+            i = prepared_futures[future]
+            try:
+                prepared = future.result()
+            except Exception as e:
+                fail(i, "prepare", started[i], e)
+                continue
+
+            crew_future = llm_pool.submit(
+                _analyze_slot, slots, jobs[i], retries,
+                prepared, Path(results[i]["output_dir"]), llm_store, replay, trace,
+                history, _repo_key(jobs[i]),
+            )
+            crew_futures[crew_future] = i
+
+        for future in as_completed(crew_futures):
+            i = crew_futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                fail(i, "analyze", started[i], e)
+                continue
+
+            results[i].update({
+                "status": "ok",
+                "seconds": round(time.perf_counter() - started[i], 2),
+                "repo_name": summary.get("repo_name"),
+                "health_score": summary.get("health_score", {}).get("score"),
+                "grade": summary.get("health_score", {}).get("grade"),
+                "top_security_risks": len(summary.get("top_security_risks", [])),
+                "top_performance_risks": len(summary.get("top_performance_risks", [])),
+            })
+
+    index = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "manifest": str(Path(manifest).resolve()),
+        "total": len(jobs),
+        "succeeded": sum(r["status"] == "ok" for r in results.values()),
+        "failed": sum(r["status"] == "failed" for r in results.values()),
+        "repos": [results[i] for i in range(len(jobs))],
+    }
+
+    index_path = out_root / "index.json"
+    tmp = index_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(index, indent=2), encoding="utf-8")
+    os.replace(tmp, index_path)
+
+    print(f"✅ index.json written to {index_path.resolve()}")
+    return index
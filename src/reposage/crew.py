@@ -1,18 +1,26 @@
+import contextvars
+import json
 from typing import List, Dict, Optional
 
-from crewai import Agent, Crew, Process, Task
+from crewai import LLM, Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
 from crewai.project import CrewBase, agent, task, crew
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 # =======================
 # TOOLS
 # =======================
 
+from reposage.analysis.fingerprint import dedupe_findings
+from reposage.llm.response_cache import CachedLLM
+from reposage.llm.response_store import ResponseStore
+from reposage.llm.traced import TracedLLM
+from reposage.output.normalize_output import force_dict
+from reposage.tracing import TASK, span, traced_tool
 from reposage.tools.repo_cloner import clone_repo
 from reposage.tools.file_scanner import scan_repository
 from reposage.tools.file_classifier import classify_files
-from reposage.tools.language_detector import detect_languages
 
 from reposage.tools.security.secret_scanner import scan_for_secrets
 from reposage.tools.security.auth_heuristics import analyze_auth_logic
@@ -32,6 +40,8 @@ class ScanRepositoryOutput(BaseModel):
     total_files_scanned: int
     main_directories: List[str]
     detected_languages: List[str]
+    # language -> {"files", "bytes", "share"}
+    languages: Optional[Dict[str, Dict[str, float]]] = {}
     entry_points: List[str]
     config_files: List[str]
     dependency_files: List[str]
@@ -51,6 +61,8 @@ class SecurityIssue(BaseModel):
     severity: str
     affected_files: Optional[List[str]]
     recommended_fix: str
+    # set when duplicates were merged into this issue
+    occurrences: Optional[int] = 1
 
 
 class SecurityAnalysisOutput(BaseModel):
@@ -63,6 +75,7 @@ class PerformanceIssue(BaseModel):
     affected_file: Optional[str]
     likely_symptoms: Optional[str]
     recommended_fix: str
+    occurrences: Optional[int] = 1
 
 
 class PerformanceAnalysisOutput(BaseModel):
@@ -84,6 +97,59 @@ class RoadmapOutput(BaseModel):
     medium_term: List[RoadmapItem]
 
 
+# =======================
+# TRACING
+# =======================
+
+def _traced(*tools) -> list:
+    # copies, so the module-level tools stay untraced
+    return [traced_tool(t) for t in tools]
+
+
+class TracedTask(Task):
+    """Task whose executions are recorded as tracing spans."""
+
+    _trace_context: Optional[contextvars.Context] = PrivateAttr(default=None)
+
+    def execute_async(self, agent=None, context=None, tools=None):
+        # crewai runs async tasks on a bare thread; carry the caller's
+        # tracer and parent span over to it
+        self._trace_context = contextvars.copy_context()
+        return super().execute_async(agent=agent, context=context, tools=tools)
+
+    def _execute_core(self, agent, context, tools):
+        trace_context, self._trace_context = self._trace_context, None
+        if trace_context is not None:
+            return trace_context.run(self._traced_execute, agent, context, tools)
+        return self._traced_execute(agent, context, tools)
+
+    def _traced_execute(self, agent, context, tools):
+        with span(self.name, TASK, agent=getattr(agent, "role", None)):
+            return super()._execute_core(agent, context, tools)
+
+
+# =======================
+# DEDUPLICATION
+# =======================
+
+def _merge_duplicates(family: str):
+    """
+    Task callback that merges duplicate issues in the output (see
+    reposage.analysis.fingerprint), so plan_roadmap and the renderers
+    get each issue once, with an occurrence count.
+    """
+    def callback(output):
+        data = force_dict(output.raw)
+        issues = data.get("issues")
+        if not isinstance(issues, list) or not all(isinstance(i, dict) for i in issues):
+            return
+        data["issues"] = dedupe_findings(issues, family)
+        output.raw = json.dumps(data)
+        if output.pydantic is not None:
+            output.pydantic = type(output.pydantic).model_validate(data)
+    return callback
+
+
 # =======================
 # CREW DEFINITION
 # =======================
@@ -97,6 +163,27 @@ class RepoSageCrew:
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
 
+    def __init__(
+        self,
+        response_store: Optional[ResponseStore] = None,
+        replay: bool = False,
+        llm: Optional[BaseLLM] = None,
+    ):
+        self.response_store = response_store
+        self.replay = replay
+        self.llm = llm
+
+    def _llm(self, name: str):
+        # Honour the model pinned in agents.yaml; with a response store,
+        # calls go through the on-disk LLM cache. ``llm`` (e.g. StubLLM)
+        # overrides both for every agent. Calls are traced either way.
+        if self.llm is not None:
+            return TracedLLM(self.llm)
+        model = self.agents_config[name]["model"]
+        if self.response_store is None:
+            return TracedLLM(LLM(model=model))
+        return TracedLLM(CachedLLM(model, self.response_store, replay=self.replay))
+
     # =======================
     # AGENTS
     # =======================
@@ -105,12 +192,12 @@ class RepoSageCrew:
     def code_scanner(self) -> Agent:
         return Agent(
             config=self.agents_config["code_scanner"],
-            tools=[
+            llm=self._llm("code_scanner"),
+            tools=_traced(
                 clone_repo,
                 scan_repository,
                 classify_files,
-                detect_languages,
-            ],
+            ),
             verbose=True,
         )
 
@@ -118,6 +205,7 @@ class RepoSageCrew:
     def architecture_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config["architecture_analyst"],
+            llm=self._llm("architecture_analyst"),
             verbose=True,
         )
 
@@ -125,11 +213,12 @@ class RepoSageCrew:
     def security_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config["security_analyst"],
-            tools=[
+            llm=self._llm("security_analyst"),
+            tools=_traced(
                 scan_for_secrets,
                 analyze_auth_logic,
                 detect_unsafe_endpoints,
-            ],
+            ),
             verbose=True,
         )
 
@@ -137,11 +226,12 @@ class RepoSageCrew:
     def performance_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config["performance_analyst"],
-            tools=[
+            llm=self._llm("performance_analyst"),
+            tools=_traced(
                 detect_n_plus_one,
                 detect_missing_pagination,
                 detect_sync_io,
-            ],
+            ),
             verbose=True,
         )
 
@@ -149,6 +239,7 @@ class RepoSageCrew:
     def roadmap_planner(self) -> Agent:
         return Agent(
             config=self.agents_config["roadmap_planner"],
+            llm=self._llm("roadmap_planner"),
             verbose=True,
         )
 
@@ -158,7 +249,7 @@ class RepoSageCrew:
 
     @task
     def scan_repository(self) -> Task:
-        return Task(
+        return TracedTask(
             config=self.tasks_config["scan_repository"],
             agent=self.code_scanner(),
             expected_output="Structured repository scan JSON",
@@ -168,32 +259,40 @@ class RepoSageCrew:
 
     @task
     def analyze_architecture(self) -> Task:
-        return Task(
+        return TracedTask(
             config=self.tasks_config["analyze_architecture"],
             agent=self.architecture_analyst(),
             output_pydantic=ArchitectureAnalysisOutput,
+            async_execution=True,
         )
 
     @task
     def security_analysis(self) -> Task:
-        return Task(
+        return TracedTask(
             config=self.tasks_config["security_analysis"],
             agent=self.security_analyst(),
             expected_output="Structured security analysis JSON",
             output_pydantic=SecurityAnalysisOutput,
+            async_execution=True,
+            callback=_merge_duplicates("security"),
         )
 
     @task
     def performance_analysis(self) -> Task:
-        return Task(
+        return TracedTask(
             config=self.tasks_config["performance_analysis"],
             agent=self.performance_analyst(),
             output_pydantic=PerformanceAnalysisOutput,
+            async_execution=True,
+            callback=_merge_duplicates("performance"),
         )
 
+    # Architecture, security and performance only need the scan, so they
+    # run concurrently; plan_roadmap is synchronous and waits for all three.
+
     @task
     def plan_roadmap(self) -> Task:
-        return Task(
+        return TracedTask(
             config=self.tasks_config["plan_roadmap"],
             agent=self.roadmap_planner(),
             output_pydantic=RoadmapOutput,
@@ -0,0 +1,147 @@
+"""
+Vectorized health scoring for many repositories at once.
+
+``calculate_health_score`` scores one run from its task outputs. To
+re-score a whole history when the weights change, ``score_batch`` takes
+every finding as columns (NumPy arrays of repo index, family and
+severity code) plus each repo's architecture and hygiene points, and
+computes scores, breakdowns and grades for all repos in one pass.
+``what_if`` does the same for several weight tables at once, so
+alternative weightings can be compared without re-running any analysis.
+
+Weight tables have the shape of ``scorer.DEFAULT_WEIGHTS``; a partial
+table overrides only the values it names.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from reposage.health.scorer import ARCHITECTURE_POINTS, DEFAULT_WEIGHTS, HYGIENE_POINTS
+
+FAMILIES = ("security", "performance")
+SEVERITIES = ("High", "Medium", "Low")
+
+FAMILY_CODES = {family: code for code, family in enumerate(FAMILIES)}
+# any other severity (missing, misspelled) scores nothing
+SEVERITY_CODES = {severity: code for code, severity in enumerate(SEVERITIES)}
+UNSCORED = len(SEVERITIES)
+
+GRADES = np.array(["A", "B", "C", "D"])
+
+
+class FindingColumns(NamedTuple):
+    """One row per finding, plus per-repo arrays indexed by repo id."""
+    repo_ids: np.ndarray       # int, index into ``repos``
+    families: np.ndarray       # int, FAMILY_CODES
+    severities: np.ndarray     # int, SEVERITY_CODES or UNSCORED
+    repos: List[str]
+    architecture: np.ndarray   # points out of ARCHITECTURE_POINTS
+    hygiene: np.ndarray        # points out of HYGIENE_POINTS
+
+
+def build_columns(
+    repos: Sequence[str],
+    findings: Sequence[tuple],
+    architecture: Optional[Sequence[int]] = None,
+    hygiene: Optional[Sequence[int]] = None,
+) -> FindingColumns:
+    """
+    ``FindingColumns`` from ``(repo_index, family, severity)`` tuples.
+    Repos without architecture or hygiene points get full marks.
+    """
+    n = len(findings)
+    repo_ids = np.fromiter((f[0] for f in findings), dtype=np.int64, count=n)
+    families = np.fromiter((FAMILY_CODES[f[1]] for f in findings), dtype=np.int8, count=n)
+    severities = np.fromiter(
+        (SEVERITY_CODES.get(f[2], UNSCORED) for f in findings), dtype=np.int8, count=n
+    )
+
+    def points(values, full):
+        if values is None:
+            return np.full(len(repos), full, dtype=np.int64)
+        return np.array([full if v is None else v for v in values], dtype=np.int64)
+
+    return FindingColumns(
+        repo_ids=repo_ids,
+        families=families,
+        severities=severities,
+        repos=list(repos),
+        architecture=points(architecture, ARCHITECTURE_POINTS),
+        hygiene=points(hygiene, HYGIENE_POINTS),
+    )
+
+
+def _merge_weights(weights: Optional[Dict]) -> Dict:
+    merged = {key: dict(table) for key, table in DEFAULT_WEIGHTS.items()}
+    for key, table in (weights or {}).items():
+        if key not in merged:
+            raise ValueError(f"Unknown weight table {key!r}")
+        merged[key].update(table)
+    return merged
+
+
+def _tables(weights: Sequence[Dict]):
+    # (scenarios, families, severities + unscored) penalties,
+    # (scenarios, families) caps and (scenarios, grades) thresholds
+    penalties = np.zeros((len(weights), len(FAMILIES), UNSCORED + 1))
+    caps = np.zeros((len(weights), len(FAMILIES)))
+    thresholds = np.zeros((len(weights), 3))
+    for s, table in enumerate(weights):
+        for f, family in enumerate(FAMILIES):
+            for severity, code in SEVERITY_CODES.items():
+                penalties[s, f, code] = table[family][severity]
+            caps[s, f] = table[family]["max"]
+        thresholds[s] = [table["grades"][g] for g in ("A", "B", "C")]
+    return penalties, caps, thresholds
+
+
+def what_if(columns: FindingColumns, scenarios: Dict[str, Optional[Dict]]) -> Dict[str, Dict]:
+    """
+    Score every repo under each named weight table (``None`` for the
+    defaults). Returns ``{name: {"score", "grade", "breakdown": {...}}}``
+    with one array element per repo in ``columns.repos``.
+    """
+    names = list(scenarios)
+    penalties, caps, thresholds = _tables([_merge_weights(scenarios[n]) for n in names])
+    k, n = len(names), len(columns.repos)
+
+    # penalty of every finding under every scenario: (k, findings)
+    per_finding = penalties[:, columns.families, columns.severities]
+
+    # sum per (scenario, repo, family) with one bincount
+    slots = columns.repo_ids * len(FAMILIES) + columns.families
+    offsets = np.arange(k)[:, None] * n * len(FAMILIES)
+    totals = np.bincount(
+        (offsets + slots).ravel(), weights=per_finding.ravel(), minlength=k * n * len(FAMILIES)
+    ).reshape(k, n, len(FAMILIES))
+
+    points = caps[:, None, :] - np.minimum(totals, caps[:, None, :])
+    score = (
+        100
+        - (caps.sum(axis=1)[:, None] - points.sum(axis=2))
+        - (ARCHITECTURE_POINTS - columns.architecture)
+        - (HYGIENE_POINTS - columns.hygiene)
+    )
+    grade = GRADES[(score[:, :, None] < thresholds[:, None, :]).sum(axis=2)]
+
+    score = np.maximum(score, 0).round().astype(np.int64)
+    points = points.round().astype(np.int64)
+    return {
+        name: {
+            "score": score[s],
+            "grade": grade[s],
+            "breakdown": {
+                "security": points[s, :, FAMILY_CODES["security"]],
+                "performance": points[s, :, FAMILY_CODES["performance"]],
+                "architecture": columns.architecture,
+                "hygiene": columns.hygiene,
+            },
+        }
+        for s, name in enumerate(names)
+    }
+
+
+def score_batch(columns: FindingColumns, weights: Optional[Dict] = None) -> Dict:
+    """Scores, grades and breakdowns of every repo under one weight table."""
+    return what_if(columns, {"scores": weights})["scores"]
@@ -1,4 +1,17 @@
-from collections import defaultdict
+"""
+Risky file ranking with directory and module rollups.
+
+``RiskAggregator`` consumes findings one at a time, keeping one small
+counter per affected file, never the findings themselves; ``top_files``
+and ``rollups`` pick the top k with a bounded heap instead of sorting
+everything. Files are ranked by risk density: the severity-weighted
+score per 1000 lines, with the line counts the scan estimated from each
+file's head, so a large file is not flagged just for being large.
+"""
+
+import heapq
+import os
+from typing import Dict, Iterable, List, Optional
 
 SEVERITY_WEIGHT = {
     "High": 10,
@@ -6,49 +19,158 @@ SEVERITY_WEIGHT = {
     "Low": 2
 }
 
-def extract_top_risky_files(security: dict, performance: dict, limit: int = 5):
+# Density is smoothed as if every file had this many more lines, so a
+# single finding in a tiny file does not outrank many in a real module
+DENSITY_PRIOR_LINES = 100
+
+
+def _density(score: int, lines: int) -> float:
+    return round(score * 1000 / (lines + DENSITY_PRIOR_LINES), 2)
+
+
+def _module(path: str) -> Optional[str]:
+    # top-level directory; files at the root belong to no module
+    return path.split(os.sep, 1)[0] if os.sep in path else None
+
+
+class RiskAggregator:
+    """Streaming per-file risk counters with directory rollups."""
+
+    def __init__(self, file_lines: Optional[Dict[str, int]] = None):
+        self.file_lines = file_lines or {}
+        # path -> [score, security_issues, performance_issues]
+        self._files: Dict[str, List[int]] = {}
+
+    def add(self, file: Optional[str], severity: Optional[str], family: str):
+        """Count one finding of ``family`` ("security" or "performance")."""
+        if not file:
+            return
+        counts = self._files.get(file)
+        if counts is None:
+            counts = self._files[file] = [0, 0, 0]
+        counts[0] += SEVERITY_WEIGHT.get(severity, 0)
+        counts[1 if family == "security" else 2] += 1
+
+    def add_issues(self, security: Iterable[Dict], performance: Iterable[Dict]):
+        """Count crew-shaped security and performance issues."""
+        for issue in security:
+            for f in issue.get("affected_files") or []:
+                self.add(f, issue.get("severity"), "security")
+        for issue in performance:
+            self.add(issue.get("affected_file"), issue.get("severity"), "performance")
+
+    def files(self) -> Iterable[str]:
+        return self._files.keys()
+
+    def _lines(self, path: str) -> int:
+        return self.file_lines.get(path, 0)
+
+    def top_files(self, limit: int = 5) -> List[Dict]:
+        """The ``limit`` files with the highest risk density."""
+        ranked = heapq.nlargest(
+            limit,
+            self._files.items(),
+            key=lambda kv: (_density(kv[1][0], self._lines(kv[0])), kv[1][0]),
+        )
+        return [
+            {
+                "file": file,
+                "risk_score": score,
+                "security_issues": security,
+                "performance_issues": performance,
+                "estimated_lines": self._lines(file),
+                "risk_density": _density(score, self._lines(file)),
+            }
+            for file, (score, security, performance) in ranked
+        ]
+
+    def rollups(self, limit: int = 5) -> Dict[str, List[Dict]]:
+        """
+        ``{"directories": [...], "modules": [...]}``: the ``limit``
+        riskiest directories at any depth and top-level modules. A
+        directory's density counts every line below it, flagged or not.
+        """
+        directories: Dict[str, List[int]] = {}
+        modules: Dict[str, List[int]] = {}
+
+        # [score, security, performance, files with findings, lines]
+        def bump(table, key, counts, lines, flagged):
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = [0, 0, 0, 0, 0]
+            entry[0] += counts[0]
+            entry[1] += counts[1]
+            entry[2] += counts[2]
+            entry[3] += flagged
+            entry[4] += lines
+
+        no_findings = (0, 0, 0)
+        paths = set(self.file_lines) | set(self._files)
+        for path in paths:
+            counts = self._files.get(path, no_findings)
+            flagged = int(path in self._files)
+            lines = self._lines(path)
+
+            parent = os.path.dirname(path)
+            while parent:
+                bump(directories, parent, counts, lines, flagged)
+                parent = os.path.dirname(parent)
+            module = _module(path)
+            if module is not None:
+                bump(modules, module, counts, lines, flagged)
+
+        def top(table, label):
+            ranked = heapq.nlargest(
+                limit,
+                ((k, v) for k, v in table.items() if v[0]),
+                # ties: the deeper, more specific directory first
+                key=lambda kv: (_density(kv[1][0], kv[1][4]), kv[1][0], kv[0].count(os.sep), kv[0]),
+            )
+            return [
+                {
+                    label: key,
+                    "risk_score": score,
+                    "security_issues": security,
+                    "performance_issues": performance,
+                    "risky_files": flagged,
+                    "estimated_lines": lines,
+                    "risk_density": _density(score, lines),
+                }
+                for key, (score, security, performance, flagged, lines) in ranked
+            ]
+
+        return {"directories": top(directories, "directory"), "modules": top(modules, "module")}
+
+
+def extract_top_risky_files(
+    security: dict,
+    performance: dict,
+    limit: int = 5,
+    detector_findings: Optional[Dict[str, List[Dict]]] = None,
+    file_lines: Optional[Dict[str, int]] = None,
+):
     """
-    Returns top risky files sorted by cumulative risk score.
+    Returns top risky files by risk density. Detector findings count for
+    files the crew's issues do not mention, so files the model left out
+    are still ranked.
     """
+    return risk_aggregator(security, performance, detector_findings, file_lines).top_files(limit)
+
+
+def risk_aggregator(
+    security: dict,
+    performance: dict,
+    detector_findings: Optional[Dict[str, List[Dict]]] = None,
+    file_lines: Optional[Dict[str, int]] = None,
+) -> RiskAggregator:
+    """A ``RiskAggregator`` fed with a run's issues (see ``extract_top_risky_files``)."""
+    aggregator = RiskAggregator(file_lines)
+    aggregator.add_issues(security.get("issues") or [], performance.get("issues") or [])
 
-    file_risk = defaultdict(lambda: {
-        "score": 0,
-        "security_issues": 0,
-        "performance_issues": 0
-    })
-
-    # ---------------- Security issues ----------------
-    for issue in security.get("issues", []):
-        severity = issue.get("severity")
-        weight = SEVERITY_WEIGHT.get(severity, 0)
-
-        for f in issue.get("affected_files") or []:
-            file_risk[f]["score"] += weight
-            file_risk[f]["security_issues"] += 1
-
-    # ---------------- Performance issues ----------------
-    for issue in performance.get("issues", []):
-        severity = issue.get("severity")
-        weight = SEVERITY_WEIGHT.get(severity, 0)
-
-        f = issue.get("affected_file")
-        if f:
-            file_risk[f]["score"] += weight
-            file_risk[f]["performance_issues"] += 1
-
-    # ---------------- Sort & return ----------------
-    ranked = sorted(
-        file_risk.items(),
-        key=lambda x: x[1]["score"],
-        reverse=True
-    )
-
-    return [
-        {
-            "file": file,
-            "risk_score": data["score"],
-            "security_issues": data["security_issues"],
-            "performance_issues": data["performance_issues"],
-        }
-        for file, data in ranked[:limit]
-    ]
+    if detector_findings:
+        listed = set(aggregator.files())
+        for family in ("security", "performance"):
+            for f in detector_findings.get(family) or []:
+                if f.get("file") not in listed:
+                    aggregator.add(f.get("file"), f.get("severity"), family)
+    return aggregator
@@ -1,3 +1,17 @@
+# Points deducted per issue by severity, and the most a family can lose.
+# reposage.health.batch_scorer scores many repos at once from the same
+# table, and takes alternative tables for what-if comparisons.
+DEFAULT_WEIGHTS = {
+    "security": {"High": 10, "Medium": 6, "Low": 3, "max": 40},
+    "performance": {"High": 8, "Medium": 5, "Low": 2, "max": 30},
+    # lowest score for each grade
+    "grades": {"A": 85, "B": 70, "C": 50},
+}
+
+ARCHITECTURE_POINTS = 20
+HYGIENE_POINTS = 10
+
+
 def calculate_health_score(
     scan: dict,
     architecture: dict,
@@ -10,39 +24,42 @@ def calculate_health_score(
     # -------------------------------
     # SECURITY (40)
     # -------------------------------
-    sec_penalty = 0
-    for issue in security.get("issues", []):
-        if issue.get("severity") == "High":
-            sec_penalty += 10
-        elif issue.get("severity") == "Medium":
-            sec_penalty += 6
-        elif issue.get("severity") == "Low":
-            sec_penalty += 3
-
-    sec_penalty = min(sec_penalty, 40)
-    breakdown["security"] = 40 - sec_penalty
-    score -= sec_penalty
+    breakdown["security"] = _family_points("security", security)
+    score -= DEFAULT_WEIGHTS["security"]["max"] - breakdown["security"]
 
     # -------------------------------
     # PERFORMANCE (30)
     # -------------------------------
-    perf_penalty = 0
-    for issue in performance.get("issues", []):
-        if issue.get("severity") == "High":
-            perf_penalty += 8
-        elif issue.get("severity") == "Medium":
-            perf_penalty += 5
-        elif issue.get("severity") == "Low":
-            perf_penalty += 2
-
-    perf_penalty = min(perf_penalty, 30)
-    breakdown["performance"] = 30 - perf_penalty
-    score -= perf_penalty
+    breakdown["performance"] = _family_points("performance", performance)
+    score -= DEFAULT_WEIGHTS["performance"]["max"] - breakdown["performance"]
 
     # -------------------------------
     # ARCHITECTURE (20)
     # -------------------------------
-    arch_score = 20
+    breakdown["architecture"] = architecture_points(architecture)
+    score -= (ARCHITECTURE_POINTS - breakdown["architecture"])
+
+    # -------------------------------
+    # REPO HYGIENE (10)
+    # -------------------------------
+    breakdown["hygiene"] = hygiene_points(scan)
+    score -= (HYGIENE_POINTS - breakdown["hygiene"])
+
+    return {
+        "score": max(score, 0),
+        "breakdown": breakdown,
+        "grade": _grade(score),
+    }
+
+
+def _family_points(family, output):
+    weights = DEFAULT_WEIGHTS[family]
+    penalty = sum(weights.get(issue.get("severity"), 0) for issue in output.get("issues", []))
+    return weights["max"] - min(penalty, weights["max"])
+
+
+def architecture_points(architecture: dict):
+    arch_score = ARCHITECTURE_POINTS
     arch_type = architecture.get("architecture_type")
 
     if arch_type == "monolith":
@@ -53,13 +70,11 @@ def calculate_health_score(
     if not architecture.get("detected_design_patterns"):
         arch_score -= 4
 
-    breakdown["architecture"] = max(arch_score, 0)
-    score -= (20 - breakdown["architecture"])
+    return max(arch_score, 0)
 
-    # -------------------------------
-    # REPO HYGIENE (10)
-    # -------------------------------
-    hygiene_score = 10
+
+def hygiene_points(scan: dict):
+    hygiene_score = HYGIENE_POINTS
 
     if not scan.get("entry_points"):
         hygiene_score -= 3
@@ -68,16 +83,33 @@ def calculate_health_score(
     if scan.get("total_files_scanned", 0) < 5:
         hygiene_score -= 4
 
-    breakdown["hygiene"] = max(hygiene_score, 0)
-    score -= (10 - breakdown["hygiene"])
+    return max(hygiene_score, 0)
+
 
+def _grade(score, grades=DEFAULT_WEIGHTS["grades"]):
+    return (
+        "A" if score >= grades["A"] else
+        "B" if score >= grades["B"] else
+        "C" if score >= grades["C"] else
+        "D"
+    )
+
+
+def combine_health_scores(scores: list, weights: list):
+    """
+    One health score for several parts of a repository (the shards of a
+    monorepo), averaging their scores and breakdowns weighted by
+    ``weights`` (e.g. file counts).
+    """
+    total = sum(weights) or 1
+    breakdown = {}
+    for health, weight in zip(scores, weights):
+        for k, v in health["breakdown"].items():
+            breakdown[k] = breakdown.get(k, 0) + v * weight / total
+
+    score = round(sum(h["score"] * w for h, w in zip(scores, weights)) / total)
     return {
-        "score": max(score, 0),
-        "breakdown": breakdown,
-        "grade": (
-            "A" if score >= 85 else
-            "B" if score >= 70 else
-            "C" if score >= 50 else
-            "D"
-        )
+        "score": score,
+        "breakdown": {k: round(v) for k, v in breakdown.items()},
+        "grade": _grade(score),
     }
@@ -0,0 +1,524 @@
+"""
+Optional run history: every run, its health score, its riskiest files
+and every finding, in one SQLite database.
+
+Runs are recorded by ``write_artifacts`` when it is given a ``RunStore``
+(``--history`` on the CLI). Each finding is stored with a fingerprint
+that stays the same across runs while the issue is unfixed, so deltas
+between runs are set differences. Indexes on repo, file, severity and
+time keep trend and regression queries in the milliseconds over a long
+history.
+
+    python -m reposage.history regressions --days 7
+    python -m reposage.history trend https://github.com/org/service.git
+    python -m reposage.history delta ./my-repo
+    python -m reposage.history findings --severity High --days 30
+    python -m reposage.history rescore strict.json lenient.json
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from reposage.analysis.fingerprint import fingerprint
+from reposage.output.result import AnalysisResult
+from reposage.tools.git_index import rev_parse
+
+HISTORY_FILE = "history.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo         TEXT NOT NULL,
+    repo_path    TEXT,
+    commit_sha   TEXT,
+    created      REAL NOT NULL,
+    score        INTEGER NOT NULL,
+    grade        TEXT NOT NULL,
+    security     INTEGER,
+    performance  INTEGER,
+    architecture INTEGER,
+    hygiene      INTEGER,
+    files        INTEGER,
+    risky_files  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_repo ON runs (repo, created);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+
+CREATE TABLE IF NOT EXISTS findings (
+    run_id      INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    repo        TEXT NOT NULL,
+    created     REAL NOT NULL,
+    fingerprint TEXT NOT NULL,
+    family      TEXT NOT NULL,
+    severity    TEXT,
+    file        TEXT,
+    line        INTEGER,
+    detector    TEXT,
+    issue       TEXT,
+    -- 0 for the second and later files of a multi-file issue, which
+    -- the health score counts once
+    first_file  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS findings_run ON findings (run_id, fingerprint);
+CREATE INDEX IF NOT EXISTS findings_repo ON findings (repo, created);
+CREATE INDEX IF NOT EXISTS findings_file ON findings (file, created);
+CREATE INDEX IF NOT EXISTS findings_severity ON findings (severity, created);
+CREATE INDEX IF NOT EXISTS findings_fingerprint ON findings (fingerprint);
+"""
+
+_RUN_COLUMNS = [
+    "id", "repo", "repo_path", "commit_sha", "created", "score", "grade",
+    "security", "performance", "architecture", "hygiene", "files", "risky_files",
+]
+
+_FINDING_COLUMNS = [
+    "run_id", "repo", "created", "fingerprint", "family", "severity",
+    "file", "line", "detector", "issue", "first_file",
+]
+
+
+# SQLite limits the number of bound parameters per statement
+_BATCH = 500
+
+
+def finding_fingerprint(family: str, finding: Dict, file: Optional[str]) -> str:
+    """
+    Stable id of a finding in one file (see reposage.analysis.fingerprint),
+    so an issue the detectors and the crew word differently is tracked as
+    one across runs.
+    """
+    return fingerprint(family, finding, [file] if file else [])
+
+
+def _finding_rows(result: AnalysisResult) -> Iterator[tuple]:
+    # (family, finding, file, first_file); a security issue is recorded
+    # per file
+    for issue in result.security_issues:
+        for i, file in enumerate(issue.get("affected_files") or [None]):
+            yield "security", issue, file, int(i == 0)
+    for issue in result.performance_issues:
+        yield "performance", issue, issue.get("affected_file"), 1
+
+
+def _iso(created: float) -> str:
+    return datetime.fromtimestamp(created, timezone.utc).isoformat(timespec="seconds")
+
+
+class RunStore:
+    """
+    SQLite-backed run history. Safe to share between threads (batch mode
+    records repos from its crew pool).
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # =======================
+    # RECORD
+    # =======================
+
+    def record(
+        self,
+        result: AnalysisResult,
+        repo: Optional[str] = None,
+        commit_sha: Optional[str] = None,
+        created: Optional[float] = None,
+    ) -> int:
+        """
+        Store a run and its findings; returns the run id. ``repo`` names
+        the repository across runs (its URL or local path; default: the
+        scanned path) and ``commit_sha`` defaults to the checkout's HEAD.
+        """
+        repo = repo or result.repo_path
+        if commit_sha is None and result.repo_path != "unknown":
+            commit_sha = rev_parse(result.repo_path, "HEAD")
+        created = time.time() if created is None else created
+        breakdown = result.health.get("breakdown") or {}
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (repo, repo_path, commit_sha, created, score, grade, "
+                "security, performance, architecture, hygiene, files, risky_files) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    repo, result.repo_path, commit_sha, created,
+                    result.health["score"], result.health["grade"],
+                    breakdown.get("security"), breakdown.get("performance"),
+                    breakdown.get("architecture"), breakdown.get("hygiene"),
+                    result.scan.get("total_files_scanned"),
+                    json.dumps(result.risky_files),
+                ),
+            )
+            run_id = cursor.lastrowid
+            self._conn.executemany(
+                f"INSERT INTO findings VALUES ({', '.join('?' * len(_FINDING_COLUMNS))})",
+                [
+                    (
+                        run_id, repo, created, finding_fingerprint(family, f, file), family,
+                        f.get("severity"), file, f.get("line") or f.get("line_start"),
+                        f.get("detector"), f.get("issue"), first_file,
+                    )
+                    for family, f, file, first_file in _finding_rows(result)
+                ],
+            )
+        return run_id
+
+    # =======================
+    # QUERIES
+    # =======================
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _run(self, row) -> Dict:
+        run = dict(zip(_RUN_COLUMNS, row))
+        run["created"] = _iso(run["created"])
+        run["risky_files"] = json.loads(run["risky_files"])
+        return run
+
+    def _finding(self, row) -> Dict:
+        finding = dict(zip(_FINDING_COLUMNS, row))
+        finding["created"] = _iso(finding["created"])
+        del finding["first_file"]
+        return finding
+
+    def runs(self, repo: Optional[str] = None, since: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        """Recorded runs, newest first."""
+        where, params = [], []
+        if repo is not None:
+            where.append("repo = ?")
+            params.append(repo)
+        if since is not None:
+            where.append("created >= ?")
+            params.append(since)
+        rows = self._query(
+            f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+            "ORDER BY created DESC LIMIT ?",
+            [*params, limit],
+        )
+        return [self._run(row) for row in rows]
+
+    def trend(self, repo: str, since: Optional[float] = None) -> List[Dict]:
+        """Score, grade and breakdown of each run of ``repo``, oldest first."""
+        rows = self._query(
+            "SELECT id, created, commit_sha, score, grade, security, performance, "
+            "architecture, hygiene, "
+            "(SELECT COUNT(*) FROM findings WHERE run_id = runs.id) "
+            "FROM runs WHERE repo = ? AND created >= ? ORDER BY created",
+            (repo, since or 0),
+        )
+        return [
+            {
+                "run_id": run_id,
+                "created": _iso(created),
+                "commit_sha": commit_sha,
+                "score": score,
+                "grade": grade,
+                "breakdown": {
+                    "security": security,
+                    "performance": performance,
+                    "architecture": architecture,
+                    "hygiene": hygiene,
+                },
+                "findings": findings,
+            }
+            for (run_id, created, commit_sha, score, grade, security,
+                 performance, architecture, hygiene, findings) in rows
+        ]
+
+    def delta(self, repo: str, run_id: Optional[int] = None) -> Optional[Dict]:
+        """
+        What changed in ``run_id`` (default: the latest run of ``repo``)
+        since the run before it: score and breakdown changes, and the
+        findings whose fingerprint is new or gone. ``None`` when there is
+        no such run.
+        """
+        if run_id is None:
+            rows = self._query(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs WHERE repo = ? "
+                "ORDER BY created DESC LIMIT 2",
+                (repo,),
+            )
+        else:
+            rows = self._query(
+                f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs WHERE repo = ? AND created <= "
+                "(SELECT created FROM runs WHERE id = ?) ORDER BY created DESC LIMIT 2",
+                (repo, run_id),
+            )
+        if not rows:
+            return None
+
+        run = self._run(rows[0])
+        previous = self._run(rows[1]) if len(rows) > 1 else None
+        if previous is None:
+            return {"repo": repo, "run": run, "previous": None}
+
+        def only_in(a: int, b: int) -> List[Dict]:
+            return [self._finding(row) for row in self._query(
+                f"SELECT {', '.join(_FINDING_COLUMNS)} FROM findings WHERE run_id = ? "
+                "AND fingerprint NOT IN (SELECT fingerprint FROM findings WHERE run_id = ?)",
+                (a, b),
+            )]
+
+        return {
+            "repo": repo,
+            "run": run,
+            "previous": previous,
+            "score_change": run["score"] - previous["score"],
+            "breakdown_change": {
+                k: (run[k] or 0) - (previous[k] or 0)
+                for k in ("security", "performance", "architecture", "hygiene")
+            },
+            "new_findings": only_in(run["id"], previous["id"]),
+            "resolved_findings": only_in(previous["id"], run["id"]),
+        }
+
+    def regressions(self, since: float) -> List[Dict]:
+        """
+        Repos whose latest score is below their score at ``since`` (the
+        last run before it, or the first run after it), biggest drop
+        first.
+        """
+        rows = self._query(
+            """
+            WITH latest AS (
+                SELECT repo, id, score, MAX(created) AS created FROM runs GROUP BY repo
+            )
+            SELECT latest.repo, latest.id, latest.score, latest.created,
+                   base.id, base.score, base.created
+            FROM latest JOIN runs AS base ON base.id = COALESCE(
+                (SELECT id FROM runs WHERE repo = latest.repo AND created <= ?
+                 ORDER BY created DESC LIMIT 1),
+                (SELECT id FROM runs WHERE repo = latest.repo ORDER BY created LIMIT 1)
+            )
+            WHERE base.id != latest.id AND latest.score < base.score
+            ORDER BY latest.score - base.score, latest.repo
+            """,
+            (since,),
+        )
+        return [
+            {
+                "repo": repo,
+                "run_id": run_id,
+                "score": score,
+                "created": _iso(created),
+                "baseline_run_id": base_id,
+                "baseline_score": base_score,
+                "baseline_created": _iso(base_created),
+                "score_change": score - base_score,
+            }
+            for repo, run_id, score, created, base_id, base_score, base_created in rows
+        ]
+
+    def findings(
+        self,
+        repo: Optional[str] = None,
+        file: Optional[str] = None,
+        severity: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict]:
+        """Recorded findings matching every given filter, newest first."""
+        where, params = [], []
+        for column, value in (("repo", repo), ("file", file), ("severity", severity)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("created >= ?")
+            params.append(since)
+        rows = self._query(
+            f"SELECT {', '.join(_FINDING_COLUMNS)} FROM findings "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+            "ORDER BY created DESC LIMIT ?",
+            [*params, limit],
+        )
+        return [self._finding(row) for row in rows]
+
+    def scoring_inputs(
+        self,
+        repo: Optional[str] = None,
+        since: Optional[float] = None,
+        latest: bool = False,
+    ) -> Tuple[List[Dict], List[tuple]]:
+        """
+        What ``batch_scorer.build_columns`` needs to re-score recorded
+        runs: the runs (``id``, ``repo``, ``created``, ``score``,
+        ``grade``, ``architecture``, ``hygiene``), oldest first, and one
+        ``(run_index, family, severity)`` tuple per scored issue.
+        ``latest`` keeps only each repo's latest run.
+        """
+        where, params = ["created >= ?"], [since or 0]
+        if repo is not None:
+            where.append("repo = ?")
+            params.append(repo)
+        if latest:
+            where.append("id IN (SELECT id FROM (SELECT id, MAX(created) FROM runs GROUP BY repo))")
+
+        columns = ["id", "repo", "created", "score", "grade", "architecture", "hygiene"]
+        rows = self._query(
+            f"SELECT {', '.join(columns)} FROM runs WHERE {' AND '.join(where)} ORDER BY created",
+            params,
+        )
+        runs = [dict(zip(columns, row)) for row in rows]
+        for run in runs:
+            run["created"] = _iso(run["created"])
+
+        index = {run["id"]: i for i, run in enumerate(runs)}
+        findings = []
+        # run ids are few next to findings; ask per batch of runs
+        ids = list(index)
+        for i in range(0, len(ids), _BATCH):
+            batch = ids[i:i + _BATCH]
+            for run_id, family, severity in self._query(
+                "SELECT run_id, family, severity FROM findings "
+                f"WHERE first_file = 1 AND run_id IN ({','.join('?' * len(batch))})",
+                batch,
+            ):
+                findings.append((index[run_id], family, severity))
+        return runs, findings
+
+
+# =======================
+# CLI
+# =======================
+
+def _repo_key(repo: str) -> str:
+    # local paths are recorded resolved
+    if "://" in repo or repo.startswith("git@"):
+        return repo
+    return str(Path(repo).resolve())
+
+
+def _rescore(store: RunStore, args, since: Optional[float]) -> List[Dict]:
+    # numpy only for this command
+    from reposage.health.batch_scorer import build_columns, what_if
+
+    scenarios = {"default": None}
+    for path in args.weights:
+        scenarios[Path(path).stem] = json.loads(Path(path).read_text(encoding="utf-8"))
+
+    runs, findings = store.scoring_inputs(
+        _repo_key(args.repo) if args.repo else None, since, latest=not args.all_runs
+    )
+    columns = build_columns(
+        [run["repo"] for run in runs],
+        findings,
+        architecture=[run["architecture"] for run in runs],
+        hygiene=[run["hygiene"] for run in runs],
+    )
+    scores = what_if(columns, scenarios)
+
+    return [
+        {
+            "run_id": run["id"],
+            "repo": run["repo"],
+            "created": run["created"],
+            "recorded": {"score": run["score"], "grade": run["grade"]},
+            **{
+                name: {
+                    "score": int(result["score"][i]),
+                    "grade": str(result["grade"][i]),
+                    "breakdown": {k: int(v[i]) for k, v in result["breakdown"].items()},
+                }
+                for name, result in scores.items()
+            },
+        }
+        for i, run in enumerate(runs)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RepoSage – run history queries")
+    parser.add_argument(
+        "--db",
+        default=str(Path(".cache/reposage") / HISTORY_FILE),
+        help=f"History database (default: .cache/reposage/{HISTORY_FILE})",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runs = commands.add_parser("runs", help="Recorded runs, newest first")
+    runs.add_argument("repo", nargs="?", help="Only runs of this repository URL or path")
+    runs.add_argument("--days", type=float, help="Only runs from the last DAYS days")
+    runs.add_argument("--limit", type=int, default=100)
+
+    trend = commands.add_parser("trend", help="Score of each run of a repository")
+    trend.add_argument("repo")
+    trend.add_argument("--days", type=float, help="Only runs from the last DAYS days")
+
+    delta = commands.add_parser("delta", help="What changed since the previous run")
+    delta.add_argument("repo")
+    delta.add_argument("--run", type=int, help="Run id (default: the latest run)")
+
+    regressions = commands.add_parser("regressions", help="Repositories whose score dropped")
+    regressions.add_argument("--days", type=float, default=7, help="Window in days (default: 7)")
+
+    findings = commands.add_parser("findings", help="Recorded findings, newest first")
+    findings.add_argument("--repo")
+    findings.add_argument("--file")
+    findings.add_argument("--severity", choices=["High", "Medium", "Low"])
+    findings.add_argument("--days", type=float, help="Only findings from the last DAYS days")
+    findings.add_argument("--limit", type=int, default=100)
+
+    rescore = commands.add_parser(
+        "rescore", help="Re-score recorded runs under alternative weight tables"
+    )
+    rescore.add_argument(
+        "weights", nargs="*",
+        help="JSON weight tables shaped like reposage.health.scorer.DEFAULT_WEIGHTS "
+             "(partial tables override the defaults); each is one what-if scenario",
+    )
+    rescore.add_argument("--repo", help="Only runs of this repository URL or path")
+    rescore.add_argument("--days", type=float, help="Only runs from the last DAYS days")
+    rescore.add_argument("--all-runs", action="store_true", help="Every run, not just each repo's latest")
+
+    args = parser.parse_args()
+    if not Path(args.db).exists():
+        parser.error(f"No history at {args.db}; record runs with --history")
+
+    since = time.time() - args.days * 86400 if getattr(args, "days", None) is not None else None
+    with RunStore(args.db) as store:
+        if args.command == "runs":
+            body = store.runs(_repo_key(args.repo) if args.repo else None, since, args.limit)
+        elif args.command == "trend":
+            body = store.trend(_repo_key(args.repo), since)
+        elif args.command == "delta":
+            body = store.delta(_repo_key(args.repo), args.run)
+        elif args.command == "regressions":
+            body = store.regressions(since)
+        elif args.command == "rescore":
+            body = _rescore(store, args, since)
+        else:
+            body = store.findings(
+                _repo_key(args.repo) if args.repo else None,
+                args.file, args.severity, since, args.limit,
+            )
+
+    print(json.dumps(body, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+On-disk cache of LLM responses for the crew agents.
+
+Each agent's LLM is wrapped in a CachedLLM. A call is keyed by the model,
+its sampling settings, the rendered messages (which carry every tool
+result the agent has seen so far), the tool schemas and the requested
+response model. Identical calls on later runs are answered from disk.
+
+In replay mode nothing is sent to the provider: a call that was not
+recorded raises LLMCacheMiss instead.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from crewai import LLM
+from crewai.llms.base_llm import BaseLLM
+from crewai.utilities.agent_utils import extract_tool_call_info
+from pydantic import BaseModel
+
+from reposage.llm.response_store import ResponseStore
+
+# Bump when the key or the stored response format changes
+CACHE_FORMAT = 1
+
+# Placeholder key for replay runs; the provider client is built for its
+# capabilities (tool calling, stop words) but never called.
+_REPLAY_API_KEY = "replay-only"
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode for a call that was never recorded."""
+
+
+# =======================
+# KEYS AND PAYLOADS
+# =======================
+
+def _jsonable(value: Any) -> Any:
+    # Tool objects and response models have no stable repr; key them by
+    # their schema instead so keys do not depend on memory addresses.
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return value.model_json_schema()
+    if isinstance(value, BaseModel):
+        name = getattr(value, "name", None)
+        return name if isinstance(name, str) else value.model_dump(mode="json")
+    return type(value).__name__
+
+
+def request_key(model: str, settings: Dict, messages: Any, tools: Any, response_model: Any) -> str:
+    payload = json.dumps(
+        {
+            "format": CACHE_FORMAT,
+            "model": model,
+            "settings": settings,
+            "messages": messages,
+            "tools": tools,
+            "response_model": response_model,
+        },
+        sort_keys=True,
+        default=_jsonable,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _encode_response(answer: Any) -> Optional[Dict]:
+    if isinstance(answer, str):
+        return {"kind": "text", "value": answer}
+    if isinstance(answer, BaseModel):
+        return {"kind": "model", "value": answer.model_dump(mode="json")}
+    if isinstance(answer, list) and answer:
+        # native tool calls; stored in the OpenAI dict shape crewai accepts
+        calls = []
+        for call in answer:
+            info = extract_tool_call_info(call)
+            if info is None:
+                return None
+            call_id, name, arguments = info
+            calls.append({
+                "id": call_id,
+                "type": "function",
+                "function": {"name": name, "arguments": arguments},
+            })
+        return {"kind": "tool_calls", "value": calls}
+    return None
+
+
+def _decode_response(entry: Dict, response_model: Optional[type]) -> Any:
+    if entry["kind"] == "model" and response_model is not None:
+        return response_model.model_validate(entry["value"])
+    return entry["value"]
+
+
+# =======================
+# LLM WRAPPER
+# =======================
+
+class CachedLLM(BaseLLM):
+    """
+    Wraps a provider LLM and answers repeated calls from a ResponseStore.
+
+    ``replay=True`` never calls the provider: unrecorded calls raise
+    LLMCacheMiss, so a replayed run is offline and deterministic.
+    """
+
+    def __init__(self, model: str, store: ResponseStore, replay: bool = False, **kwargs: Any):
+        if replay:
+            kwargs.setdefault("api_key", _REPLAY_API_KEY)
+        self.inner = LLM(model=model, **kwargs)
+        super().__init__(model=model, temperature=self.inner.temperature)
+        self.store = store
+        self.replay = replay
+
+    def _key(self, messages, tools, response_model) -> str:
+        settings = {"temperature": self.temperature, "stop": sorted(self.stop)}
+        return request_key(self.model, settings, messages, tools, response_model)
+
+    def call(
+        self,
+        messages,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task=None,
+        from_agent=None,
+        response_model=None,
+    ):
+        key = self._key(messages, tools, response_model)
+
+        entry = self.store.get(key)
+        if entry is not None:
+            return _decode_response(entry, response_model)
+
+        if self.replay:
+            task = getattr(from_task, "name", None) or "unknown task"
+            raise LLMCacheMiss(
+                f"No recorded response for {self.model} ({task}); "
+                "run once with the LLM cache in record mode first"
+            )
+
+        # the agent executor sets stop words on the wrapper
+        self.inner.stop = self.stop
+        answer = self.inner.call(
+            messages,
+            tools=tools,
+            callbacks=callbacks,
+            available_functions=available_functions,
+            from_task=from_task,
+            from_agent=from_agent,
+            response_model=response_model,
+        )
+
+        encoded = _encode_response(answer)
+        if encoded is not None:
+            self.store.put(key, self.model, encoded)
+        return answer
+
+    # capabilities come from the wrapped provider so recorded and
+    # replayed runs build the same prompts
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def supports_multimodal(self) -> bool:
+        return self.inner.supports_multimodal()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        return self.inner.get_token_usage_summary()
@@ -0,0 +1,70 @@
+"""
+LLM wrapper that records every call as a tracing span, with the tokens
+the wrapped LLM reports for it.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from crewai.llms.base_llm import BaseLLM
+
+from reposage.tracing import LLM_CALL, TOKEN_COUNTERS, span
+
+
+def _usage(llm: BaseLLM) -> Dict[str, int]:
+    summary = llm.get_token_usage_summary()
+    return {counter: getattr(summary, counter, 0) or 0 for counter in TOKEN_COUNTERS}
+
+
+class TracedLLM(BaseLLM):
+    """Wraps any BaseLLM (provider, CachedLLM or StubLLM) and traces its calls."""
+
+    def __init__(self, inner: BaseLLM):
+        super().__init__(model=inner.model, temperature=inner.temperature)
+        self.inner = inner
+
+    def call(
+        self,
+        messages,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task=None,
+        from_agent=None,
+        response_model=None,
+    ):
+        task = getattr(from_task, "name", None)
+        with span(self.model, LLM_CALL, model=self.model, task=task) as s:
+            before = _usage(self.inner)
+
+            # the agent executor sets stop words on the wrapper
+            self.inner.stop = self.stop
+            answer = self.inner.call(
+                messages,
+                tools=tools,
+                callbacks=callbacks,
+                available_functions=available_functions,
+                from_task=from_task,
+                from_agent=from_agent,
+                response_model=response_model,
+            )
+
+            # each agent owns its LLM and calls it sequentially, so the
+            # usage delta belongs to this call
+            after = _usage(self.inner)
+            s.set(**{counter: after[counter] - before[counter] for counter in TOKEN_COUNTERS})
+            return answer
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def supports_multimodal(self) -> bool:
+        return self.inner.supports_multimodal()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        return self.inner.get_token_usage_summary()
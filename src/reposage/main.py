@@ -1,14 +1,22 @@
 #!/usr/bin/env python
 import argparse
+import os
 import warnings
 from pathlib import Path
 
-from reposage.crew import RepoSageCrew
-from reposage.output.summary_generator import generate_summary_json
-from reposage.output.report_generator import generate_report_md
-from reposage.output.report_pdf_generator import generate_report_pdf
-
-from reposage.output.normalize_output import normalize_output
+from reposage.analysis.context_builder import DEFAULT_TOKEN_BUDGET
+from reposage.batch import CPU_WORKERS, LLM_WORKERS, RETRIES, run_batch
+from reposage.history import HISTORY_FILE, RunStore
+from reposage.llm.response_store import DEFAULT_TTL_SECONDS, ResponseStore
+from reposage.pipeline import (
+    DEFAULT_CACHE_DIR,
+    detector_outputs,
+    prepare_repo,
+    run_crew,
+    write_artifacts,
+)
+from reposage.sharding import SHARD_WORKERS, analyze_shards
+from reposage.tracing import Tracer
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -24,12 +32,60 @@ def parse_args():
         help="GitHub repository URL (e.g. https://github.com/user/repo)",
     )
 
+    parser.add_argument(
+        "--ref",
+        type=str,
+        default=None,
+        help="Branch, tag or commit to analyze with --repo (default: remote HEAD)",
+    )
+
+    parser.add_argument(
+        "--base",
+        type=str,
+        default=None,
+        help="Diff mode: analyze only files changed since the merge base "
+             "with this ref, and report new and resolved findings",
+    )
+
+    parser.add_argument(
+        "--head",
+        type=str,
+        default=None,
+        help="Diff mode: the ref compared with --base. With --repo it is "
+             "checked out (default: remote HEAD); with --path it must be "
+             "checked out (default: the working tree, uncommitted changes "
+             "included)",
+    )
+
     parser.add_argument(
         "--path",
         type=str,
         help="Local repository path (e.g. ./my-repo)",
     )
 
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="MANIFEST",
+        help="Analyze every repository listed in MANIFEST (one URL or path, "
+             "optionally followed by a ref, per line)",
+    )
+
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Monorepo mode: split the repository into services (directories "
+             "with a dependency manifest, else top-level directories), analyze "
+             "them in parallel and merge the results with a score per shard",
+    )
+
+    parser.add_argument(
+        "--shard-workers",
+        type=int,
+        default=SHARD_WORKERS,
+        help=f"Shards analyzed at once with --shards (default: {SHARD_WORKERS})",
+    )
+
     parser.add_argument(
         "--out",
         type=str,
@@ -37,70 +93,258 @@ def parse_args():
         help="Output directory (default: outputs/)",
     )
 
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for the detector pre-pass (default: CPU count)",
+    )
+
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=DEFAULT_TOKEN_BUDGET,
+        help=f"Token budget of the repository digest given to each analysis "
+             f"task (default: {DEFAULT_TOKEN_BUDGET})",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for the findings cache (default: .cache/reposage/)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Analyze every file even if its content was seen before",
+    )
+
+    parser.add_argument(
+        "--llm-cache",
+        choices=["record", "replay", "off"],
+        default="record",
+        help="LLM response cache: reuse and record responses (record), "
+             "serve recorded responses only, with no network calls (replay), "
+             "or always call the model (off). Default: record",
+    )
+
+    parser.add_argument(
+        "--llm-cache-ttl",
+        type=float,
+        default=DEFAULT_TTL_SECONDS / 3600,
+        help="Hours a recorded LLM response stays valid (default: 168)",
+    )
+
+    parser.add_argument(
+        "--no-llm",
+        action="store_true",
+        help="Run only the scanner, detectors and scorer and write "
+             "summary.json; no LLM calls, no crewai import (for pre-commit "
+             "hooks and CI)",
+    )
+
+    parser.add_argument(
+        "--history",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="DB",
+        help="Record the run, its scores and findings in a SQLite history "
+             "(default DB: <cache-dir>/history.sqlite); query it with "
+             "python -m reposage.history",
+    )
+
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Also write trace.json, an OpenTelemetry (OTLP/JSON) trace of "
+             "the run, next to summary.json",
+    )
+
+    parser.add_argument(
+        "--batch-cpu",
+        type=int,
+        default=CPU_WORKERS,
+        help=f"Repos cloned and pre-scanned at once in --batch mode (default: {CPU_WORKERS})",
+    )
+
+    parser.add_argument(
+        "--batch-llm",
+        type=int,
+        default=LLM_WORKERS,
+        help=f"Crews run at once in --batch mode (default: {LLM_WORKERS})",
+    )
+
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=RETRIES,
+        help=f"Retries per failed repo stage in --batch mode (default: {RETRIES})",
+    )
+
     args = parser.parse_args()
 
+    if args.no_cache and args.llm_cache == "record":
+        args.llm_cache = "off"
+
     # Exactly one input source required
-    if not args.repo and not args.path:
-        parser.error("One of --repo or --path is required")
+    sources = [s for s in (args.repo, args.path, args.batch) if s]
+    if not sources:
+        parser.error("One of --repo, --path or --batch is required")
+
+    if len(sources) > 1:
+        parser.error("Use only one of --repo, --path or --batch")
+
+    if args.ref and not args.repo:
+        parser.error("--ref only applies to --repo")
 
-    if args.repo and args.path:
-        parser.error("Use only one of --repo or --path")
+    if args.no_llm and args.batch:
+        parser.error("--no-llm does not apply to --batch")
+
+    if args.head and not args.base:
+        parser.error("--head requires --base")
+
+    if args.base and args.batch:
+        parser.error("--base does not apply to --batch")
+
+    if args.head and args.ref:
+        parser.error("Use --head instead of --ref in diff mode")
+
+    if args.shards and (args.batch or args.base):
+        parser.error("--shards does not apply to --batch or --base")
 
     return args
 
 
+def _response_store(args):
+    if args.llm_cache == "replay":
+        # replay must not touch the network, telemetry included
+        os.environ["CREWAI_DISABLE_TELEMETRY"] = "true"
+        os.environ["OTEL_SDK_DISABLED"] = "true"
+
+    if args.llm_cache == "off":
+        return None
+    return ResponseStore(
+        Path(args.cache_dir) / "llm_responses.sqlite",
+        ttl=args.llm_cache_ttl * 3600,
+    )
+
+
+def _history(args):
+    if args.history is None:
+        return None
+    return RunStore(args.history or Path(args.cache_dir) / HISTORY_FILE)
+
+
 def run():
     args = parse_args()
+    cache_dir = None if args.no_cache else args.cache_dir
+    llm_store = None if args.no_llm else _response_store(args)
+    replay = args.llm_cache == "replay"
+    history = _history(args)
 
-    inputs = {}
-    if args.repo:
-        inputs["repo"] = args.repo
-    else:
-        inputs["repo"] = str(Path(args.path).resolve())
+    if args.batch:
+        index = run_batch(
+            args.batch,
+            out_dir=args.out,
+            cpu_workers=args.batch_cpu,
+            llm_workers=args.batch_llm,
+            retries=args.retries,
+            workers=args.workers,
+            cache_dir=cache_dir,
+            context_tokens=args.context_tokens,
+            llm_store=llm_store,
+            replay=replay,
+            trace=args.trace,
+            history=history,
+        )
+        if llm_store is not None:
+            llm_store.close()
+        if history is not None:
+            history.close()
 
-    # crew = RepoSageCrew().crew()
-    # result = crew.kickoff(inputs=inputs)
-    result = RepoSageCrew().crew().kickoff(inputs=inputs)
+        print(f"\n✅ RepoSage batch completed: {index['succeeded']}/{index['total']} repos analyzed")
+        return index
 
-    # ------------------------------
-    # Extract task outputs (CrewAI 1.9.x safe)
-    # ------------------------------
-    outputs = {}
-    for task_output in result.tasks_output:
-        outputs[task_output.name] = normalize_output(task_output.raw)
+    tracer = Tracer()
+    with tracer.activate():
+        # ------------------------------
+        # Deterministic detector pre-pass (no LLM)
+        # ------------------------------
+        shards = None
+        if args.shards:
+            sharded = analyze_shards(
+                repo=args.repo,
+                path=args.path,
+                ref=args.ref,
+                shard_workers=args.shard_workers,
+                workers=args.workers,
+                cache_dir=cache_dir,
+                context_tokens=args.context_tokens,
+                llm_store=llm_store,
+                replay=replay,
+                no_llm=args.no_llm,
+            )
+            outputs, shards, diff = sharded["outputs"], sharded["shards"], None
+        else:
+            prepared = prepare_repo(
+                repo=args.repo,
+                path=args.path,
+                ref=args.ref,
+                workers=args.workers,
+                cache_dir=cache_dir,
+                context_tokens=args.context_tokens,
+                contexts=not args.no_llm,
+                base=args.base,
+                head=args.head,
+            )
+            diff = prepared["diff"]
 
-    out_dir = Path(args.out)
-    out_dir.mkdir(parents=True, exist_ok=True)
+            if args.no_llm:
+                outputs = detector_outputs(prepared)
+            else:
+                outputs = run_crew(prepared, llm_store=llm_store, replay=replay)
 
-    # ------------------------------
-    # Generate artifacts
-    # ------------------------------
-    generate_summary_json(
-        outputs.get("scan_repository"),
-        outputs.get("analyze_architecture"),
-        outputs.get("security_analysis"),
-        outputs.get("performance_analysis"),
-        outputs.get("plan_roadmap"),
-        output_path=out_dir / "summary.json",
-    )
+        if llm_store is not None:
+            print(f"🧠 LLM cache: {llm_store.hits} hits, {llm_store.misses} misses")
+            llm_store.close()
 
-    generate_report_md(
-        outputs.get("scan_repository"),
-        outputs.get("analyze_architecture"),
-        outputs.get("security_analysis"),
-        outputs.get("performance_analysis"),
-        outputs.get("plan_roadmap"),
-        output_path=out_dir / "report.md",
-    )
+        # ------------------------------
+        # Generate artifacts
+        # ------------------------------
+        out_dir = write_artifacts(
+            outputs,
+            args.out,
+            pdf=not args.no_llm,
+            markdown=not args.no_llm,
+            tracer=tracer,
+            diff=diff,
+            shards=shards,
+            history=history,
+            repo=args.repo or str(Path(args.path).resolve()),
+        )
+        if history is not None:
+            print(f"🗂️  Run recorded in {history.path}")
+            history.close()
 
-    generate_report_pdf(
-        outputs["scan_repository"],
-        outputs["analyze_architecture"],
-        outputs["security_analysis"],
-        outputs["performance_analysis"],
-        outputs["plan_roadmap"],
-    )
+    if diff:
+        new = sum(len(f) for f in diff["new_findings"].values())
+        resolved = sum(len(f) for f in diff["resolved_findings"].values())
+        print(f"🔀 {len(diff['changed_files'])} files changed since {diff['base']}: "
+              f"{new} new findings, {resolved} resolved")
+
+    if shards:
+        print(f"🧩 {len(shards)} shards: " + ", ".join(
+            f"{s['name']} {s['health_score']['score']}" for s in shards
+        ))
 
+    metrics = tracer.metrics()
+    print(f"⏱️  {metrics['wall_s']:.1f}s wall, {metrics['cpu_s']:.1f}s CPU, "
+          f"{metrics['llm_calls']} LLM calls, {metrics['total_tokens']} tokens")
+    if args.trace:
+        print(f"🧭 Trace written to {tracer.export(out_dir / 'trace.json').resolve()}")
 
     print("\n✅ RepoSage execution completed")
     print(f"📄 Outputs written to: {out_dir.resolve()}\n")
@@ -121,3 +365,6 @@ if __name__ == "__main__":
 # python -m reposage.main \
 #   --repo https://github.com/saidul-mondal-au7/rag_medical_chatbot.git
 # python -m reposage.main --path ./my-local-repo
+# python -m reposage.main --path . --no-llm
+# python -m reposage.main --path . --base origin/main --no-llm
+# python -m reposage.main --batch repos.txt --out outputs/org
@@ -3,7 +3,8 @@ Shared helpers to normalize CrewAI task outputs
 into predictable Python structures.
 """
 
-from typing import Any
+import json
+from typing import Any, Dict
 from pydantic import BaseModel
 
 
@@ -36,3 +37,30 @@ def normalize_output(obj: Any):
     # primitives (str, int, float, bool)
     return obj
 
+
+
+def force_dict(obj: Any) -> Dict:
+    """
+    CrewAI 1.9.3–safe coercion of a task output to a dict:
+    - dict → dict
+    - Pydantic → dict
+    - JSON string → dict
+    - anything else → {}
+    """
+    if obj is None:
+        return {}
+
+    if isinstance(obj, dict):
+        return obj
+
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+
+    if isinstance(obj, str):
+        try:
+            parsed = json.loads(obj)
+            return parsed if isinstance(parsed, dict) else {}
+        except Exception:
+            return {}
+
+    return {}
@@ -1,32 +1,8 @@
 from typing import List
 from pathlib import Path
-import json
-from pydantic import BaseModel
-
-from reposage.health.risky_files import extract_top_risky_files
-
-# ==========================================================
-# Safe coercion (CrewAI 1.9.3 compatible)
-# ==========================================================
-def _force_dict(obj):
-    if obj is None:
-        return {}
-
-    if isinstance(obj, dict):
-        return obj
-
-    if isinstance(obj, BaseModel):
-        return obj.model_dump()
-
-    if isinstance(obj, str):
-        try:
-            parsed = json.loads(obj)
-            return parsed if isinstance(parsed, dict) else {}
-        except Exception:
-            return {}
-
-    return {}
 
+from reposage.output.result import AnalysisResult, issue_label
+from reposage.tracing import REPORT, traced
 
 # ==========================================================
 # Severity ranking
@@ -38,21 +14,6 @@ SEVERITY_ORDER = {
 }
 
 
-# ==========================================================
-# Repo Health Score
-# ==========================================================
-def calculate_repo_score(security: dict, performance: dict) -> int:
-    score = 100
-
-    for issue in security.get("issues", []):
-        score -= {"High": 10, "Medium": 6, "Low": 3}.get(issue.get("severity"), 0)
-
-    for issue in performance.get("issues", []):
-        score -= {"High": 8, "Medium": 5, "Low": 2}.get(issue.get("severity"), 0)
-
-    return max(score, 0)
-
-
 # ==========================================================
 # Quick Wins
 # ==========================================================
@@ -70,27 +31,18 @@ def extract_top_quick_wins(roadmap: dict, limit: int = 5):
 # ==========================================================
 # Markdown Report Generator
 # ==========================================================
+@traced("report_md", REPORT)
 def generate_report_md(
-    scan_output,
-    architecture_output,
-    security_output,
-    performance_output,
-    roadmap_output,
+    result: AnalysisResult,
     output_path: str = "outputs/report.md",
 ):
     """
     Generate a human-readable Markdown report.
     Guaranteed not to drop CrewAI data.
     """
-
-    # --------------------------------------------------
-    # Normalize safely (NO DATA LOSS)
-    # --------------------------------------------------
-    scan = _force_dict(scan_output)
-    architecture = _force_dict(architecture_output)
-    security = _force_dict(security_output)
-    performance = _force_dict(performance_output)
-    roadmap = _force_dict(roadmap_output)
+    scan = result.scan
+    architecture = result.architecture
+    roadmap = result.roadmap
 
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -112,13 +64,41 @@ def generate_report_md(
         f"- **Detected Languages**: {', '.join(scan.get('detected_languages', []))}\n"
     )
 
+    # ==========================================================
+    # Changes Since Base (diff mode)
+    # ==========================================================
+    diff = result.diff
+    if diff:
+        new = diff["new_findings"]["security"] + diff["new_findings"]["performance"]
+        resolved = diff["resolved_findings"]["security"] + diff["resolved_findings"]["performance"]
+
+        lines.append(f"## Changes Since `{diff['base']}`\n")
+        lines.append(f"- **Head**: `{diff['head']}` (merge base `{diff['merge_base'][:12]}`)")
+        lines.append(f"- **Changed Files**: {len(diff['changed_files'])} "
+                     f"({len(diff['deleted_files'])} deleted)")
+        lines.append(f"- **New Findings**: {len(new)}")
+        lines.append(f"- **Resolved Findings**: {len(resolved)}\n")
+
+        if new:
+            new.sort(key=lambda f: SEVERITY_ORDER.get(f.get("severity"), 0), reverse=True)
+            lines.append("| # | Issue | Severity | File | Line |")
+            lines.append("|---|-------|----------|------|------|")
+            for idx, f in enumerate(new[:20], start=1):
+                line = f.get("line") or f.get("line_start") or ""
+                lines.append(
+                    f"| {idx} | {f.get('issue')} | {f.get('severity')} | {f.get('file')} | {line} |"
+                )
+            lines.append("")
+            if len(new) > 20:
+                lines.append(f"... and {len(new) - 20} more new findings\n")
+
     # ==========================================================
     # Repository Health Score
     # ==========================================================
-    repo_score = calculate_repo_score(security, performance)
+    repo_score = result.health["score"]
 
     lines.append("## Repository Health Score\n")
-    lines.append(f"**Overall Score: {repo_score} / 100**\n")
+    lines.append(f"**Overall Score: {repo_score} / 100 (Grade {result.health['grade']})**\n")
 
     if repo_score >= 85:
         lines.append("🟢 **Excellent** – Minimal risk, well-structured codebase.\n")
@@ -129,6 +109,23 @@ def generate_report_md(
     else:
         lines.append("🔴 **Poor** – High-risk codebase; immediate action required.\n")
 
+    # ==========================================================
+    # Shards (sharded runs)
+    # ==========================================================
+    if result.shards:
+        lines.append("## Shards\n")
+        lines.append("The overall score is the shards' scores weighted by file count.\n")
+        lines.append("| Shard | Files | Architecture | Security Issues | Performance Issues | Score | Grade |")
+        lines.append("|-------|-------|--------------|-----------------|--------------------|-------|-------|")
+        for shard in result.shards:
+            health = shard["health_score"]
+            lines.append(
+                f"| {shard['name']} | {shard['files']} | {shard['architecture_type'] or 'N/A'} | "
+                f"{shard['security_issues']} | {shard['performance_issues']} | "
+                f"{health['score']} | {health['grade']} |"
+            )
+        lines.append("")
+
     # ==========================================================
     # Top 10 Critical Issues
     # ==========================================================
@@ -136,20 +133,20 @@ def generate_report_md(
 
     combined_issues = []
 
-    for issue in security.get("issues", []):
+    for issue in result.security_issues:
         combined_issues.append({
             "category": "Security",
-            "issue": issue.get("issue"),
+            "issue": issue_label(issue),
             "severity": issue.get("severity"),
             # "file": ", ".join(issue.get("affected_files", [])) or "N/A",
             "file": ", ".join(issue.get("affected_files") or []) or "N/A",
             "fix": issue.get("recommended_fix"),
         })
 
-    for issue in performance.get("issues", []):
+    for issue in result.performance_issues:
         combined_issues.append({
             "category": "Performance",
-            "issue": issue.get("issue"),
+            "issue": issue_label(issue),
             "severity": issue.get("severity"),
             "file": issue.get("affected_file") or "N/A",
             "fix": issue.get("recommended_fix"),
@@ -207,19 +204,36 @@ def generate_report_md(
     # ==========================================================
     lines.append("\n## Top Risky Files\n")
 
-    risky_files = extract_top_risky_files(security, performance)
+    risky_files = result.risky_files
 
     if not risky_files:
         lines.append("No high-risk files detected.\n")
     else:
-        lines.append("| # | File | Risk Score | Security Issues | Performance Issues |\n")
-        lines.append("|---|------|------------|-----------------|--------------------|\n")
+        lines.append("Ranked by risk density: severity-weighted score per 1000 lines.\n")
+        lines.append("| # | File | Risk Score | Density | Security Issues | Performance Issues |")
+        lines.append("|---|------|------------|---------|-----------------|--------------------|")
 
         for idx, rf in enumerate(risky_files, start=1):
             lines.append(
-                f"| {idx} | {rf['file']} | {rf['risk_score']} | "
-                f"{rf['security_issues']} | {rf['performance_issues']} |\n"
+                f"| {idx} | {rf['file']} | {rf['risk_score']} | {rf['risk_density']} | "
+                f"{rf['security_issues']} | {rf['performance_issues']} |"
+            )
+        lines.append("")
+
+    # ==========================================================
+    # Hot Subtrees
+    # ==========================================================
+    hot_dirs = result.risk_rollups["directories"]
+    if hot_dirs:
+        lines.append("## Risky Directories\n")
+        lines.append("| # | Directory | Risk Score | Density | Risky Files | Lines (est.) |")
+        lines.append("|---|-----------|------------|---------|-------------|--------------|")
+        for idx, rd in enumerate(hot_dirs, start=1):
+            lines.append(
+                f"| {idx} | {rd['directory']}/ | {rd['risk_score']} | {rd['risk_density']} | "
+                f"{rd['risky_files']} | {rd['estimated_lines']} |"
             )
+        lines.append("")
 
 
     # ==========================================================
@@ -1,66 +1,30 @@
-import json
 from pathlib import Path
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import (
-    SimpleDocTemplate,
-    Paragraph,
-    Spacer,
-    ListFlowable,
-    ListItem,
-)
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
 
-from .normalize_output import normalize_output
-from reposage.health.scorer import calculate_health_score
+from reposage.output.result import AnalysisResult, issue_label
+from reposage.tracing import REPORT, traced
 
 
-def _force_dict(obj):
-    """
-    Force CrewAI outputs into dict safely.
-    Handles:
-    - dict
-    - Pydantic
-    - JSON string
-    - garbage
-    """
-    if obj is None:
-        return {}
-
-    if isinstance(obj, dict):
-        return obj
-
-    if hasattr(obj, "model_dump"):
-        return obj.model_dump()
-
-    if isinstance(obj, str):
-        try:
-            return json.loads(obj)
-        except Exception:
-            return {}
-
-    return {}
-
+@traced("report_pdf", REPORT)
 def generate_report_pdf(
-    scan_output,
-    architecture_output,
-    security_output,
-    performance_output,
-    roadmap_output,
+    result: AnalysisResult,
     output_path: str = "outputs/report.pdf",
 ):
-    # --------------------------------------------------
-    # FORCE everything into dicts (CRITICAL FIX)
-    # --------------------------------------------------
-    scan = _force_dict(normalize_output(scan_output))
-    architecture = _force_dict(normalize_output(architecture_output))
-    security = _force_dict(normalize_output(security_output))
-    performance = _force_dict(normalize_output(performance_output))
-    roadmap = _force_dict(normalize_output(roadmap_output))
+    # reportlab is only imported when a PDF is actually requested
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import (
+        SimpleDocTemplate,
+        Paragraph,
+        Spacer,
+        ListFlowable,
+        ListItem,
+    )
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_LEFT, TA_CENTER
 
-    health = calculate_health_score(
-            scan, architecture, security, performance
-        )
+    scan = result.scan
+    architecture = result.architecture
+    roadmap = result.roadmap
+    health = result.health
 
     # --------------------------------------------------
     # Output path
@@ -142,6 +106,18 @@ def generate_report_pdf(
     for k, v in health["breakdown"].items():
         elements.append(Paragraph(f"- {k.title()}: {v}", styles["Body"]))
 
+    # sharded runs: one line per shard
+    if result.shards:
+        elements.append(Paragraph("Shards", styles["Section"]))
+        for shard in result.shards:
+            elements.append(Paragraph(
+                f"<b>{shard['name']}</b>: {shard['health_score']['score']} / 100 "
+                f"(Grade {shard['health_score']['grade']}), {shard['files']} files, "
+                f"{shard['security_issues']} security and "
+                f"{shard['performance_issues']} performance issues",
+                styles["Body"],
+            ))
+
 
 
     # ==================================================
@@ -179,7 +155,7 @@ def generate_report_pdf(
     elements.append(Spacer(1, 12))
     elements.append(Paragraph("Security Findings", styles["Section"]))
 
-    security_issues = security.get("issues", [])
+    security_issues = result.security_issues
     if not security_issues:
         elements.append(Paragraph("No security issues detected.", styles["Body"]))
     else:
@@ -188,7 +164,7 @@ def generate_report_pdf(
                 [
                     ListItem(
                         Paragraph(
-                            f"<b>{i.get('severity')}:</b> {i.get('issue')}",
+                            f"<b>{i.get('severity')}:</b> {issue_label(i)}",
                             styles["Body"],
                         )
                     )
@@ -204,7 +180,7 @@ def generate_report_pdf(
     elements.append(Spacer(1, 12))
     elements.append(Paragraph("Performance Findings", styles["Section"]))
 
-    perf_issues = performance.get("issues", [])
+    perf_issues = result.performance_issues
     if not perf_issues:
         elements.append(Paragraph("No performance issues detected.", styles["Body"]))
     else:
@@ -213,7 +189,7 @@ def generate_report_pdf(
                 [
                     ListItem(
                         Paragraph(
-                            f"<b>{i.get('severity')}:</b> {i.get('issue')}",
+                            f"<b>{i.get('severity')}:</b> {issue_label(i)}",
                             styles["Body"],
                         )
                     )
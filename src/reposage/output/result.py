@@ -0,0 +1,114 @@
+"""
+The normalized result of one run, shared by every renderer.
+
+``build_result`` coerces the five task outputs to dicts, merges
+duplicate findings and scores them once; summary.json, report.md and
+report.pdf are all rendered from the same ``AnalysisResult``, so they
+never disagree and none of them re-normalizes or re-scores anything.
+"""
+
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from reposage.analysis.fingerprint import dedupe_findings
+from reposage.health.risky_files import risk_aggregator
+from reposage.health.scorer import calculate_health_score, combine_health_scores
+from reposage.output.normalize_output import force_dict, normalize_output
+
+TASK_NAMES = [
+    "scan_repository",
+    "analyze_architecture",
+    "security_analysis",
+    "performance_analysis",
+    "plan_roadmap",
+]
+
+# Outputs entry with the detector pre-pass findings ({"security": [...],
+# "performance": [...]}), so files the crew did not list are still ranked
+DETECTOR_FINDINGS = "detector_findings"
+
+
+class AnalysisResult(NamedTuple):
+    scan: Dict
+    architecture: Dict
+    security: Dict
+    performance: Dict
+    roadmap: Dict
+    # calculate_health_score: score, grade, breakdown (for a sharded
+    # run, the shards' scores weighted by file count)
+    health: Dict
+    # RiskAggregator.top_files, highest risk density first
+    risky_files: List[Dict]
+    # RiskAggregator.rollups: {"directories": [...], "modules": [...]}
+    risk_rollups: Dict
+    # diff mode only: see reposage.analysis.diff
+    diff: Optional[Dict] = None
+    # sharded runs only: see reposage.sharding
+    shards: Optional[List[Dict]] = None
+
+    @property
+    def repo_path(self) -> str:
+        return self.scan.get("repo_path") or "unknown"
+
+    @property
+    def repo_name(self) -> str:
+        return Path(self.repo_path).name if self.repo_path != "unknown" else "unknown"
+
+    @property
+    def security_issues(self) -> List[Dict]:
+        return self.security.get("issues") or []
+
+    @property
+    def performance_issues(self) -> List[Dict]:
+        return self.performance.get("issues") or []
+
+
+def issue_label(issue: Dict) -> str:
+    """The issue text, with its occurrence count when duplicates were merged."""
+    occurrences = issue.get("occurrences") or 1
+    text = str(issue.get("issue"))
+    return f"{text} (×{occurrences})" if occurrences > 1 else text
+
+
+def build_result(
+    outputs: Dict,
+    diff: Optional[Dict] = None,
+    shards: Optional[List[Dict]] = None,
+) -> AnalysisResult:
+    """``AnalysisResult`` from task outputs keyed by task name (any may be missing)."""
+    scan, architecture, security, performance, roadmap = (
+        force_dict(normalize_output(outputs.get(name))) for name in TASK_NAMES
+    )
+    # one issue per fingerprint, with the detector findings that restate
+    # a crew issue folded into its occurrence count
+    detected = outputs.get(DETECTOR_FINDINGS) or {}
+    repo_path = scan.get("repo_path")
+    security = dict(security, issues=dedupe_findings(
+        security.get("issues") or [], "security", detected.get("security"), repo_path
+    ))
+    performance = dict(performance, issues=dedupe_findings(
+        performance.get("issues") or [], "performance", detected.get("performance"), repo_path
+    ))
+    detected = {
+        family: dedupe_findings(findings or [], family, repo_path=repo_path)
+        for family, findings in detected.items()
+    }
+    risk = risk_aggregator(security, performance, detected, scan.get("file_lines"))
+    if shards:
+        health = combine_health_scores(
+            [s["health_score"] for s in shards], [s["files"] for s in shards]
+        )
+    else:
+        health = calculate_health_score(scan, architecture, security, performance)
+    return AnalysisResult(
+        scan=scan,
+        architecture=architecture,
+        security=security,
+        performance=performance,
+        roadmap=roadmap,
+        health=health,
+        risky_files=risk.top_files(),
+        risk_rollups=risk.rollups(),
+        diff=diff,
+        shards=shards,
+    )
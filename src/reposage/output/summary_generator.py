@@ -1,52 +1,21 @@
 import json
 from pathlib import Path
-from pydantic import BaseModel
-from reposage.health.scorer import calculate_health_score
-from reposage.health.risky_files import extract_top_risky_files
+from typing import Dict, Optional
 
-def _force_dict(obj):
-    """
-    CrewAI 1.9.3–safe coercion:
-    - dict → dict
-    - Pydantic → dict
-    - JSON string → dict
-    - anything else → {}
-    """
-    if obj is None:
-        return {}
-
-    if isinstance(obj, dict):
-        return obj
-
-    if isinstance(obj, BaseModel):
-        return obj.model_dump()
-
-    if isinstance(obj, str):
-        try:
-            parsed = json.loads(obj)
-            return parsed if isinstance(parsed, dict) else {}
-        except Exception:
-            return {}
-
-    return {}
+from reposage.output.result import AnalysisResult
+from reposage.tracing import REPORT, traced
 
 
+@traced("summary_json", REPORT)
 def generate_summary_json(
-    scan_output,
-    architecture_output,
-    security_output,
-    performance_output,
-    roadmap_output,
+    result: AnalysisResult,
     output_path: str = "outputs/summary.json",
+    run_metrics: Optional[Dict] = None,
 ):
-    # --------------------------------------------------
-    # Normalize safely (DO NOT DROP DATA)
-    # --------------------------------------------------
-    scan = _force_dict(scan_output)
-    architecture = _force_dict(architecture_output)
-    security = _force_dict(security_output)
-    performance = _force_dict(performance_output)
-    roadmap = _force_dict(roadmap_output)
+    scan = result.scan
+    architecture = result.architecture
+    roadmap = result.roadmap
+    health = result.health
 
     # --------------------------------------------------
     # Prepare output directory
@@ -54,24 +23,14 @@ def generate_summary_json(
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # --------------------------------------------------
-    # Repository metadata
-    # --------------------------------------------------
-    repo_path = scan.get("repo_path") or "unknown"
-    repo_name = Path(repo_path).name if repo_path != "unknown" else "unknown"
-
-    health = calculate_health_score(
-            scan, architecture, security, performance
-        )
-    top_risky_files = extract_top_risky_files(security, performance)
-
     # --------------------------------------------------
     # Build summary
     # --------------------------------------------------
     summary = {
-        "repo_name": repo_name,
-        "repo_path": repo_path,
+        "repo_name": result.repo_name,
+        "repo_path": result.repo_path,
         "detected_languages": scan.get("detected_languages", []),
+        "languages": scan.get("languages") or {},
         "architecture_type": architecture.get("architecture_type"),
 
         "repo_health": {
@@ -86,8 +45,9 @@ def generate_summary_json(
                 "issue": i.get("issue"),
                 "severity": i.get("severity"),
                 "file": (i.get("affected_files") or ["N/A"])[0],
+                "occurrences": i.get("occurrences") or 1,
             }
-            for i in security.get("issues", [])
+            for i in result.security_issues
             if i.get("severity") in {"High", "Medium"}
         ][:5],
 
@@ -96,8 +56,9 @@ def generate_summary_json(
                 "issue": i.get("issue"),
                 "severity": i.get("severity"),
                 "file": i.get("affected_file"),
+                "occurrences": i.get("occurrences") or 1,
             }
-            for i in performance.get("issues", [])
+            for i in result.performance_issues
             if i.get("severity") in {"High", "Medium"}
         ][:5],
 
@@ -117,10 +78,24 @@ def generate_summary_json(
             "grade": health["grade"],
             "breakdown": health["breakdown"]
         },
-        "top_risky_files": top_risky_files,
+        "top_risky_files": result.risky_files,
+        "top_risky_directories": result.risk_rollups["directories"],
+        "top_risky_modules": result.risk_rollups["modules"],
 
     }
 
+    # Timings, tokens and I/O of the run that produced this summary
+    if run_metrics:
+        summary["run_metrics"] = run_metrics
+
+    # Diff mode: what changed and which findings it added or removed
+    if result.diff:
+        summary["diff"] = result.diff
+
+    # Sharded runs: each shard's size, issue counts and health score
+    if result.shards:
+        summary["shards"] = result.shards
+
     # --------------------------------------------------
     # Write file
     # --------------------------------------------------
@@ -0,0 +1,319 @@
+"""
+The stages of one RepoSage run, shared by the CLI and batch mode.
+
+1. ``prepare_repo``   clone, scan, detector pre-pass, task digests (CPU)
+2. ``run_crew``       the LLM crew (network bound), or ``detector_outputs``
+                      for runs without the LLM
+3. ``write_artifacts`` summary.json, report.md and report.pdf, rendered
+                      concurrently from one ``AnalysisResult``
+
+Each stage is recorded as a span of the active tracer (see
+``reposage.tracing``); ``write_artifacts`` puts its metrics into
+summary.json.
+"""
+
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Collection, Dict, List, Optional
+
+from reposage.analysis.context_builder import DEFAULT_TOKEN_BUDGET, build_task_context
+from reposage.analysis.diff import base_findings, compare_findings, diff_entries, resolve_diff
+from reposage.analysis.findings_cache import FindingsCache
+from reposage.analysis.prepass import run_prepass
+from reposage.history import RunStore
+from reposage.llm.response_store import ResponseStore
+from reposage.tools.repo_cloner import clone_repository, fetch_commit
+from reposage.tools.file_scanner import enumerate_files, scan_repo_path
+from reposage.tools.git_index import file_churn
+from reposage.tracing import Tracer, span
+from reposage.output.result import DETECTOR_FINDINGS, build_result
+from reposage.output.summary_generator import generate_summary_json
+from reposage.output.report_generator import generate_report_md
+from reposage.output.report_pdf_generator import generate_report_pdf
+from reposage.output.normalize_output import normalize_output
+
+DEFAULT_CACHE_DIR = ".cache/reposage"
+
+
+def _findings_cache(cache_dir: Optional[str]) -> Optional[FindingsCache]:
+    if cache_dir is None:
+        return None
+    return FindingsCache(Path(cache_dir) / "findings.sqlite")
+
+
+# =======================
+# 1. PREPARE (no LLM)
+# =======================
+
+def prepare_repo(
+    repo: Optional[str] = None,
+    path: Optional[str] = None,
+    ref: Optional[str] = None,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+    context_tokens: int = DEFAULT_TOKEN_BUDGET,
+    contexts: bool = True,
+    base: Optional[str] = None,
+    head: Optional[str] = None,
+    only: Optional[Collection[str]] = None,
+) -> Dict:
+    """
+    Check out ``repo`` (or use the local ``path``), scan it, run the
+    detector pre-pass and build the crew inputs. ``cache_dir=None``
+    disables the findings cache.
+
+    With ``base``, only the files changed since ``base`` (see
+    ``reposage.analysis.diff``) and their context are scanned and
+    analyzed, and the result gets a ``diff`` with the new and resolved
+    findings. ``head`` is the ref to check out for ``repo``; for a local
+    ``path`` it must be what is checked out, and without it the working
+    tree is compared.
+
+    With ``only``, just those repository-relative paths are scanned and
+    analyzed (one shard of a monorepo, see ``reposage.sharding``).
+    """
+    inputs = {}
+    if repo:
+        inputs["repo"] = repo
+        with span("clone"):
+            repo_path = clone_repository(repo, ref=head or ref)
+    else:
+        inputs["repo"] = str(Path(path).resolve())
+        repo_path = inputs["repo"]
+
+    cache = _findings_cache(cache_dir)
+    try:
+        diff = None
+        with span("scan") as s:
+            entries = enumerate_files(repo_path)
+            if only is not None:
+                entries = [e for e in entries if e.path in only]
+            if base:
+                # a fresh checkout has nothing uncommitted to compare
+                if repo:
+                    diff = resolve_diff(repo_path, fetch_commit(repo, base))
+                    diff.update(base=base, head=head or "HEAD")
+                else:
+                    diff = resolve_diff(repo_path, base, head)
+                entries = diff_entries(entries, diff)
+            scan = scan_repo_path(repo_path, entries)
+            if diff is not None:
+                scan["changed_files"] = diff["changed_files"]
+            s.set(files=len(entries))
+
+        # binary and oversized files are never read; in diff mode the
+        # context files are only there for the digests
+        skipped = set(scan["binary_files"]) | set(scan["oversized_files"])
+        if diff is not None:
+            skipped.update(diff["context_files"])
+        with span("prepass") as s:
+            prepass = run_prepass(
+                scan["repo_path"],
+                [f for f in scan["files"] if f not in skipped],
+                max_workers=workers,
+                cache=cache,
+                blob_index={e.path: e.blob_sha for e in entries if e.blob_sha},
+            )
+            s.set(
+                files_analyzed=prepass["files_analyzed"],
+                files_cached=prepass["files_cached"],
+                bytes_read=prepass["bytes_read"],
+            )
+
+        if diff is not None:
+            with span("base") as s:
+                modified = [p for p, status in diff.pop("changed").items() if status != "A"]
+                diff.update(compare_findings(
+                    base_findings(scan["repo_path"], diff["merge_base"], modified, cache),
+                    prepass,
+                ))
+                s.set(files=len(modified))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    # Task-specific, token-bounded digests (only the crew reads them)
+    if contexts:
+        with span("context"):
+            churn = file_churn(scan["repo_path"])
+            for task in ("architecture", "security", "performance"):
+                inputs[f"{task}_context"] = build_task_context(
+                    task, scan, prepass, churn, token_budget=context_tokens
+                )
+
+    return {
+        "inputs": inputs,
+        "repo_path": scan["repo_path"],
+        "scan": scan,
+        "prepass": prepass,
+        "cache_dir": cache_dir,
+        "diff": diff,
+    }
+
+
+# =======================
+# 2. CREW (LLM)
+# =======================
+
+def _sync_file_summaries(scan_output, prepass: Dict, cache: FindingsCache):
+    """
+    Store file summaries produced by the crew under their blob ids, and
+    fill in summaries for unchanged files from earlier runs.
+    """
+    scan = scan_output
+    if isinstance(scan, str):
+        try:
+            scan = json.loads(scan)
+        except ValueError:
+            return scan_output
+    if not isinstance(scan, dict):
+        return scan_output
+
+    repo_path = scan.get("repo_path") or ""
+    blobs = prepass["blob_ids"]
+    summaries = scan.get("file_summaries") or {}
+
+    fresh = {}
+    for path, text in summaries.items():
+        rel_path = os.path.relpath(path, repo_path) if os.path.isabs(path) else path
+        if rel_path in blobs and text:
+            fresh[blobs[rel_path]] = text
+    cache.put_summaries(fresh)
+
+    scan["file_summaries"] = {**prepass["file_summaries"], **summaries}
+    return scan
+
+
+def run_crew(
+    prepared: Dict,
+    llm_store: Optional[ResponseStore] = None,
+    replay: bool = False,
+) -> Dict:
+    """Kick off the crew for a prepared repo and return outputs by task name."""
+    # crewai takes seconds to import; only runs that use the crew pay for it
+    from reposage.crew import RepoSageCrew
+
+    with span("crew"):
+        crew = RepoSageCrew(response_store=llm_store, replay=replay).crew()
+        crew.kickoff(inputs=prepared["inputs"])
+
+    # ------------------------------
+    # Extract task outputs (CrewAI 1.9.x safe)
+    # ------------------------------
+    # Read them from the tasks: after the async analyses join,
+    # result.tasks_output no longer includes scan_repository.
+    outputs = {}
+    for task in crew.tasks:
+        if task.output is not None:
+            outputs[task.name] = normalize_output(task.output.raw)
+
+    cache = _findings_cache(prepared["cache_dir"])
+    if cache is not None:
+        with cache:
+            outputs["scan_repository"] = _sync_file_summaries(
+                outputs.get("scan_repository"), prepared["prepass"], cache
+            )
+
+    if isinstance(outputs.get("scan_repository"), dict):
+        outputs["scan_repository"]["file_lines"] = prepared["scan"]["file_lines"]
+    outputs[DETECTOR_FINDINGS] = _detector_findings(prepared["prepass"])
+
+    return outputs
+
+
+def _detector_findings(prepass: Dict) -> Dict:
+    return {"security": prepass["security"], "performance": prepass["performance"]}
+
+
+def detector_outputs(prepared: Dict) -> Dict:
+    """
+    Outputs by task name built from the scan and the detector pre-pass
+    alone, shaped like the crew's, for runs without the LLM. There is no
+    architecture analysis or roadmap.
+    """
+    prepass = prepared["prepass"]
+
+    def located(finding: Dict) -> Dict:
+        return {k: finding[k] for k in ("detector", "line", "line_start", "line_end") if k in finding}
+
+    return {
+        DETECTOR_FINDINGS: _detector_findings(prepass),
+        "scan_repository": prepared["scan"],
+        "security_analysis": {"issues": [
+            {
+                "issue": f.get("issue"),
+                "severity": f.get("severity"),
+                "affected_files": [f["file"]] if f.get("file") else [],
+                "recommended_fix": f.get("recommended_fix"),
+                **located(f),
+            }
+            for f in prepass["security"]
+        ]},
+        "performance_analysis": {"issues": [
+            {
+                "issue": f.get("issue"),
+                "severity": f.get("severity"),
+                "affected_file": f.get("file"),
+                "likely_symptoms": f.get("likely_symptoms"),
+                "recommended_fix": f.get("recommended_fix"),
+                **located(f),
+            }
+            for f in prepass["performance"]
+        ]},
+    }
+
+
+# =======================
+# 3. ARTIFACTS
+# =======================
+
+def write_artifacts(
+    outputs: Dict,
+    out_dir: str,
+    pdf: bool = True,
+    tracer: Optional[Tracer] = None,
+    markdown: bool = True,
+    diff: Optional[Dict] = None,
+    shards: Optional[List[Dict]] = None,
+    history: Optional[RunStore] = None,
+    repo: Optional[str] = None,
+) -> Path:
+    """
+    Write summary.json and (optionally) report.md and report.pdf. The task
+    outputs are normalized and scored once, then the reports render
+    concurrently, so a long PDF never holds up summary.json. With a
+    ``tracer``, summary.json gets a ``run_metrics`` block covering the
+    run up to the reports (their spans are in the trace). ``diff`` is
+    the diff-mode comparison from ``prepare_repo`` and ``shards`` the
+    per-shard scores of a sharded run. With a ``history`` store, the run
+    is also recorded there under ``repo`` (its URL or local path).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    result = build_result(outputs, diff, shards)
+    if history is not None:
+        with span("history"):
+            history.record(result, repo=repo)
+    run_metrics = tracer.metrics() if tracer is not None else None
+
+    renders = [(generate_summary_json, out_dir / "summary.json", {"run_metrics": run_metrics})]
+    if markdown:
+        renders.append((generate_report_md, out_dir / "report.md", {}))
+    if pdf:
+        renders.append((generate_report_pdf, out_dir / "report.pdf", {}))
+
+    with ThreadPoolExecutor(max_workers=len(renders)) as pool:
+        # each renderer runs in a copy of this context, so its span
+        # lands in the active tracer
+        futures = [
+            pool.submit(contextvars.copy_context().run, render, result, output_path=path, **kwargs)
+            for render, path, kwargs in renders
+        ]
+        for future in futures:
+            future.result()
+
+    return out_dir
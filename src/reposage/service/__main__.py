@@ -0,0 +1,3 @@
+from reposage.service.server import main
+
+main()
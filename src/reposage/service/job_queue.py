@@ -0,0 +1,194 @@
+"""
+Persistent SQLite job queue for the analysis service.
+
+Jobs survive restarts: anything left ``running`` by a previous process
+is queued again on startup, unless it has already been started
+``MAX_ATTEMPTS`` times, in which case it likely crashed the process and
+is marked failed. Submissions for a repo and commit that is
+already queued, running or done return the existing job instead of
+adding a new one.
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id         TEXT PRIMARY KEY,
+    source     TEXT NOT NULL,
+    is_url     INTEGER NOT NULL,
+    ref        TEXT,
+    commit_sha TEXT,
+    status     TEXT NOT NULL,
+    stage      TEXT,
+    error      TEXT,
+    output_dir TEXT,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    created    REAL NOT NULL,
+    started    REAL,
+    finished   REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+CREATE INDEX IF NOT EXISTS jobs_commit ON jobs (source, commit_sha);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+FINISHED = {SUCCEEDED, FAILED}
+
+# Starts after which a job interrupted by a restart is failed, not requeued
+MAX_ATTEMPTS = 3
+
+_COLUMNS = [
+    "id", "source", "is_url", "ref", "commit_sha", "status", "stage",
+    "error", "output_dir", "attempts", "created", "started", "finished",
+]
+
+
+class JobQueue:
+    """
+    Thread-safe job queue. Workers block in ``claim`` until a job is
+    queued; every state change wakes ``wait_for_change`` callers.
+    """
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._changed = threading.Condition()
+
+        with self._conn:
+            # jobs interrupted by a restart start over, unless they keep
+            # taking the process down with them
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, finished = ?, error = ? "
+                "WHERE status = ? AND attempts >= ?",
+                (FAILED, time.time(), f"Interrupted {max_attempts} times", RUNNING, max_attempts),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL WHERE status = ?",
+                (QUEUED, RUNNING),
+            )
+
+    def close(self):
+        with self._changed:
+            self._conn.close()
+
+    def _row(self, row) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["is_url"] = bool(job["is_url"])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._changed:
+            return self._row(self._conn.execute(
+                f"SELECT {','.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone())
+
+    def submit(
+        self,
+        source: str,
+        is_url: bool,
+        ref: Optional[str] = None,
+        commit_sha: Optional[str] = None,
+        force: bool = False,
+    ) -> Tuple[Dict, bool]:
+        """
+        Queue an analysis of ``source`` at ``commit_sha``. Returns the job
+        and whether an existing (queued, running or succeeded) job for the
+        same commit was returned instead. ``force`` always queues.
+        """
+        with self._changed:
+            if commit_sha and not force:
+                existing = self._row(self._conn.execute(
+                    f"SELECT {','.join(_COLUMNS)} FROM jobs "
+                    "WHERE source = ? AND commit_sha = ? AND status != ? "
+                    "ORDER BY created DESC LIMIT 1",
+                    (source, commit_sha, FAILED),
+                ).fetchone())
+                if existing is not None:
+                    return existing, True
+
+            job_id = uuid.uuid4().hex
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, source, is_url, ref, commit_sha, status, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, source, int(is_url), ref, commit_sha, QUEUED, time.time()),
+                )
+            self._changed.notify_all()
+
+        return self.get(job_id), False
+
+    def claim(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Mark the oldest queued job running and return it (``None`` on timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._changed:
+            while True:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is not None:
+                    with self._conn:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, started = ?, attempts = attempts + 1 "
+                            "WHERE id = ?",
+                            (RUNNING, time.time(), row[0]),
+                        )
+                    self._changed.notify_all()
+                    return self.get(row[0])
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+
+    def update(self, job_id: str, **fields):
+        """Set ``stage``, ``status``, ``error`` or ``output_dir`` on a job."""
+        if fields.get("status") in FINISHED:
+            fields["finished"] = time.time()
+
+        with self._changed:
+            with self._conn:
+                self._conn.execute(
+                    f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                    [*fields.values(), job_id],
+                )
+            self._changed.notify_all()
+
+    def wait_for_change(self, job_id: str, last: Optional[Dict], timeout: float) -> Optional[Dict]:
+        """Return the job once it differs from ``last``, or after ``timeout``."""
+        deadline = time.monotonic() + timeout
+
+        with self._changed:
+            while True:
+                job = self.get(job_id)
+                remaining = deadline - time.monotonic()
+                if job != last or remaining <= 0:
+                    return job
+                self._changed.wait(remaining)
+
+    def counts(self) -> Dict[str, int]:
+        with self._changed:
+            return dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall())
+
+
+def job_view(job: Dict) -> Dict:
+    """Public JSON shape of a job."""
+    view = {k: job[k] for k in _COLUMNS if k not in ("is_url", "output_dir")}
+    view["kind"] = "repo" if job["is_url"] else "path"
+    return view
@@ -0,0 +1,369 @@
+"""
+Long-running HTTP analysis service.
+
+One process imports crewai once, on a background thread at startup,
+and keeps a pool of worker threads pulling jobs from a persistent
+SQLite queue, so a job costs no interpreter or import startup.
+
+    POST /jobs               {"repo": url, "ref": optional} or {"path": dir};
+                             add "force": true to skip deduplication
+    GET  /jobs/<id>          job status
+    GET  /jobs/<id>/events   NDJSON stream of status changes, ending with
+                             the job's summary.json once it finishes
+    GET  /jobs/<id>/summary  summary.json of a finished job
+    GET  /health             queue counts
+
+Run with ``python -m reposage.service``.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import threading
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+from reposage.analysis.context_builder import DEFAULT_TOKEN_BUDGET
+from reposage.history import HISTORY_FILE, RunStore
+from reposage.llm.response_store import ResponseStore
+from reposage.pipeline import DEFAULT_CACHE_DIR, prepare_repo, run_crew, write_artifacts
+from reposage.service.job_queue import (
+    FAILED, FINISHED, SUCCEEDED, JobQueue, job_view,
+)
+from reposage.tools.repo_cloner import release_checkout, resolve_commit
+from reposage.tracing import Tracer
+
+DEFAULT_PORT = 8080
+
+# Jobs analyzed at the same time
+SERVICE_WORKERS = 2
+
+# Seconds between keep-alive lines on an idle event stream
+EVENT_HEARTBEAT = 15
+
+# Seconds POST /jobs waits for the remote to resolve a ref
+RESOLVE_TIMEOUT = 15
+
+
+# =======================
+# WORKERS
+# =======================
+
+class AnalysisService:
+    """Owns the queue, the shared caches and the worker threads."""
+
+    def __init__(
+        self,
+        data_dir: str,
+        workers: int = SERVICE_WORKERS,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        llm_store: Optional[ResponseStore] = None,
+        context_tokens: int = DEFAULT_TOKEN_BUDGET,
+        history: Optional[RunStore] = None,
+    ):
+        self.data_dir = Path(data_dir)
+        self.queue = JobQueue(self.data_dir / "jobs.sqlite")
+        self.cache_dir = cache_dir
+        self.llm_store = llm_store
+        self.context_tokens = context_tokens
+        self.history = history
+
+        # one checkout per repo, so jobs for the same repo run one at a time
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f"reposage-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self):
+        # crewai takes seconds to import; load it while the server starts
+        # rather than in the first job's crew stage
+        threading.Thread(target=_import_crew, name="reposage-import-crew", daemon=True).start()
+        for thread in self._threads:
+            thread.start()
+
+    def _repo_lock(self, source: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._repo_locks.setdefault(source, threading.Lock())
+
+    def submit(self, payload: Dict):
+        """
+        Validate a request body and queue (or deduplicate) the job.
+        Raises ValueError for a bad request and RuntimeError when the
+        remote cannot be reached.
+        """
+        repo, path = payload.get("repo"), payload.get("path")
+        if bool(repo) == bool(path):
+            raise ValueError('Send exactly one of "repo" or "path"')
+
+        ref = payload.get("ref")
+        if repo:
+            commit = resolve_commit(repo, ref, timeout=RESOLVE_TIMEOUT)
+            source, is_url = repo, True
+        else:
+            if ref:
+                raise ValueError('"ref" only applies to "repo"')
+            source, is_url = str(Path(path).resolve()), False
+            if not os.path.isdir(source):
+                raise ValueError(f"Not a directory: {path}")
+            commit = _local_commit(source)
+
+        return self.queue.submit(
+            source, is_url, ref=ref, commit_sha=commit, force=bool(payload.get("force"))
+        )
+
+    def _work(self):
+        while True:
+            job = self.queue.claim()
+            with self._repo_lock(job["source"]):
+                self._run(job)
+
+    def _run(self, job: Dict):
+        out_dir = self.data_dir / "outputs" / job["id"]
+        try:
+            tracer = Tracer()
+            with tracer.activate():
+                self.queue.update(job["id"], stage="prepare")
+                if job["is_url"]:
+                    prepared = prepare_repo(
+                        repo=job["source"],
+                        ref=job["commit_sha"],
+                        cache_dir=self.cache_dir,
+                        context_tokens=self.context_tokens,
+                    )
+                else:
+                    prepared = prepare_repo(
+                        path=job["source"],
+                        cache_dir=self.cache_dir,
+                        context_tokens=self.context_tokens,
+                    )
+
+                self.queue.update(job["id"], stage="crew")
+                outputs = run_crew(prepared, llm_store=self.llm_store)
+
+                self.queue.update(job["id"], stage="artifacts")
+                write_artifacts(
+                    outputs, out_dir, pdf=False, tracer=tracer,
+                    history=self.history, repo=job["source"],
+                )
+
+            self.queue.update(
+                job["id"], status=SUCCEEDED, stage=None, output_dir=str(out_dir)
+            )
+        except Exception as e:
+            traceback.print_exc()
+            message = (str(e).strip().splitlines() or [""])[0]
+            self.queue.update(
+                job["id"], status=FAILED, error=f"{type(e).__name__}: {message}"
+            )
+        finally:
+            if job["is_url"]:
+                release_checkout(job["source"])
+
+    def summary(self, job: Dict) -> Optional[Dict]:
+        if job["status"] != SUCCEEDED or not job["output_dir"]:
+            return None
+        try:
+            return json.loads(
+                (Path(job["output_dir"]) / "summary.json").read_text(encoding="utf-8")
+            )
+        except (OSError, ValueError):
+            return None
+
+
+def _import_crew():
+    try:
+        import reposage.crew  # noqa: F401
+    except Exception:
+        # the first job that reaches the crew reports it
+        traceback.print_exc()
+
+
+def _local_commit(path: str) -> Optional[str]:
+    """HEAD of a clean local checkout; ``None`` (no dedupe) otherwise."""
+    try:
+        head = subprocess.run(
+            ["git", "-C", path, "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "-C", path, "status", "--porcelain"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+    return None if dirty else head
+
+
+# =======================
+# HTTP
+# =======================
+
+class _Handler(BaseHTTPRequestHandler):
+    service: AnalysisService = None
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str):
+        self._send_json(status, {"error": message})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("Body must be a JSON object")
+            job, deduplicated = self.service.submit(payload)
+        except ValueError as e:
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+        except RuntimeError as e:
+            # the remote is slow or unreachable, not the request wrong
+            return self._error(HTTPStatus.BAD_GATEWAY, str(e))
+
+        self._send_json(
+            HTTPStatus.OK if deduplicated else HTTPStatus.ACCEPTED,
+            {**job_view(job), "deduplicated": deduplicated},
+        )
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+        if parts == ["health"]:
+            return self._send_json(HTTPStatus.OK, {"status": "ok", "jobs": self.service.queue.counts()})
+
+        if not parts or parts[0] != "jobs" or len(parts) not in (2, 3):
+            return self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+
+        job = self.service.queue.get(parts[1])
+        if job is None:
+            return self._error(HTTPStatus.NOT_FOUND, "Unknown job")
+
+        if len(parts) == 2:
+            return self._send_json(HTTPStatus.OK, job_view(job))
+
+        if parts[2] == "summary":
+            summary = self.service.summary(job)
+            if summary is None:
+                return self._error(HTTPStatus.CONFLICT, f"Job is {job['status']}")
+            return self._send_json(HTTPStatus.OK, summary)
+
+        if parts[2] == "events":
+            return self._stream_events(job)
+
+        return self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+
+    def _stream_events(self, job: Dict):
+        # HTTP/1.0 response without a length: the stream ends when the
+        # connection closes
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def emit(event: Dict):
+            self.wfile.write(json.dumps(event).encode() + b"\n")
+            self.wfile.flush()
+
+        try:
+            emit(job_view(job))
+            while job["status"] not in FINISHED:
+                changed = self.service.queue.wait_for_change(job["id"], job, EVENT_HEARTBEAT)
+                if changed == job:
+                    emit({"id": job["id"], "heartbeat": True})
+                    continue
+                job = changed
+                emit(job_view(job))
+
+            if job["status"] == SUCCEEDED:
+                emit({"id": job["id"], "summary": self.service.summary(job)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        # one line per request, without the default timestamp noise
+        print(f"🌐 {format % args}")
+
+
+def serve(service: AnalysisService, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    service.start()
+    print(f"🚀 RepoSage service listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv(".env")
+
+    parser = argparse.ArgumentParser(description="RepoSage – analysis service")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=SERVICE_WORKERS,
+        help=f"Jobs analyzed at the same time (default: {SERVICE_WORKERS})",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=".cache/reposage/service",
+        help="Job queue and job outputs (default: .cache/reposage/service/)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Findings and LLM response caches (default: {DEFAULT_CACHE_DIR}/)",
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Always call the model instead of reusing recorded responses",
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help=f"Record every job in the run history (<data-dir>/{HISTORY_FILE}); "
+             f"query it with python -m reposage.history --db",
+    )
+    args = parser.parse_args()
+
+    llm_store = None
+    if not args.no_llm_cache:
+        llm_store = ResponseStore(Path(args.cache_dir) / "llm_responses.sqlite")
+
+    service = AnalysisService(
+        args.data_dir,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        llm_store=llm_store,
+        history=RunStore(Path(args.data_dir) / HISTORY_FILE) if args.history else None,
+    )
+    serve(service, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Sharded mode: analyze a monorepo as a set of services, in parallel.
+
+``find_shards`` partitions the tree at service boundaries: every
+outermost directory holding a dependency manifest (or, when there is
+none below the root, every top-level directory) is a shard. Each shard
+goes through the scan, the detector pre-pass and the crew on its own,
+concurrently, and ``merge_outputs`` joins the results into one report
+with a health score per shard. Wall time follows the largest shard, not
+the whole repository, and every crew works from a digest of one
+service.
+
+Files outside every shard (CI config, top-level scripts) and shards
+too small to stand alone form the root shard. It gets the detectors
+only, since the crew's scan tool works on whole directories.
+"""
+
+import contextvars
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from reposage.analysis.context_builder import DEFAULT_TOKEN_BUDGET
+from reposage.llm.response_store import ResponseStore
+from reposage.output.normalize_output import force_dict
+from reposage.output.result import DETECTOR_FINDINGS, AnalysisResult, build_result
+from reposage.pipeline import DEFAULT_CACHE_DIR, detector_outputs, prepare_repo, run_crew
+from reposage.tools.file_scanner import DEP_FILES, enumerate_files
+from reposage.tools.git_index import IndexEntry
+from reposage.tools.language_detector import code_languages
+from reposage.tools.repo_cloner import clone_repository, register_checkout, release_checkout
+from reposage.tracing import span
+
+# Files that make their directory a service boundary
+SHARD_MANIFESTS = DEP_FILES | {
+    "setup.py", "setup.cfg", "go.mod", "Cargo.toml", "pom.xml", "build.gradle",
+    "build.gradle.kts", "Gemfile", "composer.json", "Dockerfile",
+}
+
+# Shards with fewer files are folded into the root shard
+MIN_SHARD_FILES = 5
+
+# Shards analyzed at the same time
+SHARD_WORKERS = 4
+
+ROOT_SHARD = "(root)"
+
+# Scan lists merged across shards
+_SCAN_LISTS = (
+    "main_directories", "entry_points", "config_files", "dependency_files", "files",
+    "binary_files", "generated_files", "large_files", "oversized_files",
+)
+
+
+# =======================
+# PARTITION
+# =======================
+
+def find_shards(entries: List[IndexEntry], min_files: int = MIN_SHARD_FILES) -> List[Dict]:
+    """
+    Partition ``entries`` into ``[{"name", "root", "files"}]``, largest
+    first. ``root`` is the shard's directory ("" for the root shard) and
+    ``files`` its repository-relative paths.
+    """
+    paths = [e.path for e in entries]
+    roots = {os.path.dirname(p) for p in paths if os.path.basename(p) in SHARD_MANIFESTS}
+    roots.discard("")
+    if not roots:
+        roots = {p.split(os.sep, 1)[0] for p in paths if os.sep in p}
+
+    groups: Dict[str, List[str]] = {root: [] for root in roots}
+    rest = []
+    for path in paths:
+        # outermost boundary wins: a service's nested packages belong to it
+        owner = None
+        parent = os.path.dirname(path)
+        while parent:
+            if parent in groups:
+                owner = parent
+            parent = os.path.dirname(parent)
+        (groups[owner] if owner is not None else rest).append(path)
+
+    shards = []
+    for root, files in groups.items():
+        if len(files) >= min_files:
+            shards.append({"name": root, "root": root, "files": files})
+        else:
+            rest.extend(files)
+    if rest:
+        shards.append({"name": ROOT_SHARD, "root": "", "files": sorted(rest)})
+
+    shards.sort(key=lambda s: (-len(s["files"]), s["name"]))
+    return shards
+
+
+# =======================
+# ANALYZE
+# =======================
+
+def _reroot(path, root: str, repo_path: str):
+    # repository-relative form of a path the crew wrote for the shard at
+    # ``root``; paths already under the shard are left as they are
+    if not isinstance(path, str) or not path:
+        return path
+    if os.path.isabs(path):
+        return os.path.relpath(path, repo_path)
+    path = os.path.normpath(path)
+    if not root or path == root or path.startswith(root + os.sep):
+        return path
+    return os.path.join(root, path)
+
+
+def reroot_outputs(outputs: Dict, root: str, repo_path: str) -> Dict:
+    """
+    The crew's outputs for the shard at ``root`` with every file path
+    (issues, file summaries) made relative to the repository, like the
+    detectors' findings and the scan.
+    """
+    if not root:
+        return outputs
+    outputs = dict(outputs)
+
+    security = force_dict(outputs.get("security_analysis"))
+    security["issues"] = [
+        {**i, "affected_files": [_reroot(f, root, repo_path) for f in i.get("affected_files") or []]}
+        if isinstance(i, dict) else i
+        for i in security.get("issues") or []
+    ]
+    performance = force_dict(outputs.get("performance_analysis"))
+    performance["issues"] = [
+        {**i, "affected_file": _reroot(i.get("affected_file"), root, repo_path)}
+        if isinstance(i, dict) else i
+        for i in performance.get("issues") or []
+    ]
+    scan = force_dict(outputs.get("scan_repository"))
+    scan["file_summaries"] = {
+        _reroot(path, root, repo_path): text
+        for path, text in (scan.get("file_summaries") or {}).items()
+    }
+
+    outputs["security_analysis"] = security
+    outputs["performance_analysis"] = performance
+    outputs["scan_repository"] = scan
+    return outputs
+
+
+def _analyze_shard(
+    shard: Dict,
+    repo_path: str,
+    crew: bool,
+    workers: Optional[int],
+    cache_dir: Optional[str],
+    context_tokens: int,
+    llm_store: Optional[ResponseStore],
+    replay: bool,
+) -> Dict:
+    with span("shard", shard=shard["name"]):
+        prepared = prepare_repo(
+            path=repo_path,
+            workers=workers,
+            cache_dir=cache_dir,
+            context_tokens=context_tokens,
+            contexts=crew,
+            only=set(shard["files"]),
+        )
+        if not crew:
+            return {"prepared": prepared, "outputs": detector_outputs(prepared)}
+
+        # the crew clones and scans the shard's directory only
+        shard_path = os.path.join(repo_path, shard["root"]) if shard["root"] else repo_path
+        prepared["inputs"]["repo"] = shard_path
+        register_checkout(shard_path, shard_path)
+        try:
+            outputs = run_crew(prepared, llm_store=llm_store, replay=replay)
+        finally:
+            release_checkout(shard_path)
+    return {"prepared": prepared, "outputs": reroot_outputs(outputs, shard["root"], repo_path)}
+
+
+def analyze_shards(
+    repo: Optional[str] = None,
+    path: Optional[str] = None,
+    ref: Optional[str] = None,
+    shard_workers: int = SHARD_WORKERS,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+    context_tokens: int = DEFAULT_TOKEN_BUDGET,
+    llm_store: Optional[ResponseStore] = None,
+    replay: bool = False,
+    no_llm: bool = False,
+) -> Dict:
+    """
+    Check out ``repo`` (or use the local ``path``), split it with
+    ``find_shards`` and analyze the shards concurrently. Returns
+    ``{"repo_path", "outputs", "shards"}``: the merged outputs by task
+    name and the per-shard summaries for ``write_artifacts``.
+    """
+    if repo:
+        with span("clone"):
+            repo_path = clone_repository(repo, ref=ref)
+    else:
+        repo_path = str(Path(path).resolve())
+
+    with span("partition") as s:
+        shards = find_shards(enumerate_files(repo_path))
+        s.set(shards=len(shards))
+
+    if workers is None:
+        # the pre-pass pools of concurrent shards share the CPUs
+        workers = max(1, (os.cpu_count() or 1) // max(min(shard_workers, len(shards)), 1))
+
+    # largest first, so the longest shard starts right away
+    with ThreadPoolExecutor(max_workers=max(shard_workers, 1)) as pool:
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run, _analyze_shard,
+                shard, repo_path,
+                # the root shard alone is the whole repository
+                not no_llm and (shard["root"] != "" or len(shards) == 1),
+                workers, cache_dir, context_tokens, llm_store, replay,
+            )
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+
+    for result in results:
+        result["result"] = build_result(result["outputs"])
+
+    if repo:
+        release_checkout(repo)
+
+    return {
+        "repo_path": repo_path,
+        "outputs": merge_outputs(repo_path, shards, results),
+        "shards": [_shard_summary(shard, r["result"]) for shard, r in zip(shards, results)],
+    }
+
+
+# =======================
+# MERGE
+# =======================
+
+def _shard_summary(shard: Dict, result: AnalysisResult) -> Dict:
+    return {
+        "name": shard["name"],
+        "root": shard["root"],
+        "files": len(shard["files"]),
+        "architecture_type": result.architecture.get("architecture_type"),
+        "security_issues": len(result.security_issues),
+        "performance_issues": len(result.performance_issues),
+        "health_score": result.health,
+    }
+
+
+def _merge_scans(repo_path: str, scans: List[Dict]) -> Dict:
+    merged = {"repo_path": repo_path}
+    for key in _SCAN_LISTS:
+        merged[key] = sorted({item for scan in scans for item in scan.get(key) or []})
+    merged["total_files_scanned"] = sum(scan.get("total_files_scanned", 0) for scan in scans)
+
+    counts: Dict[str, List[int]] = {}
+    for scan in scans:
+        for language, stats in (scan.get("languages") or {}).items():
+            entry = counts.setdefault(language, [0, 0])
+            entry[0] += stats["files"]
+            entry[1] += stats["bytes"]
+    total = sum(b for _, b in counts.values()) or 1
+    merged["languages"] = {
+        language: {"files": n, "bytes": b, "share": round(b / total, 4)}
+        for language, (n, b) in sorted(counts.items(), key=lambda kv: (-kv[1][1], kv[0]))
+    }
+    merged["detected_languages"] = code_languages(merged["languages"])
+
+    merged["file_summaries"], merged["file_lines"] = {}, {}
+    for scan in scans:
+        merged["file_summaries"].update(scan.get("file_summaries") or {})
+        merged["file_lines"].update(scan.get("file_lines") or {})
+    return merged
+
+
+def merge_outputs(repo_path: str, shards: List[Dict], results: List[Dict]) -> Dict:
+    """
+    One set of outputs by task name from the shards' results (each with
+    its ``prepared`` repo and normalized ``result``). The scan
+    is merged from the shards' own scans, issues and roadmap items are
+    concatenated and tagged with their shard, and the architecture
+    takes the shards' most common type and lists the rest per shard.
+    """
+    scans, architecture, roadmap = [], {}, {}
+    security, performance = [], []
+    detectors = {"security": [], "performance": []}
+    types = Counter()
+
+    for shard, result in zip(shards, results):
+        name, analysis = shard["name"], result["result"]
+
+        # crew paths were made repository-relative by reroot_outputs
+        crew_summaries = {
+            path: text
+            for path, text in (analysis.scan.get("file_summaries") or {}).items()
+            if not os.path.isabs(path)
+        }
+        scan = dict(result["prepared"]["scan"])
+        scan["file_summaries"] = {**result["prepared"]["prepass"]["file_summaries"], **crew_summaries}
+        scans.append(scan)
+
+        arch = analysis.architecture
+        if arch.get("architecture_type"):
+            types[arch["architecture_type"]] += 1
+        for key in ("key_modules", "service_interactions"):
+            architecture.setdefault(key, []).extend(f"{name}: {m}" for m in arch.get(key) or [])
+        architecture.setdefault("detected_design_patterns", set()).update(
+            arch.get("detected_design_patterns") or []
+        )
+        if arch.get("runtime_flow_summary"):
+            architecture.setdefault("runtime_flow_summary", []).append(
+                f"{name}: {arch['runtime_flow_summary']}"
+            )
+
+        for family, findings in detectors.items():
+            findings.extend(result["prepared"]["prepass"][family])
+        security.extend({**i, "shard": name} for i in analysis.security_issues)
+        performance.extend({**i, "shard": name} for i in analysis.performance_issues)
+
+        for phase, items in analysis.roadmap.items():
+            if isinstance(items, list):
+                roadmap.setdefault(phase, []).extend(
+                    {**item, "task": f"[{name}] {item.get('task')}"} for item in items
+                )
+
+    architecture["architecture_type"] = types.most_common(1)[0][0] if types else None
+    architecture["detected_design_patterns"] = sorted(architecture.get("detected_design_patterns") or [])
+    architecture["runtime_flow_summary"] = "\n".join(architecture.get("runtime_flow_summary") or [])
+
+    return {
+        "scan_repository": _merge_scans(repo_path, scans),
+        "analyze_architecture": architecture,
+        "security_analysis": {"issues": security},
+        "performance_analysis": {"issues": performance},
+        "plan_roadmap": roadmap,
+        DETECTOR_FINDINGS: detectors,
+    }
@@ -1,5 +1,5 @@
 import os
-from crewai.tools import tool
+from reposage.tools.lazy_tool import tool
 
 ENTRY_POINT_HINTS = {
     "main.py", "app.py", "server.py", "index.js",
@@ -0,0 +1,221 @@
+"""
+One file's content and every view the detectors derive from it.
+
+A FileContext reads the file at most once and computes each view (raw
+bytes, decoded text, lower-cased bytes, keyword hits, syntax tree) on
+first use, so detectors sharing a context never re-read, re-decode or
+re-normalize the same file.
+
+Large files (see ``reposage.tools.file_triage``) are never loaded whole
+by the detectors: they stream ``chunks`` and keyword hits are matched
+chunk by chunk, so peak memory does not grow with the largest file.
+"""
+
+import os
+from functools import cached_property
+from typing import Iterator, List, Optional, Tuple
+
+from reposage.tools.file_triage import LARGE, SNIFF_BYTES, TEXT, triage
+from reposage.tools.git_index import hash_blob
+from reposage.tools.keywords import MATCHER, KeywordHits
+from reposage.tools.syntax import SyntaxTree, language_of, parse_file
+
+# Bytes per chunk when streaming large files
+CHUNK_BYTES = 1024 * 1024
+
+# Bytes each chunk also sees of the next one, so matches that straddle a
+# boundary are found; longer than any keyword or secret pattern match
+CHUNK_OVERLAP = 4096
+
+# Characters of a line kept as a finding's snippet
+SNIPPET_CHARS = 200
+
+
+def snippet_of(data: bytes, start: int, end: Optional[int] = None, redact: bool = False) -> str:
+    """
+    The line of ``data`` holding bytes ``start:end``, stripped and cut to
+    ``SNIPPET_CHARS``; with ``redact``, the matched bytes are masked.
+    """
+    end = start if end is None else end
+    line_start = data.rfind(b"\n", 0, start) + 1
+    line_end = data.find(b"\n", end)
+    line_end = len(data) if line_end < 0 else line_end
+    if redact:
+        line = data[line_start:start] + b"<redacted>" + data[end:line_end]
+    else:
+        line = data[line_start:line_end]
+    return line.decode("utf-8", errors="ignore").strip()[:SNIPPET_CHARS]
+
+
+class FileContext:
+    """
+    Lazily computed, memoized views of one file.
+
+    ``path`` is the name detectors report (relative to the repo root);
+    ``full_path`` is where the content is read from. Contexts built from
+    text already in memory (``from_text``) never touch the disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        full_path: Optional[str] = None,
+        size: Optional[int] = None,
+        blob_sha: Optional[str] = None,
+    ):
+        self.path = path
+        self.full_path = full_path or path
+        self._size = size
+        self._blob_sha = blob_sha
+
+    @classmethod
+    def open(cls, repo_path: str, rel_path: str, **kwargs) -> "FileContext":
+        return cls(rel_path, os.path.join(repo_path, rel_path), **kwargs)
+
+    @classmethod
+    def from_text(cls, path: str, content: str) -> "FileContext":
+        ctx = cls(path)
+        ctx.__dict__["text"] = content
+        ctx.__dict__["raw"] = content.encode("utf-8")
+        return ctx
+
+    @classmethod
+    def from_bytes(cls, path: str, raw: bytes, blob_sha: Optional[str] = None) -> "FileContext":
+        """Context for content not on disk, e.g. a blob read from git."""
+        ctx = cls(path, size=len(raw), blob_sha=blob_sha)
+        ctx.__dict__["raw"] = raw
+        return ctx
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            if "raw" in self.__dict__:
+                self._size = len(self.raw)
+            else:
+                try:
+                    self._size = os.path.getsize(self.full_path)
+                except OSError:
+                    self._size = 0
+        return self._size
+
+    @cached_property
+    def blob_sha(self) -> str:
+        return self._blob_sha or hash_blob(self.raw)
+
+    @cached_property
+    def head(self) -> bytes:
+        """The first ``SNIFF_BYTES`` bytes."""
+        if "raw" in self.__dict__:
+            return self.raw[:SNIFF_BYTES]
+        try:
+            with open(self.full_path, "rb") as fh:
+                return fh.read(SNIFF_BYTES)
+        except OSError:
+            return b""
+
+    @cached_property
+    def kind(self) -> str:
+        """Triage kind: text, large, generated, binary or oversized."""
+        return triage(self.path, self.size, self.head)
+
+    @property
+    def streamed(self) -> bool:
+        # large and not already in memory
+        return self.kind == LARGE and "raw" not in self.__dict__
+
+    def chunks(
+        self, size: int = CHUNK_BYTES, overlap: int = CHUNK_OVERLAP
+    ) -> Iterator[Tuple[int, bytes, int]]:
+        """
+        Yield ``(offset, data, owned)``: ``data`` holds up to ``size``
+        bytes starting at ``offset`` plus ``overlap`` bytes of lookahead.
+        Only matches starting in the first ``owned`` bytes belong to the
+        chunk; the rest are found again by the next one.
+        """
+        if "raw" in self.__dict__:
+            raw = self.raw
+            for start in range(0, len(raw), size):
+                data = raw[start:start + size + overlap]
+                yield start, data, min(size, len(data))
+            return
+
+        try:
+            with open(self.full_path, "rb") as fh:
+                start = 0
+                while True:
+                    fh.seek(start)
+                    data = fh.read(size + overlap)
+                    if not data:
+                        return
+                    yield start, data, min(size, len(data))
+                    if len(data) <= size:
+                        return
+                    start += size
+        except OSError:
+            return
+
+    def snippet(self, offset: int) -> str:
+        """Snippet (see ``snippet_of``) of the line holding byte ``offset``."""
+        if not self.streamed:
+            return snippet_of(self.raw, offset)
+        start = max(0, offset - CHUNK_OVERLAP)
+        try:
+            with open(self.full_path, "rb") as fh:
+                fh.seek(start)
+                data = fh.read(2 * CHUNK_OVERLAP)
+        except OSError:
+            return ""
+        return snippet_of(data, offset - start)
+
+    def line(self, lineno: int) -> str:
+        """Snippet of 1-based line ``lineno`` of a loaded file."""
+        lines = self.lines
+        return lines[lineno - 1].strip()[:SNIPPET_CHARS] if 0 < lineno <= len(lines) else ""
+
+    # =======================
+    # VIEWS
+    # =======================
+
+    @cached_property
+    def raw(self) -> bytes:
+        try:
+            with open(self.full_path, "rb") as fh:
+                return fh.read()
+        except OSError:
+            return b""
+
+    @cached_property
+    def text(self) -> str:
+        return self.raw.decode("utf-8", errors="ignore")
+
+    @cached_property
+    def lines(self) -> List[str]:
+        return self.text.split("\n")
+
+    @cached_property
+    def lower(self) -> bytes:
+        # keywords are ASCII, so matching needs no decoding
+        return self.raw.lower()
+
+    @cached_property
+    def hits(self) -> KeywordHits:
+        if not self.streamed:
+            return MATCHER.match_lowered(self.lower)
+
+        # byte offsets into the file, as for a loaded one; chunks are not
+        # decoded, so a character split at a boundary shifts nothing
+        by_family = {}
+        for base, data, owned in self.chunks():
+            chunk_hits = MATCHER.match_lowered(data.lower())
+            for family, positions in chunk_hits.by_family.items():
+                by_family.setdefault(family, []).extend(
+                    (base + pos, kw) for pos, kw in positions if pos < owned
+                )
+        return KeywordHits(by_family)
+
+    @cached_property
+    def tree(self) -> Optional[SyntaxTree]:
+        # generated, minified and large files are not parsed
+        if language_of(self.path) is None or self.kind != TEXT:
+            return None
+        return parse_file(self.path, self.text, blob_sha=self.blob_sha)
@@ -1,57 +1,207 @@
 import os
-from pathlib import Path
-from crewai.tools import tool
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+from reposage.tools.lazy_tool import tool
+
+from reposage.tools.file_triage import BINARY, GENERATED, LARGE, OVERSIZED, TEXT, triage_file
+from reposage.tools.git_index import IndexEntry, list_index
+from reposage.tools.language_detector import code_languages, detect_language, language_stats
 
 IGNORE_DIRS = {
     ".git", "node_modules", "dist", "build",
     "__pycache__", ".venv", "venv"
 }
 
-@tool("scan_repository")
-def scan_repository(repo_path: str) -> dict:
+ENTRY_NAMES = {"main.py", "app.py", "index.js", "server.py", "manage.py"}
+CONFIG_EXTS = {".env", ".yml", ".yaml", ".json", ".toml", ".ini"}
+DEP_FILES = {
+    "requirements.txt",
+    "pyproject.toml",
+    "Pipfile",
+    "package.json",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+}
+
+# Threads for the fallback walker; scandir releases the GIL while it waits
+# on the filesystem, which is what dominates on cold caches and network mounts.
+WALK_WORKERS = 8
+
+# Files triaged per thread task; sniffing is one small read per file
+TRIAGE_CHUNK = 256
+
+# Average bytes per source line, for files whose head is not sniffed
+BYTES_PER_LINE = 40
+
+
+# =======================
+# ENUMERATION
+# =======================
+
+def _scan_dir(root: str, path: str):
+    files, dirs = [], []
+    prefix = len(root) + 1
+
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORE_DIRS:
+                        dirs.append(entry.path)
+                    continue
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    size = 0
+                files.append(IndexEntry(entry.path[prefix:], size, None))
+    except OSError:
+        pass
+
+    return files, dirs
+
+
+def walk_files(repo_path: str, max_workers: int = WALK_WORKERS) -> List[IndexEntry]:
     """
-    Scan repository and return COMPLETE structured metadata
-    required by all downstream agents.
+    Enumerate files under ``repo_path`` with ``os.scandir``, reading
+    directories concurrently. Used when the path is not a git checkout.
+    """
+    repo_path = os.path.abspath(repo_path)
+    entries: List[IndexEntry] = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_scan_dir, repo_path, repo_path)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, dirs = future.result()
+                entries.extend(files)
+                pending.update(pool.submit(_scan_dir, repo_path, d) for d in dirs)
+
+    return entries
+
+
+def _ignored(path: str) -> bool:
+    return any(part in IGNORE_DIRS for part in path.split(os.sep)[:-1])
+
+
+def enumerate_files(repo_path: str) -> List[IndexEntry]:
     """
+    List repository files with their sizes (and blob ids when known),
+    sorted by path.
 
+    Git checkouts are read from the index, which honours ``.gitignore``
+    and needs no tree walk. Other paths, and paths git lists nothing for
+    (e.g. an ignored directory inside an unrelated checkout), fall back to
+    ``walk_files``.
+    """
     repo_path = os.path.abspath(repo_path)
 
+    entries = [e for e in list_index(repo_path) or [] if not _ignored(e.path)]
+    if not entries:
+        entries = walk_files(repo_path)
+
+    entries.sort(key=lambda e: e.path)
+    return entries
+
+
+# =======================
+# TRIAGE
+# =======================
+
+# (triage kind, language or None, estimated lines)
+FileInfo = Tuple[str, Optional[str], int]
+
+
+def estimate_lines(kind: str, size: int, head: bytes) -> int:
+    """
+    Line count of a file from its sniffed head: exact when the head is
+    the whole file, extrapolated from the head's line lengths otherwise.
+    """
+    if kind == BINARY:
+        return 0
+    if not head:
+        return size // BYTES_PER_LINE
+    newlines = head.count(b"\n")
+    if len(head) >= size:
+        return newlines + (not head.endswith(b"\n"))
+    return round(size * newlines / len(head))
+
+
+def _triage_chunk(repo_path: str, entries: List[IndexEntry]) -> List[FileInfo]:
+    infos = []
+    for e in entries:
+        kind, head = triage_file(repo_path, e.path, e.size)
+        # generated and skipped files would skew the language shares
+        language = detect_language(e.path, head) if kind in (TEXT, LARGE) else None
+        infos.append((kind, language, estimate_lines(kind, e.size, head)))
+    return infos
+
+
+def triage_entries(repo_path: str, entries: List[IndexEntry]) -> List[FileInfo]:
+    """
+    Triage kind (see ``file_triage``), language and estimated line count
+    of each entry, in order; each file is sniffed at most once for all
+    three.
+    """
+    chunks = [entries[i:i + TRIAGE_CHUNK] for i in range(0, len(entries), TRIAGE_CHUNK)]
+    if len(chunks) <= 1:
+        return [info for chunk in chunks for info in _triage_chunk(repo_path, chunk)]
+
+    with ThreadPoolExecutor(max_workers=WALK_WORKERS) as pool:
+        parts = pool.map(_triage_chunk, [repo_path] * len(chunks), chunks)
+        return [info for part in parts for info in part]
+
+
+# =======================
+# SCAN
+# =======================
+
+def scan_repo_path(repo_path: str, entries: Optional[List[IndexEntry]] = None) -> dict:
+    """
+    Build the structured scan metadata for ``repo_path``. Pass ``entries``
+    from ``enumerate_files`` to avoid listing the repository twice.
+    """
+
+    repo_path = os.path.abspath(repo_path)
+    if entries is None:
+        entries = enumerate_files(repo_path)
+
     all_files = []
     main_dirs = set()
+    seen_parents = set()
     entry_points = []
     config_files = []
     dependency_files = []
+    by_kind = {BINARY: [], GENERATED: [], LARGE: [], OVERSIZED: []}
+    sized_languages = []
+    file_lines = {}
 
-    ENTRY_NAMES = {"main.py", "app.py", "index.js", "server.py", "manage.py"}
-    CONFIG_EXTS = {".env", ".yml", ".yaml", ".json", ".toml", ".ini"}
-    DEP_FILES = {
-        "requirements.txt",
-        "pyproject.toml",
-        "Pipfile",
-        "package.json",
-        "pnpm-lock.yaml",
-        "poetry.lock",
-    }
+    for entry, (kind, language, lines) in zip(entries, triage_entries(repo_path, entries)):
+        rel_path = entry.path
+        parent, file = os.path.split(rel_path)
+        all_files.append(rel_path)
+        file_lines[rel_path] = lines
+
+        if parent not in seen_parents:
+            seen_parents.add(parent)
+            main_dirs.update(d for d in parent.split(os.sep) if d)
 
-    for root, dirs, files in os.walk(repo_path):
-        dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
+        if file in ENTRY_NAMES:
+            entry_points.append(rel_path)
 
-        for d in dirs:
-            main_dirs.add(d)
+        if os.path.splitext(file)[1] in CONFIG_EXTS:
+            config_files.append(rel_path)
 
-        for file in files:
-            full_path = os.path.join(root, file)
-            rel_path = os.path.relpath(full_path, repo_path)
-            all_files.append(rel_path)
+        if file in DEP_FILES:
+            dependency_files.append(rel_path)
 
-            if file in ENTRY_NAMES:
-                entry_points.append(rel_path)
+        if kind in by_kind:
+            by_kind[kind].append(rel_path)
 
-            if Path(file).suffix in CONFIG_EXTS:
-                config_files.append(rel_path)
+        if language is not None:
+            sized_languages.append((language, entry.size))
 
-            if file in DEP_FILES:
-                dependency_files.append(rel_path)
+    languages = language_stats(sized_languages)
 
     # 🔑 THIS IS CRITICAL
     return {
@@ -62,7 +212,29 @@ def scan_repository(repo_path: str) -> dict:
         "config_files": sorted(config_files),
         "dependency_files": sorted(dependency_files),
         "files": all_files,
-        "detected_languages": [],     # ✅ REQUIRED
+        # detectors and digests skip binary and oversized files, only
+        # check generated ones for secrets and stream large ones
+        "binary_files": by_kind[BINARY],
+        "generated_files": by_kind[GENERATED],
+        "large_files": by_kind[LARGE],
+        "oversized_files": by_kind[OVERSIZED],
+        # code languages by byte share, then every detected language
+        # (code, config, docs) with its file count and byte total
+        "detected_languages": code_languages(languages),     # ✅ REQUIRED
+        "languages": languages,
+        # estimated line counts for the risk density of top_risky_files;
+        # not sent to the crew (see scan_repository)
+        "file_lines": file_lines,
         "file_summaries": {},         # ✅ REQUIRED
     }
 
+
+@tool("scan_repository")
+def scan_repository(repo_path: str) -> dict:
+    """
+    Scan repository and return COMPLETE structured metadata
+    required by all downstream agents.
+    """
+    scan = scan_repo_path(repo_path)
+    del scan["file_lines"]
+    return scan
@@ -0,0 +1,253 @@
+"""
+Helpers for reading file listings and blob ids straight from a git checkout.
+"""
+
+import hashlib
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+# File modes that do not correspond to regular file content
+_SKIP_MODES = {"120000", "160000"}  # symlinks, submodules
+
+
+# Blob id of an empty file
+EMPTY_BLOB = "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+# `git ls-files -s --debug -z` prints "<mode> <sha> <stage>\t<path>\0"
+# followed by a fixed five-line block of index stat data (ctime, mtime,
+# dev/ino, uid/gid, size/flags) before the next entry.
+_DEBUG_ENTRY = re.compile(
+    rb"(\d{6}) ([0-9a-f]+) \d\t([^\0]*)\0(?:[^\n]*\n){4}[^\n]*?size: (\d+)\t[^\n]*\n"
+)
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    size: int
+    blob_sha: Optional[str]  # None for untracked or locally modified files
+
+
+def hash_blob(data: bytes) -> str:
+    """Return the git blob id of ``data`` (same as ``git hash-object``)."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> Optional[str]:
+    """Return the git blob id of a file on disk, streaming its content."""
+    try:
+        size = os.path.getsize(path)
+        digest = hashlib.sha1(b"blob %d\0" % size)
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(chunk_size), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+
+    return digest.hexdigest()
+
+
+def _git(repo_path: str, *args: str, input: Optional[bytes] = None) -> Optional[bytes]:
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_path, *args],
+            input=input,
+            capture_output=True,
+            check=True,
+            timeout=120,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+    return result.stdout
+
+
+def _decode_paths(raw: bytes) -> List[str]:
+    return [p for p in raw.decode("utf-8", "surrogateescape").split("\0") if p]
+
+
+def _stat_size(repo_path: str, rel_path: str) -> int:
+    try:
+        return os.lstat(os.path.join(repo_path, rel_path)).st_size
+    except OSError:
+        return 0
+
+
+def list_index(repo_path: str) -> Optional[List[IndexEntry]]:
+    """
+    List the files of a git checkout from its index, plus untracked files
+    that are not ignored by ``.gitignore``, without walking the tree.
+
+    Sizes come from the index stat data, so only modified and untracked
+    files are stat'ed. Paths are relative to ``repo_path``. Returns
+    ``None`` when ``repo_path`` is not a git checkout.
+    """
+    # the three listings are independent, so let git run them side by side
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        staged, modified, others = pool.map(
+            lambda args: _git(repo_path, *args),
+            [
+                ("ls-files", "-s", "--debug", "-z"),
+                ("ls-files", "-m", "-z"),
+                ("ls-files", "-o", "--exclude-standard", "-z"),
+            ],
+        )
+
+    if staged is None:
+        return None
+
+    dirty = set(_decode_paths(modified or b""))
+    untracked = _decode_paths(others or b"")
+
+    entries = []
+    seen = set()
+    for mode, sha, raw_path, size in _DEBUG_ENTRY.findall(staged):
+        if mode.decode() in _SKIP_MODES or raw_path in seen:
+            # unmerged paths have one entry per conflict stage
+            continue
+        seen.add(raw_path)
+
+        path = raw_path.decode("utf-8", "surrogateescape")
+        sha = sha.decode()
+        size = int(size)
+
+        if path in dirty:
+            # also covers files deleted from the working tree
+            if not os.path.lexists(os.path.join(repo_path, path)):
+                continue
+            sha, size = None, _stat_size(repo_path, path)
+        elif size == 0 and sha != EMPTY_BLOB:
+            # index stat data not populated yet (e.g. right after read-tree)
+            size = _stat_size(repo_path, path)
+
+        entries.append(IndexEntry(path.replace("/", os.sep), size, sha))
+
+    for path in untracked:
+        entries.append(IndexEntry(path.replace("/", os.sep), _stat_size(repo_path, path), None))
+
+    return entries
+
+
+def blob_ids(repo_path: str) -> Dict[str, str]:
+    """
+    Map tracked files (relative to ``repo_path``) to their blob ids using
+    the git index, without reading any file content.
+
+    Files modified in the working tree are left out, since their index
+    blob no longer matches what is on disk. Returns ``{}`` when
+    ``repo_path`` is not a git checkout.
+    """
+    entries = list_index(repo_path) or []
+    return {e.path: e.blob_sha for e in entries if e.blob_sha}
+
+
+def file_churn(repo_path: str, max_commits: int = 500) -> Dict[str, int]:
+    """
+    Count how many of the last ``max_commits`` commits touched each file
+    (paths relative to ``repo_path``). Rename detection is off, so this
+    only reads trees and works in blob-less clones without fetching.
+    Returns ``{}`` when ``repo_path`` is not a git checkout.
+    """
+    raw = _git(
+        repo_path,
+        "-c", "core.quotepath=off",
+        "log", f"-n{max_commits}", "--no-renames", "--relative",
+        "--name-only", "--format=",
+    )
+    churn: Dict[str, int] = {}
+    for line in (raw or b"").decode("utf-8", "surrogateescape").splitlines():
+        if line:
+            path = line.replace("/", os.sep)
+            churn[path] = churn.get(path, 0) + 1
+
+    return churn
+
+
+# =======================
+# REVISIONS
+# =======================
+
+# Paths passed to one git invocation
+_PATH_BATCH = 500
+
+
+def rev_parse(repo_path: str, ref: str) -> Optional[str]:
+    """Commit id ``ref`` points to, or ``None`` when it does not resolve."""
+    out = _git(repo_path, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+    return out.decode().strip() if out else None
+
+
+def merge_base(repo_path: str, a: str, b: str) -> Optional[str]:
+    """Best common ancestor of two commits, or ``None`` when they share no history."""
+    out = _git(repo_path, "merge-base", a, b)
+    return out.decode().strip() if out else None
+
+
+def changed_files(
+    repo_path: str, base: str, head: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """
+    Map each file that differs between commit ``base`` and commit
+    ``head`` to ``"A"`` (added), ``"M"`` (modified) or ``"D"`` (deleted).
+    Without ``head``, compares against the working tree, untracked files
+    included. Rename detection is off: a rename is a deletion plus an
+    addition. Returns ``None`` when git fails.
+    """
+    raw = _git(
+        repo_path,
+        "-c", "core.quotepath=off",
+        "diff", "--name-status", "--no-renames", "--relative", "-z",
+        base, *([head] if head else []),
+    )
+    if raw is None:
+        return None
+
+    fields = _decode_paths(raw)
+    changed = {}
+    for status, path in zip(fields[::2], fields[1::2]):
+        # T (type change) and U (unmerged) count as modifications
+        changed[path.replace("/", os.sep)] = status[0] if status[0] in "AD" else "M"
+
+    if head is None:
+        for path in _decode_paths(_git(repo_path, "ls-files", "-o", "--exclude-standard", "-z") or b""):
+            changed[path.replace("/", os.sep)] = "A"
+
+    return changed
+
+
+def tree_blobs(repo_path: str, commit: str, paths: List[str]) -> Dict[str, str]:
+    """Blob ids of ``paths`` (relative to ``repo_path``) in ``commit``; missing paths are left out."""
+    blobs = {}
+    for i in range(0, len(paths), _PATH_BATCH):
+        batch = [p.replace(os.sep, "/") for p in paths[i:i + _PATH_BATCH]]
+        raw = _git(repo_path, "ls-tree", "-r", "-z", commit, "--", *batch) or b""
+        for line in _decode_paths(raw):
+            meta, path = line.split("\t", 1)
+            mode, kind, sha = meta.split()
+            if kind == "blob" and mode not in _SKIP_MODES:
+                blobs[path.replace("/", os.sep)] = sha
+    return blobs
+
+
+def read_blobs(repo_path: str, shas: List[str]) -> Dict[str, bytes]:
+    """Content of each blob, read with one ``git cat-file --batch``."""
+    if not shas:
+        return {}
+    raw = _git(repo_path, "cat-file", "--batch", input="".join(f"{s}\n" for s in shas).encode())
+    if raw is None:
+        return {}
+
+    blobs = {}
+    pos = 0
+    while pos < len(raw):
+        eol = raw.index(b"\n", pos)
+        header = raw[pos:eol].split()
+        pos = eol + 1
+        if len(header) < 3 or header[1] == b"missing":
+            continue
+        size = int(header[2])
+        blobs[header[0].decode()] = raw[pos:pos + size]
+        pos += size + 1
+    return blobs
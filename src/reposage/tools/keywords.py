@@ -0,0 +1,201 @@
+"""
+Keyword lists for the heuristic detectors and the single-pass matcher
+that finds all of them at once.
+
+The matcher compiles every keyword into one trie-shaped regex at import
+time and walks each file once, so detectors no longer lower-case and
+re-scan the content for every keyword they care about. Keywords are
+ASCII and matched on raw bytes, so hit offsets are byte offsets into the
+file whether it was loaded or streamed in chunks.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# =======================
+# KEYWORD LISTS
+# =======================
+
+DB_QUERY_KEYWORDS = [
+    "select ",
+    "find(",
+    "find_one",
+    "query(",
+    ".execute(",
+    ".fetchall(",
+]
+
+PAGINATION_KEYWORDS = [
+    "limit",
+    "offset",
+    "page",
+    "pagesize",
+    "cursor",
+]
+
+SYNC_IO_KEYWORDS = [
+    "time.sleep",
+    "open(",
+    "read(",
+    "write(",
+    "requests.get",
+    "requests.post",
+]
+
+AUTH_KEYWORDS = [
+    "login",
+    "signin",
+    "authenticate",
+    "jwt",
+    "token",
+    "session",
+]
+
+UNSAFE_ENDPOINT_KEYWORDS = [
+    "/admin",
+    "/debug",
+    "/internal",
+    "/test",
+]
+
+# Rule family -> keywords. A keyword may belong to several families.
+KEYWORD_FAMILIES: Dict[str, List[str]] = {
+    "db_query": DB_QUERY_KEYWORDS,
+    # query calls the N+1 detector parses for beyond DB_QUERY_KEYWORDS
+    "db_call": [".executemany(", ".filter(", ".filter_by(", ".raw(", ".objects."],
+    "loop": ["for ", "foreach"],
+    "pagination": PAGINATION_KEYWORDS,
+    "list_endpoint": ["get", "list"],
+    "query_verb": ["select", "find("],
+    "sync_io": SYNC_IO_KEYWORDS,
+    "auth": AUTH_KEYWORDS,
+    "auth_validation": ["verify", "validate"],
+    "password": ["password"],
+    "password_hash": ["hash"],
+    "unsafe_endpoint": UNSAFE_ENDPOINT_KEYWORDS,
+    "access_control": ["auth", "permission"],
+}
+
+
+# =======================
+# MATCHER
+# =======================
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        optional = "" in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if optional else group
+
+    return build(trie)
+
+
+class KeywordHits:
+    """
+    Keyword hits for one file, grouped by rule family.
+    Each hit is a ``(byte offset, keyword)`` pair in content order.
+    """
+
+    def __init__(self, by_family: Dict[str, List[Tuple[int, str]]]):
+        self.by_family = by_family
+
+    def positions(self, family: str) -> List[Tuple[int, str]]:
+        return self.by_family.get(family, [])
+
+    def keywords(self, family: str) -> set:
+        return {kw for _, kw in self.positions(family)}
+
+    def has(self, family: str, keyword: Optional[str] = None) -> bool:
+        if keyword is None:
+            return bool(self.positions(family))
+        return keyword in self.keywords(family)
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick style multi-pattern matcher.
+
+    All keywords are compiled into one trie-shaped regex, so the content
+    is lower-cased once and walked once. The regex reports the longest
+    keyword at each match; shorter keywords contained in it are expanded
+    from a table built up front, and the rare keyword that starts inside a
+    match but runs past its end is picked up with an anchored re-match.
+    """
+
+    def __init__(self, families: Dict[str, List[str]]):
+        families_of: Dict[str, List[str]] = defaultdict(list)
+        for family, words in families.items():
+            for word in words:
+                families_of[word.lower()].append(family)
+
+        words = sorted(families_of)
+        self._regex = re.compile(_trie_pattern(words).encode("ascii"))
+
+        # keyword -> [(offset, contained keyword, family), ...]
+        self._expansions: Dict[str, List[Tuple[int, str, str]]] = {}
+        # keyword -> offsets where a longer keyword may start and overrun it
+        self._overruns: Dict[str, List[int]] = {}
+
+        for word in words:
+            self._expansions[word] = [
+                (i, other, family)
+                for i in range(len(word))
+                for other in words
+                if word.startswith(other, i)
+                for family in families_of[other]
+            ]
+            self._overruns[word] = [
+                i
+                for i in range(1, len(word))
+                if any(o.startswith(word[i:]) and len(o) > len(word) - i for o in words)
+            ]
+
+    def match(self, content: str) -> KeywordHits:
+        return self.match_lowered(content.encode("utf-8").lower())
+
+    def match_lowered(self, lowered: bytes) -> KeywordHits:
+        """``match`` for raw bytes that are already lower-cased."""
+        found: List[Tuple[int, str, str]] = []
+        overran = False
+
+        for m in self._regex.finditer(lowered):
+            start, keyword = m.start(), m.group().decode("ascii")
+            for offset, other, family in self._expansions[keyword]:
+                found.append((start + offset, other, family))
+
+            for offset in self._overruns[keyword]:
+                tail = self._regex.match(lowered, start + offset)
+                if tail and tail.end() > m.end():
+                    overran = True
+                    for sub_offset, other, family in self._expansions[tail.group().decode("ascii")]:
+                        found.append((start + offset + sub_offset, other, family))
+
+        if overran:
+            found = sorted(set(found))
+
+        by_family: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        for pos, keyword, family in found:
+            by_family[family].append((pos, keyword))
+
+        return KeywordHits(dict(by_family))
+
+
+MATCHER = KeywordMatcher(KEYWORD_FAMILIES)
+
+
+def match_keywords(content: str) -> KeywordHits:
+    """Find every detector keyword in ``content`` in a single pass."""
+    return MATCHER.match(content)
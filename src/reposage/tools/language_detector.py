@@ -1,28 +1,179 @@
-from collections import defaultdict
+"""
+Language detection from file extensions, well-known file names and
+shebang lines.
+
+``scan_repo_path`` calls ``detect_language`` for every text file while
+it walks the repository and aggregates the result with
+``language_stats``, so the scan output already carries per-language
+file counts and byte totals.
+"""
+
 import os
-from crewai.tools import tool
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from reposage.tools.lazy_tool import tool
 
 EXTENSION_LANGUAGE_MAP = {
-    ".py": "Python",
-    ".js": "JavaScript",
-    ".ts": "TypeScript",
-    ".java": "Java",
-    ".go": "Go",
-    ".rb": "Ruby",
-    ".php": "PHP",
+    # Python
+    ".py": "Python", ".pyw": "Python", ".pyi": "Python", ".pyx": "Cython", ".pxd": "Cython",
+    ".ipynb": "Jupyter Notebook",
+    # JavaScript / TypeScript
+    ".js": "JavaScript", ".mjs": "JavaScript", ".cjs": "JavaScript", ".jsx": "JavaScript",
+    ".ts": "TypeScript", ".mts": "TypeScript", ".cts": "TypeScript", ".tsx": "TypeScript",
+    ".vue": "Vue", ".svelte": "Svelte", ".astro": "Astro",
+    ".coffee": "CoffeeScript", ".elm": "Elm",
+    # JVM
+    ".java": "Java", ".kt": "Kotlin", ".kts": "Kotlin", ".scala": "Scala", ".sc": "Scala",
+    ".groovy": "Groovy", ".gradle": "Groovy", ".clj": "Clojure", ".cljs": "Clojure",
+    ".cljc": "Clojure", ".edn": "Clojure",
+    # .NET
+    ".cs": "C#", ".csx": "C#", ".fs": "F#", ".fsx": "F#", ".fsi": "F#", ".vb": "Visual Basic",
+    # C family
+    ".c": "C", ".h": "C",
+    ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".c++": "C++",
+    ".hh": "C++", ".hpp": "C++", ".hxx": "C++", ".inl": "C++",
+    ".m": "Objective-C", ".mm": "Objective-C++",
+    ".cu": "CUDA", ".cuh": "CUDA",
+    # systems
+    ".go": "Go", ".rs": "Rust", ".swift": "Swift", ".zig": "Zig", ".nim": "Nim",
+    ".d": "D", ".v": "V", ".asm": "Assembly", ".s": "Assembly",
+    # scripting
+    ".rb": "Ruby", ".rake": "Ruby", ".gemspec": "Ruby", ".erb": "HTML+ERB",
+    ".php": "PHP", ".phtml": "PHP",
+    ".pl": "Perl", ".pm": "Perl", ".t": "Perl",
+    ".lua": "Lua", ".tcl": "Tcl", ".r": "R", ".jl": "Julia",
+    ".dart": "Dart", ".cr": "Crystal",
+    ".ex": "Elixir", ".exs": "Elixir", ".erl": "Erlang", ".hrl": "Erlang",
+    ".hs": "Haskell", ".lhs": "Haskell", ".ml": "OCaml", ".mli": "OCaml",
+    ".lisp": "Common Lisp", ".el": "Emacs Lisp", ".rkt": "Racket", ".scm": "Scheme",
+    # shells
+    ".sh": "Shell", ".bash": "Shell", ".zsh": "Shell", ".ksh": "Shell", ".fish": "fish",
+    ".ps1": "PowerShell", ".psm1": "PowerShell", ".bat": "Batchfile", ".cmd": "Batchfile",
+    # web
+    ".html": "HTML", ".htm": "HTML", ".xhtml": "HTML",
+    ".css": "CSS", ".scss": "SCSS", ".sass": "Sass", ".less": "Less", ".styl": "Stylus",
+    ".jinja": "Jinja", ".jinja2": "Jinja", ".j2": "Jinja", ".hbs": "Handlebars",
+    ".mustache": "Mustache", ".twig": "Twig", ".ejs": "EJS", ".pug": "Pug",
+    # query / schema / infra
+    ".sql": "SQL", ".graphql": "GraphQL", ".gql": "GraphQL", ".proto": "Protocol Buffer",
+    ".prisma": "Prisma", ".tf": "HCL", ".tfvars": "HCL", ".hcl": "HCL",
+    ".cmake": "CMake", ".mk": "Makefile", ".nix": "Nix", ".bzl": "Starlark",
+    ".sol": "Solidity",
+    # data
+    ".json": "JSON", ".jsonc": "JSON", ".json5": "JSON5",
+    ".yml": "YAML", ".yaml": "YAML", ".toml": "TOML", ".ini": "INI", ".cfg": "INI",
+    ".xml": "XML", ".xsd": "XML", ".plist": "XML", ".csv": "CSV", ".tsv": "TSV",
+    # prose
+    ".md": "Markdown", ".markdown": "Markdown", ".mdx": "MDX",
+    ".rst": "reStructuredText", ".adoc": "AsciiDoc", ".tex": "TeX", ".txt": "Text",
+}
+
+FILENAME_LANGUAGE_MAP = {
+    "Dockerfile": "Dockerfile", "Containerfile": "Dockerfile",
+    "Makefile": "Makefile", "GNUmakefile": "Makefile", "makefile": "Makefile",
+    "CMakeLists.txt": "CMake", "Rakefile": "Ruby", "Gemfile": "Ruby",
+    "Podfile": "Ruby", "Vagrantfile": "Ruby", "Brewfile": "Ruby",
+    "Jenkinsfile": "Groovy", "Pipfile": "TOML", "Procfile": "Procfile",
+    "BUILD": "Starlark", "BUILD.bazel": "Starlark", "WORKSPACE": "Starlark",
+    "Tiltfile": "Starlark", "Justfile": "Just", "justfile": "Just",
+    ".bashrc": "Shell", ".bash_profile": "Shell", ".zshrc": "Shell", ".profile": "Shell",
+    ".env": "Dotenv", ".gitignore": "Ignore List", ".dockerignore": "Ignore List",
+}
+
+# Interpreter named on a shebang line -> language
+INTERPRETER_LANGUAGE_MAP = {
+    "python": "Python", "python2": "Python", "python3": "Python", "pypy": "Python",
+    "pypy3": "Python", "node": "JavaScript", "nodejs": "JavaScript", "deno": "TypeScript",
+    "bun": "JavaScript", "ts-node": "TypeScript",
+    "sh": "Shell", "bash": "Shell", "zsh": "Shell", "ksh": "Shell", "dash": "Shell",
+    "fish": "fish", "ruby": "Ruby", "perl": "Perl", "php": "PHP", "lua": "Lua",
+    "Rscript": "R", "tclsh": "Tcl", "pwsh": "PowerShell", "elixir": "Elixir",
+    "escript": "Erlang", "runhaskell": "Haskell", "julia": "Julia", "make": "Makefile",
 }
 
+# Languages that are configuration, data or documentation rather than
+# code; counted in the statistics but not in ``detected_languages``
+NON_CODE_LANGUAGES = {
+    "JSON", "JSON5", "YAML", "TOML", "INI", "XML", "CSV", "TSV", "Dotenv", "Ignore List",
+    "Markdown", "MDX", "reStructuredText", "AsciiDoc", "TeX", "Text", "Procfile",
+}
+
+# #!/usr/bin/env python3 -u, #!/bin/bash, #!/usr/bin/env -S node --flag
+SHEBANG_REGEX = re.compile(rb"#![ \t]*(\S+)(?:[ \t]+(?:-\S+[ \t]+)*(\S+))?")
+_VERSION_SUFFIX = re.compile(r"[\d.]+$")
+
+
+def _shebang_language(head: bytes) -> Optional[str]:
+    m = SHEBANG_REGEX.match(head)
+    if not m:
+        return None
+    interpreter = m.group(1).decode("utf-8", errors="ignore").rsplit("/", 1)[-1]
+    if interpreter == "env" and m.group(2):
+        interpreter = m.group(2).decode("utf-8", errors="ignore").rsplit("/", 1)[-1]
+    return (
+        INTERPRETER_LANGUAGE_MAP.get(interpreter)
+        or INTERPRETER_LANGUAGE_MAP.get(_VERSION_SUFFIX.sub("", interpreter))
+    )
+
+
+def detect_language(rel_path: str, head: bytes = b"") -> Optional[str]:
+    """
+    Language of a file from its name, extension or (given its first
+    bytes) shebang line; ``None`` when none of them is known.
+    """
+    name = os.path.basename(rel_path)
+    language = FILENAME_LANGUAGE_MAP.get(name)
+    if language:
+        return language
+
+    ext = os.path.splitext(name)[1].lower()
+    if ext:
+        language = EXTENSION_LANGUAGE_MAP.get(ext)
+        if language:
+            return language
+        if name.startswith("Dockerfile."):
+            return "Dockerfile"
+
+    return _shebang_language(head) if head.startswith(b"#!") else None
+
+
+def language_stats(files: Iterable[Tuple[Optional[str], int]]) -> Dict[str, Dict]:
+    """
+    Aggregate ``(language, size)`` pairs into
+    ``{language: {"files": n, "bytes": total, "share": fraction}}``,
+    largest first. ``share`` is the language's fraction of all bytes in
+    files with a known language.
+    """
+    counts: Dict[str, List[int]] = {}
+    for language, size in files:
+        if language is None:
+            continue
+        entry = counts.setdefault(language, [0, 0])
+        entry[0] += 1
+        entry[1] += size or 0
+
+    total = sum(b for _, b in counts.values()) or 1
+    return {
+        language: {"files": n, "bytes": b, "share": round(b / total, 4)}
+        for language, (n, b) in sorted(counts.items(), key=lambda kv: (-kv[1][1], kv[0]))
+    }
+
+
+def code_languages(stats: Dict[str, Dict]) -> List[str]:
+    """Programming languages in ``stats``, by byte share."""
+    return [language for language in stats if language not in NON_CODE_LANGUAGES]
+
+
 @tool("detect_languages")
 def detect_languages(files: list[str]) -> list[str]:
     """
     Detect programming languages used in the repository by
-    analyzing file extensions and mapping them to known languages.
+    analyzing file names and extensions and mapping them to known
+    languages.
     """
-    counter = defaultdict(int)
-
-    for f in files:
-        ext = os.path.splitext(f)[1]
-        if ext in EXTENSION_LANGUAGE_MAP:
-            counter[EXTENSION_LANGUAGE_MAP[ext]] += 1
-
-    return sorted(counter.keys())
+    return sorted({
+        language
+        for language in map(detect_language, files)
+        if language is not None and language not in NON_CODE_LANGUAGES
+    })
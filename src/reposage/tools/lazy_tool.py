@@ -0,0 +1,48 @@
+"""
+``@tool`` that defers importing crewai until an agent needs the tool.
+
+Importing crewai takes seconds. The scanner and detectors are also used
+without any agent (the pre-pass, ``--no-llm``, benchmarks), where only
+the plain function (``tool.func``) is called, so the crewai ``Tool`` is
+built on first use of any other attribute instead of at import time.
+"""
+
+import threading
+from typing import Callable
+
+
+class LazyTool:
+    """Stands in for a crewai ``Tool`` until one is needed."""
+
+    def __init__(self, name: str, func: Callable):
+        self.name = name
+        self.func = func
+        self._tool = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """The crewai ``Tool`` for this function, built once."""
+        with self._lock:
+            if self._tool is None:
+                from crewai.tools import tool
+
+                self._tool = tool(self.name)(self.func)
+        return self._tool
+
+    def __getattr__(self, attr):
+        # only called for attributes not set in __init__
+        if attr.startswith("__") or attr in ("_tool", "_lock"):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self):
+        return f"LazyTool({self.name!r})"
+
+
+def tool(name: str) -> Callable[[Callable], LazyTool]:
+    """Same use as ``crewai.tools.tool("name")``."""
+    def decorator(func: Callable) -> LazyTool:
+        if func.__doc__ is None:
+            raise ValueError("Function must have a docstring")
+        return LazyTool(name, func)
+    return decorator
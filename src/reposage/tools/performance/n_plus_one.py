@@ -1,36 +1,210 @@
-from typing import List, Dict
-from crewai.tools import tool
+import ast
+import re
+from typing import Any, Callable, Dict, List
+from reposage.tools.lazy_tool import tool
 
-DB_QUERY_KEYWORDS = [
-    "select ",
-    "find(",
-    "find_one",
-    "query(",
-    ".execute(",
-    ".fetchall(",
-]
+from reposage.tools.file_context import FileContext
+from reposage.tools.keywords import KeywordHits
 
+# Method names that run (or build and run) a database query. Most are
+# common words (str.find, DataFrame.query, ...), so they only count on a
+# query-like receiver.
+QUERY_METHODS = {
+    "execute", "executemany", "query", "raw",
+    "find", "find_one", "fetchall", "fetchone",
+    "filter", "filter_by",
+}
 
-@tool("detect_n_plus_one")
-def detect_n_plus_one(file_path: str, content: str) -> List[Dict]:
-    """
-    Detect possible N+1 database query patterns by identifying
-    repeated query execution inside loops.
-    """
-    findings = []
+# Identifier words of a query-like receiver: cursor.execute,
+# db.session.query(...).filter, collection.find_one, User.query.filter_by
+RECEIVER_WORDS = {
+    "cursor", "cur", "session", "db", "database", "conn", "connection",
+    "objects", "collection", "query",
+}
+
+# identifier -> words: db_session -> db, session; dbConn -> db, conn
+_WORD_REGEX = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+# code in these runs when called, not once per iteration of an enclosing loop
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+# A loop and the query calls lexically inside it:
+# {"lines": (start, end), "depth": loops enclosing the calls,
+#  "queries": [(start, end), ...]}
+LoopQueries = Dict[str, Any]
+
+
+# =======================
+# PYTHON
+# =======================
+
+def _receiver_names(node: ast.AST) -> List[str]:
+    # objects along a receiver chain, not the methods called on them:
+    # db.session.query(A) -> session, db; df.query(s) -> df
+    names = []
+    while True:
+        if isinstance(node, ast.Attribute):
+            names.append(node.attr)
+            node = node.value
+        elif isinstance(node, ast.Call):
+            node = node.func
+            if isinstance(node, ast.Attribute):
+                node = node.value
+        elif isinstance(node, ast.Subscript):
+            node = node.value
+        elif isinstance(node, ast.Name):
+            names.append(node.id)
+            return names
+        else:
+            return names
 
-    lowered = content.lower()
 
-    if "for " in lowered or "foreach" in lowered:
-        query_hits = sum(1 for q in DB_QUERY_KEYWORDS if q in lowered)
+def _is_query_receiver(node: ast.AST) -> bool:
+    return any(
+        word.lower() in RECEIVER_WORDS
+        for name in _receiver_names(node)
+        for word in _WORD_REGEX.findall(name)
+    )
 
-        if query_hits >= 2:
-            findings.append({
-                "issue": "Possible N+1 database query pattern",
-                "severity": "Medium",
-                "file": file_path,
-                "likely_symptoms": "High database latency under load",
-                "recommended_fix": "Batch queries or use eager loading / joins",
+
+def _is_query_call(node: ast.Call) -> bool:
+    func = node.func
+    if not isinstance(func, ast.Attribute):
+        return False
+    # Django managers: Model.objects.get(...), .all(), ...
+    if isinstance(func.value, ast.Attribute) and func.value.attr == "objects":
+        return True
+    return func.attr in QUERY_METHODS and _is_query_receiver(func.value)
+
+
+def _python_loop_queries(tree: ast.AST) -> List[LoopQueries]:
+    loops: Dict[int, LoopQueries] = {}
+
+    # iterative walk: (node, enclosing loops); generated code can nest
+    # deeper than the recursion limit
+    stack = [(tree, ())]
+    while stack:
+        node, enclosing = stack.pop()
+
+        if isinstance(node, _SCOPES):
+            enclosing = ()
+
+        elif isinstance(node, (ast.For, ast.AsyncFor)):
+            # the iterable and any else: block run once
+            inner = enclosing + (node,)
+            stack.extend((n, enclosing) for n in (node.target, node.iter, *node.orelse))
+            stack.extend((n, inner) for n in node.body)
+            continue
+
+        elif isinstance(node, ast.While):
+            inner = enclosing + (node,)
+            stack.extend((n, enclosing) for n in node.orelse)
+            stack.extend((n, inner) for n in (node.test, *node.body))
+            continue
+
+        elif isinstance(node, _COMPREHENSIONS):
+            # only the first iterable is evaluated outside the loop
+            first, *rest = node.generators
+            inner = enclosing + (node,)
+            stack.append((first.iter, enclosing))
+            stack.extend((n, inner) for n in (first.target, *first.ifs, *rest))
+            if isinstance(node, ast.DictComp):
+                stack.extend(((node.key, inner), (node.value, inner)))
+            else:
+                stack.append((node.elt, inner))
+            continue
+
+        elif enclosing and isinstance(node, ast.Call) and _is_query_call(node):
+            loop = enclosing[-1]
+            entry = loops.setdefault(id(loop), {
+                "lines": (loop.lineno, loop.end_lineno),
+                "depth": len(enclosing),
+                "queries": [],
             })
+            entry["queries"].append((node.lineno, node.end_lineno))
+
+        stack.extend((child, enclosing) for child in ast.iter_child_nodes(node))
+
+    result = []
+    for entry in loops.values():
+        # a chain like db.query(A).filter(...) is one query, not two
+        spans = sorted(set(entry["queries"]), key=lambda s: (s[0], -s[1]))
+        merged = []
+        for start, end in spans:
+            if merged and end <= merged[-1][1]:
+                continue
+            merged.append((start, end))
+        entry["queries"] = merged
+        result.append(entry)
+
+    return sorted(result, key=lambda e: e["lines"])
+
+
+# language -> finder of query calls inside loops; add one next to a
+# parser registered in reposage.tools.syntax to cover another language
+LOOP_QUERY_FINDERS: Dict[str, Callable[[Any], List[LoopQueries]]] = {
+    "python": _python_loop_queries,
+}
+
+
+# =======================
+# DETECTOR
+# =======================
+
+def _keyword_findings(ctx: FileContext, hits: KeywordHits) -> List[Dict]:
+    # languages without a parser: a loop and two query keywords anywhere
+    if hits.has("loop") and len(hits.keywords("db_query")) >= 2:
+        return [{
+            "issue": "Possible N+1 database query pattern",
+            "severity": "Medium",
+            "file": ctx.path,
+            "snippet": ctx.snippet(hits.positions("db_query")[0][0]),
+            "likely_symptoms": "High database latency under load",
+            "recommended_fix": "Batch queries or use eager loading / joins",
+        }]
+    return []
+
+
+def find_n_plus_one(ctx: FileContext) -> List[Dict]:
+    """
+    Return N+1 query findings for a single file: one per loop (or
+    comprehension) with query calls inside it, with line ranges.
+    Files without a registered parser fall back to keyword matching.
+    """
+    hits = ctx.hits
+    if not (hits.has("db_query") or hits.has("db_call")):
+        return []
+
+    tree = ctx.tree
+    finder = LOOP_QUERY_FINDERS.get(tree.language) if tree is not None else None
+    if finder is None:
+        return _keyword_findings(ctx, hits)
+
+    findings = []
+    for loop in finder(tree.root):
+        nested = loop["depth"] > 1
+        findings.append({
+            "issue": "Database query inside nested loops (N+1)" if nested
+                     else "Database query inside a loop (N+1)",
+            "severity": "High" if nested else "Medium",
+            "file": ctx.path,
+            "line_start": loop["lines"][0],
+            "line_end": loop["lines"][1],
+            "query_lines": [list(q) for q in loop["queries"]],
+            "snippet": ctx.line(loop["lines"][0]),
+            "likely_symptoms": "One query per iteration; database latency grows with data size",
+            "recommended_fix": "Fetch in one query before the loop (IN clause, join, "
+                               "eager loading such as select_related / selectinload)",
+        })
 
     return findings
+
+
+@tool("detect_n_plus_one")
+def detect_n_plus_one(file_path: str, content: str) -> List[Dict]:
+    """
+    Detect N+1 database query patterns: query calls made inside loops
+    or comprehensions, reported with the loop's line range.
+    """
+    return find_n_plus_one(FileContext.from_text(file_path, content))
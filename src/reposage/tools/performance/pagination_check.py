@@ -1,34 +1,33 @@
 from typing import List, Dict
-from crewai.tools import tool
+from reposage.tools.lazy_tool import tool
 
-PAGINATION_KEYWORDS = [
-    "limit",
-    "offset",
-    "page",
-    "pagesize",
-    "cursor",
-]
+from reposage.tools.file_context import FileContext
 
 
-@tool("detect_missing_pagination")
-def detect_missing_pagination(file_path: str, content: str) -> List[Dict]:
-    """
-    Detect API endpoints or database queries that return large result sets
-    without implementing pagination mechanisms.
-    """
+def find_missing_pagination(ctx: FileContext) -> List[Dict]:
+    """Return missing-pagination findings for a single file."""
     findings = []
+    hits = ctx.hits
 
-    lowered = content.lower()
-
-    if "get" in lowered or "list" in lowered:
-        if "select" in lowered or "find(" in lowered:
-            if not any(k in lowered for k in PAGINATION_KEYWORDS):
+    if hits.has("list_endpoint"):
+        if hits.has("query_verb"):
+            if not hits.has("pagination"):
                 findings.append({
                     "issue": "API endpoint without pagination",
                     "severity": "Medium",
-                    "file": file_path,
+                    "file": ctx.path,
+                    "snippet": ctx.snippet(hits.positions("query_verb")[0][0]),
                     "likely_symptoms": "High memory usage and slow response times",
                     "recommended_fix": "Add pagination using limit/offset or cursor-based pagination",
                 })
 
     return findings
+
+
+@tool("detect_missing_pagination")
+def detect_missing_pagination(file_path: str, content: str) -> List[Dict]:
+    """
+    Detect API endpoints or database queries that return large result sets
+    without implementing pagination mechanisms.
+    """
+    return find_missing_pagination(FileContext.from_text(file_path, content))
@@ -1,14 +1,25 @@
 from typing import List, Dict
-from crewai.tools import tool
+from reposage.tools.lazy_tool import tool
 
-SYNC_IO_KEYWORDS = [
-    "time.sleep",
-    "open(",
-    "read(",
-    "write(",
-    "requests.get",
-    "requests.post",
-]
+from reposage.tools.file_context import FileContext
+
+
+def find_sync_io(ctx: FileContext) -> List[Dict]:
+    """Return blocking I/O findings for a single file."""
+    findings = []
+    hits = ctx.hits
+
+    if hits.has("sync_io"):
+        findings.append({
+            "issue": "Potential blocking synchronous I/O operation",
+            "severity": "Low",
+            "file": ctx.path,
+            "snippet": ctx.snippet(hits.positions("sync_io")[0][0]),
+            "likely_symptoms": "Thread blocking and reduced throughput",
+            "recommended_fix": "Use asynchronous I/O or move work to background workers",
+        })
+
+    return findings
 
 
 @tool("detect_sync_io")
@@ -17,19 +28,4 @@ def detect_sync_io(file_path: str, content: str) -> List[Dict]:
     Detect potentially blocking synchronous I/O operations that
     may reduce throughput or cause thread blocking under load.
     """
-    findings = []
-
-    lowered = content.lower()
-
-    for keyword in SYNC_IO_KEYWORDS:
-        if keyword in lowered:
-            findings.append({
-                "issue": "Potential blocking synchronous I/O operation",
-                "severity": "Low",
-                "file": file_path,
-                "likely_symptoms": "Thread blocking and reduced throughput",
-                "recommended_fix": "Use asynchronous I/O or move work to background workers",
-            })
-            break
-
-    return findings
+    return find_sync_io(FileContext.from_text(file_path, content))
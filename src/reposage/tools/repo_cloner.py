@@ -1,41 +1,231 @@
+import hashlib
+import json
+import os
+import shutil
 import subprocess
+import threading
+import time
 from pathlib import Path
-from crewai.tools import tool
+from typing import Optional
+from reposage.tools.lazy_tool import tool
 
-@tool("clone_repo")
-def clone_repo(repo_url: str, base_dir: str = "repos") -> str:
-    """
-    Clone a git repository safely using shallow clone.
-    Submodules are intentionally skipped.
-    """
-    base_path = Path(base_dir)
-    base_path.mkdir(parents=True, exist_ok=True)
+# Evict least recently used repos once the clone cache grows past this
+MAX_CACHE_BYTES = 20 * 1024 ** 3
+
+CLONE_TIMEOUT = 180
+
+_INDEX_FILE = "cache_index.json"
+
+# repo_url -> worktree checked out by this process. Lets the crew's
+# clone_repo tool reuse the checkout main.run() prepared (including its
+# ref) instead of moving the worktree back to the default branch.
+_checkouts = {}
+
+# Serializes index updates when several repos are cloned concurrently
+_index_lock = threading.Lock()
 
-    repo_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
-    repo_path = base_path / repo_name
 
-    if repo_path.exists():
-        return str(repo_path)
-    
+# =======================
+# GIT HELPERS
+# =======================
+
+def _git(*args: str, cwd: Optional[Path] = None, timeout: float = CLONE_TIMEOUT) -> str:
     try:
-        subprocess.run(
-            [
-                "git",
-                "clone",
-                "--depth", "1",
-                "--branch", "main",
-                "--single-branch",
-                "--no-tags",
-                "--recurse-submodules=no",  # 🔥 explicit
-                repo_url,
-                str(repo_path),
-            ],
+        result = subprocess.run(
+            ["git", *args],
+            cwd=str(cwd) if cwd else None,
+            capture_output=True,
+            text=True,
             check=True,
-            timeout=180,
+            timeout=timeout,
         )
     except subprocess.TimeoutExpired:
-        raise RuntimeError(f"Git clone timed out for {repo_url}")
+        raise RuntimeError(f"git {args[0]} timed out")
     except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Git clone failed: {e}")
+        raise RuntimeError(f"git {args[0]} failed: {e.stderr.strip() or e}")
+
+    return result.stdout.strip()
+
+
+def normalize_url(repo_url: str) -> str:
+    """One spelling per repository: no trailing slash or ``.git`` suffix."""
+    return repo_url.strip().rstrip("/").removesuffix(".git")
+
+
+def _cache_key(repo_url: str) -> str:
+    url = normalize_url(repo_url)
+    name = url.split("/")[-1]
+    digest = hashlib.sha1(url.encode()).hexdigest()[:8]
+    return f"{name}-{digest}"
+
+
+# =======================
+# LRU INDEX
+# =======================
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(root, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _load_index(base_path: Path) -> dict:
+    try:
+        return json.loads((base_path / _INDEX_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(base_path: Path, index: dict):
+    tmp = base_path / (_INDEX_FILE + ".tmp")
+    tmp.write_text(json.dumps(index, indent=2))
+    os.replace(tmp, base_path / _INDEX_FILE)
+
+
+def _evict(base_path: Path, index: dict, keep: str, max_bytes: int):
+    total = sum(entry["bytes"] for entry in index.values())
+    # worktrees still checked out by this process may be under analysis
+    in_use = {_cache_key(url) for url in _checkouts}
+
+    for key, entry in sorted(index.items(), key=lambda kv: kv[1]["last_used"]):
+        if total <= max_bytes:
+            break
+        if key == keep or key in in_use:
+            continue
+        shutil.rmtree(base_path / "mirrors" / f"{key}.git", ignore_errors=True)
+        shutil.rmtree(base_path / "worktrees" / key, ignore_errors=True)
+        total -= entry["bytes"]
+        del index[key]
+
+
+# =======================
+# CLONE
+# =======================
+
+def clone_repository(
+    repo_url: str,
+    base_dir: str = "repos",
+    ref: Optional[str] = None,
+    max_cache_bytes: int = MAX_CACHE_BYTES,
+) -> str:
+    """
+    Check out ``ref`` (default: the remote's default branch) of
+    ``repo_url`` and return the local path.
+
+    Each URL gets one bare, blob-less mirror under ``base_dir/mirrors``.
+    Repeat runs only fetch new history into it and move a detached
+    worktree to the fetched commit, so checkouts are never stale.
+    Least recently used repos are evicted once the cache exceeds
+    ``max_cache_bytes``.
+    """
+    base_path = Path(base_dir).resolve()
+    key = _cache_key(repo_url)
+    mirror = base_path / "mirrors" / f"{key}.git"
+    worktree = base_path / "worktrees" / key / key.rsplit("-", 1)[0]
 
-    return str(repo_path)
+    mirror.parent.mkdir(parents=True, exist_ok=True)
+
+    if not mirror.exists():
+        _git(
+            "clone",
+            "--bare",
+            "--filter=blob:none",
+            "--no-tags",
+            "--recurse-submodules=no",
+            repo_url,
+            str(mirror),
+        )
+
+    _git("fetch", "--filter=blob:none", "--no-tags", "origin", ref or "HEAD", cwd=mirror)
+    commit = _git("rev-parse", "FETCH_HEAD^{commit}", cwd=mirror)
+
+    if (worktree / ".git").exists():
+        _git("checkout", "--detach", "--force", commit, cwd=worktree)
+        _git("clean", "-ffdxq", cwd=worktree)
+    else:
+        shutil.rmtree(worktree, ignore_errors=True)
+        _git("worktree", "prune", cwd=mirror)
+        worktree.parent.mkdir(parents=True, exist_ok=True)
+        _git("worktree", "add", "--detach", "--force", str(worktree), commit, cwd=mirror)
+
+    size = _dir_size(mirror) + _dir_size(worktree.parent)
+    with _index_lock:
+        index = _load_index(base_path)
+        index[key] = {
+            "url": repo_url,
+            "commit": commit,
+            "last_used": time.time(),
+            "bytes": size,
+        }
+        _evict(base_path, index, keep=key, max_bytes=max_cache_bytes)
+        _save_index(base_path, index)
+
+        _checkouts[repo_url] = str(worktree)
+
+    return str(worktree)
+
+
+def fetch_commit(repo_url: str, ref: str, base_dir: str = "repos") -> str:
+    """
+    Fetch ``ref`` into the mirror ``clone_repository`` made for
+    ``repo_url`` and return its commit id; the worktree shares the
+    mirror's objects, so the commit can be diffed against right away.
+    """
+    mirror = Path(base_dir).resolve() / "mirrors" / f"{_cache_key(repo_url)}.git"
+    _git("fetch", "--filter=blob:none", "--no-tags", "origin", ref, cwd=mirror)
+    return _git("rev-parse", "FETCH_HEAD^{commit}", cwd=mirror)
+
+
+def resolve_commit(repo_url: str, ref: Optional[str] = None, timeout: float = CLONE_TIMEOUT) -> str:
+    """
+    Return the commit ``ref`` (default: HEAD) points to on the remote,
+    without cloning. Full commit ids are returned as given. Raises
+    ValueError for a ref the remote does not have and RuntimeError when
+    the remote cannot be reached within ``timeout`` seconds.
+    """
+    if ref and len(ref) == 40 and all(c in "0123456789abcdef" for c in ref.lower()):
+        return ref.lower()
+
+    ref = ref or "HEAD"
+    out = _git("ls-remote", repo_url, ref, ref + "^{}", timeout=timeout)
+    if not out:
+        raise ValueError(f"ref {ref} not found in {repo_url}")
+
+    refs = [line.split("\t") for line in out.splitlines()]
+    # annotated tags are listed twice; the "^{}" entry is the commit
+    peeled = [sha for sha, name in refs if name.endswith("^{}")]
+    return peeled[0] if peeled else refs[0][0]
+
+
+def register_checkout(repo_url: str, path: str):
+    """
+    Have clone_repo return ``path``, a directory this process already
+    has checked out, for ``repo_url`` until it is released.
+    """
+    with _index_lock:
+        _checkouts[repo_url] = path
+
+
+def release_checkout(repo_url: str):
+    """
+    Mark the checkout of ``repo_url`` as no longer in use, making it
+    eligible for eviction and letting clone_repo check it out afresh.
+    """
+    with _index_lock:
+        _checkouts.pop(repo_url, None)
+
+
+@tool("clone_repo")
+def clone_repo(repo_url: str, base_dir: str = "repos") -> str:
+    """
+    Clone a git repository safely using a cached, blob-less mirror.
+    Repeat calls fetch only new commits. Submodules are intentionally skipped.
+    """
+    if repo_url in _checkouts:
+        return _checkouts[repo_url]
+    return clone_repository(repo_url, base_dir)
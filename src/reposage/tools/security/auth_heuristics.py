@@ -1,42 +1,41 @@
 from typing import List, Dict
-from crewai.tools import tool
+from reposage.tools.lazy_tool import tool
 
-AUTH_KEYWORDS = [
-    "login",
-    "signin",
-    "authenticate",
-    "jwt",
-    "token",
-    "session",
-]
+from reposage.tools.file_context import FileContext
 
 
-@tool("analyze_auth_logic")
-def analyze_auth_logic(file_path: str, content: str) -> List[Dict]:
-    """
-    Analyze authentication-related code to detect weak or unsafe
-    authentication practices such as missing validation checks
-    or plaintext password handling.
-    """
+def find_auth_issues(ctx: FileContext) -> List[Dict]:
+    """Return weak-authentication findings for a single file."""
     findings = []
+    hits = ctx.hits
 
-    lowered = content.lower()
-
-    if any(k in lowered for k in AUTH_KEYWORDS):
-        if "verify" not in lowered and "validate" not in lowered:
+    if hits.has("auth"):
+        if not hits.has("auth_validation"):
             findings.append({
                 "issue": "Authentication logic without explicit validation checks",
                 "severity": "Medium",
-                "file": file_path,
+                "file": ctx.path,
+                "snippet": ctx.snippet(hits.positions("auth")[0][0]),
                 "recommended_fix": "Ensure tokens and credentials are properly validated",
             })
 
-        if "password" in lowered and "hash" not in lowered:
+        if hits.has("password") and not hits.has("password_hash"):
             findings.append({
                 "issue": "Possible plaintext password handling",
                 "severity": "High",
-                "file": file_path,
+                "file": ctx.path,
+                "snippet": ctx.snippet(hits.positions("password")[0][0]),
                 "recommended_fix": "Use strong password hashing (bcrypt, argon2, scrypt)",
             })
 
     return findings
+
+
+@tool("analyze_auth_logic")
+def analyze_auth_logic(file_path: str, content: str) -> List[Dict]:
+    """
+    Analyze authentication-related code to detect weak or unsafe
+    authentication practices such as missing validation checks
+    or plaintext password handling.
+    """
+    return find_auth_issues(FileContext.from_text(file_path, content))
@@ -1,32 +1,37 @@
 from typing import List, Dict
-from crewai.tools import tool
+from reposage.tools.lazy_tool import tool
 
-UNSAFE_ENDPOINT_KEYWORDS = [
-    "/admin",
-    "/debug",
-    "/internal",
-    "/test",
-]
+from reposage.tools.file_context import FileContext
+from reposage.tools.keywords import UNSAFE_ENDPOINT_KEYWORDS
 
 
-@tool("detect_unsafe_endpoints")
-def detect_unsafe_endpoints(file_path: str, content: str) -> List[Dict]:
-    """
-    Detect potentially unsafe or sensitive endpoints that may be exposed
-    without proper authentication or authorization controls.
-    """
+def find_unsafe_endpoints(ctx: FileContext) -> List[Dict]:
+    """Return exposed-endpoint findings for a single file."""
     findings = []
-
-    lowered = content.lower()
+    hits = ctx.hits
+    # keyword -> offset of its first hit
+    found = {}
+    for offset, keyword in hits.positions("unsafe_endpoint"):
+        found.setdefault(keyword, offset)
 
     for keyword in UNSAFE_ENDPOINT_KEYWORDS:
-        if keyword in lowered:
-            if "auth" not in lowered and "permission" not in lowered:
+        if keyword in found:
+            if not hits.has("access_control"):
                 findings.append({
                     "issue": f"Potentially exposed endpoint: {keyword}",
                     "severity": "High",
-                    "file": file_path,
+                    "file": ctx.path,
+                    "snippet": ctx.snippet(found[keyword]),
                     "recommended_fix": "Protect the endpoint with authentication and authorization checks",
                 })
 
     return findings
+
+
+@tool("detect_unsafe_endpoints")
+def detect_unsafe_endpoints(file_path: str, content: str) -> List[Dict]:
+    """
+    Detect potentially unsafe or sensitive endpoints that may be exposed
+    without proper authentication or authorization controls.
+    """
+    return find_unsafe_endpoints(FileContext.from_text(file_path, content))
@@ -1,31 +1,118 @@
 import re
-from typing import List, Dict
-from crewai.tools import tool
+from typing import List, Dict, Optional, Tuple
+from reposage.tools.lazy_tool import tool
+
+from reposage.tools.file_context import FileContext, snippet_of
 
 SECRET_PATTERNS = {
     "AWS Access Key": r"AKIA[0-9A-Z]{16}",
     "Generic API Key": r"api[_-]?key\s*=\s*['\"][A-Za-z0-9_\-]{16,}['\"]",
-    "JWT Secret": r"jwt[_-]?secret\s*=\s*['\"].+['\"]",
-    "Password Assignment": r"password\s*=\s*['\"].+['\"]",
-    "Private Key": r"-----BEGIN (RSA|EC|DSA)? PRIVATE KEY-----",
+    # quote-bounded values, so a match stops at its closing quote and a
+    # second assignment on the same line is still found
+    "JWT Secret": r"jwt[_-]?secret\s*=\s*['\"][^'\"\n]+['\"]",
+    "Password Assignment": r"password\s*=\s*['\"][^'\"\n]+['\"]",
+    "Private Key": r"-----BEGIN (?:RSA|EC|DSA)? PRIVATE KEY-----",
 }
 
+# Regex group name -> display name, e.g. "aws_access_key" -> "AWS Access Key"
+_GROUP_NAMES = {name.lower().replace(" ", "_"): name for name in SECRET_PATTERNS}
 
-@tool("scan_for_secrets")
-def scan_for_secrets(file_path: str, content: str) -> List[Dict]:
-    """
-    Scan source code for hardcoded secrets such as API keys,
-    passwords, JWT secrets, and private keys using regex patterns.
-    """
+# All patterns in one alternation, compiled once. Bytes so it can run
+# directly over raw file bytes and chunks without decoding them.
+SECRET_REGEX = re.compile(
+    "|".join(
+        f"(?P<{group}>{SECRET_PATTERNS[name]})" for group, name in _GROUP_NAMES.items()
+    ).encode(),
+    re.IGNORECASE,
+)
+
+# Each pattern on its own, to find the other types inside a match of the
+# alternation, e.g. an AWS key in an api_key = "..." value
+_GROUP_REGEXES = {
+    group: re.compile(SECRET_PATTERNS[name].encode(), re.IGNORECASE)
+    for group, name in _GROUP_NAMES.items()
+}
+
+
+def _overlapping(buffer, m) -> List:
+    # (start, end, group) of every type matching from within m's span up
+    # to the end of its line; one alternation pass only reports the
+    # leftmost type
+    end = buffer.find(b"\n", m.end())
+    end = len(buffer) if end < 0 else end
+    found = [(m.start(), m.end(), m.lastgroup)]
+    for group, regex in _GROUP_REGEXES.items():
+        if group == m.lastgroup:
+            continue
+        for inner in regex.finditer(buffer, m.start(), end):
+            if inner.start() >= m.end():
+                break
+            found.append((inner.start(), inner.end(), group))
+    return sorted(found)
+
+
+def _value_span(buffer, start: int, end: int) -> Tuple[int, int]:
+    # the quoted value of an assignment match, else the whole match
+    quotes = [i for i in (buffer.find(q, start, end) for q in (b"'", b'"')) if i >= 0]
+    if quotes:
+        close = max(buffer.rfind(b"'", start, end), buffer.rfind(b'"', start, end))
+        if close > min(quotes):
+            return min(quotes) + 1, close
+    return start, end
+
+
+def _scan_buffer(
+    file_path: str, buffer, base: int = 0, first_line: int = 1, owned: Optional[int] = None
+) -> List[Dict]:
+    # ``owned``: only report matches starting before this offset (chunks)
     findings = []
+    line = first_line
+    last = 0
+
+    for m in SECRET_REGEX.finditer(buffer):
+        if owned is not None and m.start() >= owned:
+            break
+        for start, end, group in _overlapping(buffer, m):
+            if owned is not None and start >= owned:
+                break
+            line += buffer[last:start].count(b"\n")
+            last = start
 
-    for name, pattern in SECRET_PATTERNS.items():
-        if re.search(pattern, content, re.IGNORECASE):
             findings.append({
-                "issue": f"Hardcoded secret detected: {name}",
+                "issue": f"Hardcoded secret detected: {_GROUP_NAMES[group]}",
                 "severity": "High",
                 "file": file_path,
+                "line": line,
+                "offset": base + start,
+                # the line with the secret itself masked
+                "snippet": snippet_of(buffer, *_value_span(buffer, start, end), redact=True),
                 "recommended_fix": "Move secrets to environment variables or a secure secret manager",
             })
 
     return findings
+
+
+def find_secrets(ctx: FileContext) -> List[Dict]:
+    """
+    Return hardcoded-secret findings for a single file. Large files are
+    searched chunk by chunk instead of being loaded.
+    """
+    if not ctx.streamed:
+        return _scan_buffer(ctx.path, ctx.raw)
+
+    findings = []
+    line = 1
+    for base, data, owned in ctx.chunks():
+        findings.extend(_scan_buffer(ctx.path, data, base=base, first_line=line, owned=owned))
+        line += data.count(b"\n", 0, owned)
+    return findings
+
+
+@tool("scan_for_secrets")
+def scan_for_secrets(file_path: str, content: str) -> List[Dict]:
+    """
+    Scan source code for hardcoded secrets such as API keys,
+    passwords, JWT secrets, and private keys using regex patterns.
+    Each finding includes the line number and byte offset of the match.
+    """
+    return find_secrets(FileContext.from_text(file_path, content))
@@ -0,0 +1,101 @@
+"""
+Syntax trees for the structural detectors, parsed once per blob.
+
+Parsers are registered per file extension. Python is parsed with the
+standard library ``ast``; other languages can be added with
+``register_parser`` (e.g. a tree-sitter grammar) without touching the
+detectors that consume the trees.
+
+Trees are kept in a small in-process LRU keyed by language and git blob
+id, so every detector that looks at the same file content shares one
+parse, in the pre-pass workers and in the crew's tools alike.
+"""
+
+import ast
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from reposage.tools.git_index import hash_blob
+
+# content -> tree; raise (any exception) when the content does not parse
+Parser = Callable[[str], Any]
+
+# Parsed trees kept per process
+PARSE_CACHE_SIZE = 256
+
+
+class SyntaxTree(NamedTuple):
+    language: str
+    root: Any
+
+
+def _parse_python(content: str) -> ast.AST:
+    with warnings.catch_warnings():
+        # invalid escape sequences and the like are the analyzed repo's
+        # problem, not ours
+        warnings.simplefilter("ignore")
+        return ast.parse(content)
+
+
+# extension -> (language, parser)
+PARSERS: Dict[str, Tuple[str, Parser]] = {
+    ".py": ("python", _parse_python),
+    ".pyw": ("python", _parse_python),
+}
+
+
+def register_parser(language: str, extensions: Iterable[str], parser: Parser):
+    """Parse files with these extensions as ``language`` using ``parser``."""
+    for ext in extensions:
+        PARSERS[ext.lower()] = (language, parser)
+
+
+def language_of(file_path: str) -> Optional[str]:
+    entry = PARSERS.get(os.path.splitext(file_path)[1].lower())
+    return entry[0] if entry else None
+
+
+# =======================
+# PARSE CACHE
+# =======================
+
+_cache: "OrderedDict[Tuple[str, str], Optional[SyntaxTree]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def parse_file(
+    file_path: str, content: str, blob_sha: Optional[str] = None
+) -> Optional[SyntaxTree]:
+    """
+    Syntax tree of ``content``, or ``None`` when no parser is registered
+    for the file's extension or the content does not parse. Failures are
+    cached too, so a broken file is only tried once. Pass ``blob_sha``
+    when it is known to skip hashing the content.
+    """
+    entry = PARSERS.get(os.path.splitext(file_path)[1].lower())
+    if entry is None:
+        return None
+    language, parser = entry
+
+    key = (language, blob_sha or hash_blob(content.encode("utf-8", errors="ignore")))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    try:
+        tree = SyntaxTree(language, parser(content))
+    except Exception:
+        # SyntaxError, RecursionError on deeply nested code, or whatever
+        # a registered third-party parser raises
+        tree = None
+
+    with _cache_lock:
+        _cache[key] = tree
+        while len(_cache) > PARSE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return tree
@@ -0,0 +1,286 @@
+"""
+Run tracing and metrics.
+
+A Tracer collects spans for one run: pipeline stages, crew tasks, tool
+calls, LLM calls and report generators. Each span records wall time,
+CPU time and whatever counters the code inside it sets (tokens, bytes
+read, files processed).
+
+    tracer = Tracer()
+    with tracer.activate():
+        with span("scan") as s:
+            ...
+            s.set(files=len(files))
+
+    tracer.metrics()        # the run_metrics block of summary.json
+    tracer.export(path)     # OpenTelemetry (OTLP/JSON) trace file
+
+``span`` and ``traced`` do nothing outside an active tracer, so traced
+code runs unchanged in tests, benchmarks and library use.
+"""
+
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+STAGE = "stage"
+TASK = "task"
+TOOL = "tool"
+LLM_CALL = "llm"
+REPORT = "report"
+
+TOKEN_COUNTERS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+# Numeric span attributes summed per name in the metrics
+COUNTERS = TOKEN_COUNTERS + ("bytes_read", "files", "files_analyzed", "files_cached")
+
+_tracer: ContextVar[Optional["Tracer"]] = ContextVar("reposage_tracer", default=None)
+_parent: ContextVar[Optional["Span"]] = ContextVar("reposage_span", default=None)
+
+
+def _process_cpu() -> float:
+    # includes reaped worker processes, e.g. the pre-pass process pool
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class Span:
+    __slots__ = (
+        "name", "kind", "span_id", "parent_id", "start_ns", "end_ns",
+        "wall_s", "cpu_s", "attributes", "error",
+    )
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.kind = kind
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = self.start_ns
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+class _NullSpan:
+    """Stands in for a span when no tracer is active."""
+
+    def set(self, **attributes: Any):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Thread-safe span collector for one run."""
+
+    def __init__(self, service: str = "reposage"):
+        self.service = service
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._cpu_start = _process_cpu()
+        self._wall_start = time.perf_counter()
+
+    @contextmanager
+    def activate(self):
+        """Make this the tracer ``span`` records into, in the current context."""
+        token = _tracer.set(self)
+        try:
+            yield self
+        finally:
+            _tracer.reset(token)
+
+    def record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    # =======================
+    # METRICS
+    # =======================
+
+    def metrics(self) -> Dict:
+        """Aggregate the spans recorded so far into the run_metrics block."""
+        with self._lock:
+            spans = list(self.spans)
+
+        def bucket(kind: str) -> Dict[str, Dict]:
+            grouped: Dict[str, Dict] = {}
+            for s in spans:
+                if s.kind != kind:
+                    continue
+                entry = grouped.setdefault(s.name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                entry["calls"] += 1
+                entry["wall_s"] += s.wall_s
+                entry["cpu_s"] += s.cpu_s
+                for counter in COUNTERS:
+                    if counter in s.attributes:
+                        entry[counter] = entry.get(counter, 0) + s.attributes[counter]
+                if s.error:
+                    entry["errors"] = entry.get("errors", 0) + 1
+            for entry in grouped.values():
+                entry["wall_s"] = round(entry["wall_s"], 4)
+                entry["cpu_s"] = round(entry["cpu_s"], 4)
+            return grouped
+
+        tasks = bucket(TASK)
+        for s in spans:
+            # LLM usage is attributed to the task that made the call
+            task = tasks.get(s.attributes.get("task")) if s.kind == LLM_CALL else None
+            if task is not None:
+                task["llm_calls"] = task.get("llm_calls", 0) + 1
+                for counter in TOKEN_COUNTERS:
+                    task[counter] = task.get(counter, 0) + s.attributes.get(counter, 0)
+
+        llm_spans = [s for s in spans if s.kind == LLM_CALL]
+        stage_spans = [s for s in spans if s.kind == STAGE]
+        totals = {
+            counter: sum(s.attributes.get(counter, 0) for s in llm_spans)
+            for counter in TOKEN_COUNTERS
+        }
+        totals["bytes_read"] = sum(s.attributes.get("bytes_read", 0) for s in stage_spans)
+        totals["files_processed"] = sum(s.attributes.get("files", 0) for s in stage_spans)
+
+        return {
+            "wall_s": round(time.perf_counter() - self._wall_start, 4),
+            "cpu_s": round(_process_cpu() - self._cpu_start, 4),
+            "llm_calls": len(llm_spans),
+            "tool_calls": sum(1 for s in spans if s.kind == TOOL),
+            **totals,
+            "stages": bucket(STAGE),
+            "tasks": tasks,
+            "tools": bucket(TOOL),
+            "llm": bucket(LLM_CALL),
+            "reports": bucket(REPORT),
+        }
+
+    # =======================
+    # OPENTELEMETRY EXPORT
+    # =======================
+
+    def export(self, path: str) -> Path:
+        """Write the trace as OTLP/JSON (``ExportTraceServiceRequest``)."""
+        with self._lock:
+            spans = list(self.spans)
+
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otel_attributes({"service.name": self.service})},
+                "scopeSpans": [{
+                    "scope": {"name": "reposage"},
+                    "spans": [self._otel_span(s) for s in spans],
+                }],
+            }],
+        }
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(document, indent=2), encoding="utf-8")
+        return path
+
+    def _otel_span(self, s: Span) -> Dict:
+        attributes = {
+            "reposage.kind": s.kind,
+            "reposage.cpu_s": round(s.cpu_s, 6),
+            **{f"reposage.{k}": v for k, v in s.attributes.items()},
+        }
+        span = {
+            "traceId": self.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": _otel_attributes(attributes),
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            span["parentSpanId"] = s.parent_id
+        return span
+
+
+def _otel_attributes(attributes: Dict) -> List[Dict]:
+    encoded = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": typed})
+    return encoded
+
+
+# =======================
+# RECORDING
+# =======================
+
+def current_tracer() -> Optional[Tracer]:
+    return _tracer.get()
+
+
+@contextmanager
+def span(name: str, kind: str = STAGE, **attributes: Any):
+    """
+    Time the enclosed block as a span of the active tracer. Stages count
+    process CPU (including worker processes); every other kind counts
+    the CPU of the calling thread, since tasks run concurrently.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+
+    cpu_clock = _process_cpu if kind == STAGE else time.thread_time
+    s = Span(name, kind, _parent.get(), attributes)
+    token = _parent.set(s)
+    wall, cpu = time.perf_counter(), cpu_clock()
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.wall_s = time.perf_counter() - wall
+        s.cpu_s = cpu_clock() - cpu
+        s.end_ns = s.start_ns + int(s.wall_s * 1e9)
+        _parent.reset(token)
+        tracer.record(s)
+
+
+def traced(name: Optional[str] = None, kind: str = STAGE) -> Callable:
+    """Decorator form of ``span``; the span is named after the function by default."""
+
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def traced_tool(tool):
+    """Copy of a crewai ``@tool`` whose every invocation is recorded as a span."""
+    return tool.model_copy(update={"func": traced(tool.name, TOOL)(tool.func)})
@@ -0,0 +1,33 @@
+import subprocess
+
+import pytest
+
+
+def git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def commit(repo, files, message="change"):
+    """Write ``files`` ({path: text}) into ``repo``, commit, and return the sha."""
+    for path, text in files.items():
+        target = repo / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text)
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", message)
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def make_repo(tmp_path):
+    """Create a git repository under tmp_path with an initial commit."""
+    def make(name="repo", files=None):
+        repo = tmp_path / name
+        repo.mkdir()
+        git(repo, "init", "-q", "-b", "main")
+        commit(repo, files or {"README.md": "hello\n"}, "initial")
+        return repo
+    return make
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from reposage import batch
+
+
+def test_prepared_repos_are_bounded_by_the_llm_stage(tmp_path, monkeypatch):
+    manifest = tmp_path / "repos.txt"
+    manifest.write_text("".join(f"./repo{i}\n" for i in range(12)))
+
+    lock = threading.Lock()
+    in_flight = [0, 0]  # current, peak
+
+    def prepare(job, *args):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        return {"source": job["source"]}
+
+    def analyze(prepared, out_dir, *args):
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return {"repo_name": prepared["source"], "health_score": {"score": 90, "grade": "A"}}
+
+    monkeypatch.setattr(batch, "_prepare", prepare)
+    monkeypatch.setattr(batch, "_analyze", analyze)
+
+    index = batch.run_batch(
+        str(manifest), str(tmp_path / "out"), cpu_workers=4, llm_workers=2, retries=0
+    )
+
+    assert index["succeeded"] == 12
+    assert in_flight[1] <= 2 + batch.PREPARED_BUFFER
+
+
+def test_failed_prepare_frees_its_slot(tmp_path, monkeypatch):
+    manifest = tmp_path / "repos.txt"
+    manifest.write_text("".join(f"./repo{i}\n" for i in range(8)))
+
+    def prepare(job, *args):
+        raise RuntimeError("git clone failed")
+
+    monkeypatch.setattr(batch, "_prepare", prepare)
+
+    index = batch.run_batch(str(manifest), str(tmp_path / "out"), llm_workers=1, retries=0)
+
+    assert index["failed"] == 8
+    assert {r["failed_stage"] for r in index["repos"]} == {"prepare"}
+
+
+def test_manifest_drops_the_same_repo_spelled_differently(tmp_path):
+    manifest = tmp_path / "repos.txt"
+    manifest.write_text(
+        "https://example.com/org/svc.git\n"
+        "https://example.com/org/svc/\n"
+        "https://example.com/org/svc.github.io\n"
+    )
+
+    jobs = batch.read_manifest(str(manifest))
+
+    assert [j["source"] for j in jobs] == [
+        "https://example.com/org/svc.git", "https://example.com/org/svc.github.io",
+    ]
+
+
+def test_manifest_rejects_one_repo_at_two_refs(tmp_path):
+    manifest = tmp_path / "repos.txt"
+    manifest.write_text("https://example.com/org/svc.git main\nhttps://example.com/org/svc dev\n")
+
+    with pytest.raises(ValueError, match="already listed"):
+        batch.read_manifest(str(manifest))
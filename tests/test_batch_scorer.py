@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+
+from reposage.health.batch_scorer import build_columns, score_batch, what_if
+from reposage.health.scorer import architecture_points, calculate_health_score, hygiene_points
+
+SEVERITIES = ["High", "Medium", "Low", "Unknown", None]
+ARCHITECTURES = [
+    {"architecture_type": "monolith", "detected_design_patterns": []},
+    {"architecture_type": "modular monolith", "detected_design_patterns": ["MVC"]},
+    {"architecture_type": "microservices", "detected_design_patterns": ["CQRS"]},
+]
+SCANS = [
+    {"entry_points": ["main.py"], "dependency_files": ["requirements.txt"], "total_files_scanned": 50},
+    {"entry_points": [], "dependency_files": [], "total_files_scanned": 2},
+]
+
+
+def _random_repos(n, seed=0):
+    rng = random.Random(seed)
+    repos = []
+    for _ in range(n):
+        repos.append({
+            "scan": rng.choice(SCANS),
+            "architecture": rng.choice(ARCHITECTURES),
+            "security": {"issues": [{"severity": rng.choice(SEVERITIES)} for _ in range(rng.randint(0, 8))]},
+            "performance": {"issues": [{"severity": rng.choice(SEVERITIES)} for _ in range(rng.randint(0, 8))]},
+        })
+    return repos
+
+
+def _columns(repos):
+    findings = [
+        (i, family, issue["severity"])
+        for i, repo in enumerate(repos)
+        for family in ("security", "performance")
+        for issue in repo[family]["issues"]
+    ]
+    return build_columns(
+        [str(i) for i in range(len(repos))],
+        findings,
+        architecture=[architecture_points(r["architecture"]) for r in repos],
+        hygiene=[hygiene_points(r["scan"]) for r in repos],
+    )
+
+
+def test_score_batch_matches_calculate_health_score():
+    repos = _random_repos(500)
+    scores = score_batch(_columns(repos))
+
+    for i, repo in enumerate(repos):
+        expected = calculate_health_score(**repo)
+        assert scores["score"][i] == expected["score"]
+        assert scores["grade"][i] == expected["grade"]
+        for key, points in expected["breakdown"].items():
+            assert scores["breakdown"][key][i] == points
+
+
+def test_repos_without_findings_score_full_family_points():
+    columns = build_columns(["a", "b"], [(1, "security", "High")])
+    scores = score_batch(columns)
+
+    assert list(scores["score"]) == [100, 90]
+    assert list(scores["grade"]) == ["A", "A"]
+
+
+def test_what_if_scores_every_scenario():
+    repos = _random_repos(50, seed=1)
+    columns = _columns(repos)
+
+    results = what_if(columns, {
+        "default": None,
+        "strict": {"security": {"High": 20}, "grades": {"A": 95}},
+    })
+
+    assert np.array_equal(results["default"]["score"], score_batch(columns)["score"])
+    assert (results["strict"]["score"] <= results["default"]["score"]).all()
+    # a partial table keeps the other defaults
+    assert np.array_equal(
+        results["strict"]["breakdown"]["performance"], results["default"]["breakdown"]["performance"]
+    )
@@ -0,0 +1,32 @@
+import json
+
+from reposage.analysis.context_builder import HEADER_LIST_LIMIT, build_task_context, estimate_tokens
+
+
+def _scan(n):
+    files = [f"services/module_{i:03d}/handlers/entry_point.py" for i in range(n)]
+    return {
+        "repo_path": "/repo",
+        "files": files,
+        "total_files_scanned": n,
+        "entry_points": files,
+        "config_files": [f"{f}.yaml" for f in files],
+        "main_directories": [f.rsplit("/", 2)[0] for f in files],
+    }
+
+
+def _prepass():
+    return {"security": [], "performance": []}
+
+
+def test_header_shrinks_to_fit_a_small_budget():
+    context = build_task_context("architecture", _scan(200), _prepass(), token_budget=500)
+
+    assert estimate_tokens(context) <= 500
+    assert json.loads(context)["repository"]["entry_points"][-1].endswith("more")
+
+
+def test_header_keeps_full_lists_within_the_default_budget():
+    context = json.loads(build_task_context("architecture", _scan(200), _prepass()))
+
+    assert len(context["repository"]["entry_points"]) == HEADER_LIST_LIMIT + 1
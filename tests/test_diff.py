@@ -0,0 +1,70 @@
+from conftest import commit, git
+from reposage.analysis.diff import base_findings, compare_findings, context_files, resolve_diff
+
+SECRET = 'password = "hunter2"\n'
+
+
+def _finding(file, issue="Hardcoded secret detected: Password Assignment", line=1):
+    return {"file": file, "detector": "secret_scanner", "issue": issue, "line": line}
+
+
+def test_compare_findings_splits_new_and_resolved():
+    base = {"security": [_finding("a.py"), _finding("b.py")], "performance": []}
+    head = {"security": [_finding("a.py", line=7), _finding("c.py")], "performance": []}
+
+    result = compare_findings(base, head)
+
+    # a.py moved lines only: neither new nor resolved
+    assert result["new_findings"]["security"] == [_finding("c.py")]
+    assert result["resolved_findings"]["security"] == [_finding("b.py")]
+    assert result["new_findings"]["performance"] == []
+
+
+def test_compare_findings_counts_repeats():
+    base = {"security": [_finding("a.py")]}
+    head = {"security": [_finding("a.py", line=1), _finding("a.py", line=2)]}
+
+    result = compare_findings(base, head)
+
+    assert result["new_findings"]["security"] == [_finding("a.py", line=2)]
+    assert result["resolved_findings"]["security"] == []
+
+
+def test_resolve_diff_lists_changes_since_merge_base(make_repo):
+    repo = make_repo(files={"app.py": "x = 1\n", "old.py": "y = 1\n"})
+    git(repo, "checkout", "-q", "-b", "feature")
+    commit(repo, {"app.py": SECRET, "new.py": "z = 1\n"})
+    git(repo, "rm", "-q", "old.py")
+    git(repo, "commit", "-q", "-m", "remove")
+
+    diff = resolve_diff(str(repo), "main", "feature")
+
+    assert diff["changed"] == {"app.py": "M", "new.py": "A", "old.py": "D"}
+    assert diff["merge_base"] == git(repo, "rev-parse", "main")
+
+
+def test_resolve_diff_includes_the_working_tree(make_repo):
+    repo = make_repo(files={"app.py": "x = 1\n"})
+    (repo / "app.py").write_text(SECRET)
+    (repo / "untracked.py").write_text("z = 1\n")
+
+    assert resolve_diff(str(repo), "main")["changed"] == {"app.py": "M", "untracked.py": "A"}
+
+
+def test_base_findings_read_the_base_version(make_repo):
+    repo = make_repo(files={"app.py": SECRET})
+    base = git(repo, "rev-parse", "HEAD")
+    commit(repo, {"app.py": "x = 1\n"})
+
+    findings = base_findings(str(repo), base, ["app.py"])
+
+    assert [(f["file"], f["issue"]) for f in findings["security"]] == [
+        ("app.py", "Hardcoded secret detected: Password Assignment")
+    ]
+
+
+def test_context_files_are_ancestors_of_changes():
+    paths = ["main.py", "svc/main.py", "svc/app/db.py", "other/main.py", "requirements.txt"]
+    assert context_files(paths, {"svc/app/db.py": "M"}) == [
+        "main.py", "requirements.txt", "svc/main.py",
+    ]
@@ -0,0 +1,21 @@
+from reposage.tools.file_context import CHUNK_BYTES, FileContext
+from reposage.tools.file_triage import LARGE_FILE_BYTES
+
+
+def test_streamed_hits_keep_byte_offsets_across_split_characters(tmp_path):
+    # a two-byte character straddles every chunk boundary
+    line = "x" * 20 + "é" + " time.sleep(1)\n"
+    lines = (LARGE_FILE_BYTES + CHUNK_BYTES) // len(line.encode()) + 1
+    pad = (b"a" * 63 + b"\n") * (CHUNK_BYTES // 64 - 1) + b"a" * 63
+    raw = pad + ("é" + line * lines).encode()
+    path = tmp_path / "big.py"
+    path.write_bytes(raw)
+
+    streamed = FileContext.open(str(tmp_path), "big.py")
+    loaded = FileContext.from_bytes("big.py", raw)
+
+    assert streamed.streamed and not loaded.streamed
+    positions = streamed.hits.positions("sync_io")
+    assert positions == loaded.hits.positions("sync_io")
+    assert len(positions) == lines
+    assert all(raw[pos:pos + len(kw)] == kw.encode() for pos, kw in positions)
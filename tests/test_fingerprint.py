@@ -0,0 +1,117 @@
+import pytest
+
+from reposage.analysis.fingerprint import dedupe_findings, fingerprint
+from reposage.tools.file_context import FileContext
+from reposage.tools.security.secret_scanner import find_secrets
+
+
+def _issue(issue, file="app/views.py", severity="High"):
+    return {"issue": issue, "severity": severity, "affected_files": [file]}
+
+
+def _secret(kind, file="app/settings.py", line=3):
+    return {"issue": f"Hardcoded secret detected: {kind}", "severity": "High",
+            "file": file, "line": line, "detector": "secret_scanner"}
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SQL injection in search endpoint", "Debug mode enabled in production"),
+    ("SQL injection in search endpoint", "Missing CSRF protection on login form"),
+    ("Debug mode enabled in production", "Missing CSRF protection on login form"),
+    ("JWT secret not validated", "Hardcoded AWS credentials"),
+    ("Admin route without authorization", "Unauthenticated debug endpoint"),
+])
+def test_distinct_issues_in_one_file_stay_separate(first, second):
+    merged = dedupe_findings([_issue(first), _issue(second)], "security")
+
+    assert [m["issue"] for m in merged] == [first, second]
+    assert [m["occurrences"] for m in merged] == [1, 1]
+
+
+def test_repeated_issue_merges_across_wording_and_path_spelling():
+    merged = dedupe_findings([
+        _issue("Hardcoded AWS credentials", "app/settings.py", "Medium"),
+        _issue("  hardcoded AWS   credentials ", "./app/settings.py", "High"),
+    ], "security")
+
+    assert len(merged) == 1
+    assert merged[0]["occurrences"] == 2
+    assert merged[0]["severity"] == "High"
+
+
+def test_detector_repeats_merge_with_their_lines_but_not_across_types():
+    merged = dedupe_findings([
+        _secret("Password Assignment", line=3),
+        _secret("Password Assignment", line=9),
+        _secret("AWS Access Key", line=4),
+    ], "security")
+
+    assert [(m["issue"], m["occurrences"], m["lines"]) for m in merged] == [
+        ("Hardcoded secret detected: Password Assignment", 2, [3, 9]),
+        ("Hardcoded secret detected: AWS Access Key", 1, [4]),
+    ]
+
+
+def test_detector_finding_folds_into_issue_of_same_file_and_secret_type():
+    issues = [
+        _issue("JWT secret not validated", "app/settings.py"),
+        _issue("AWS access key hard-coded in settings", "app/settings.py"),
+    ]
+    detected = [_secret("AWS Access Key"), _secret("JWT Secret")]
+
+    merged = dedupe_findings(issues, "security", fold=detected)
+
+    assert [(m["occurrences"], m["sources"]) for m in merged] == [
+        (1, ["llm"]),
+        (2, ["llm", "detector"]),
+    ]
+
+
+def test_detector_finding_does_not_fold_into_another_file():
+    merged = dedupe_findings(
+        [_issue("AWS access key hard-coded", "app/other.py")], "security",
+        fold=[_secret("AWS Access Key")],
+    )
+
+    assert merged[0]["occurrences"] == 1
+
+
+def test_n_plus_one_folds_only_into_an_n_plus_one_issue():
+    issues = [
+        {"issue": "Blocking file read in request handler", "affected_file": "app/db.py"},
+        {"issue": "N+1 queries when listing orders", "affected_file": "app/db.py"},
+    ]
+    detected = [{"issue": "Database query inside a loop (N+1)", "file": "app/db.py",
+                 "line_start": 10, "detector": "n_plus_one"}]
+
+    merged = dedupe_findings(issues, "performance", fold=detected)
+
+    assert [m["occurrences"] for m in merged] == [1, 2]
+
+
+def test_fingerprint_ignores_lines_but_not_files():
+    a = dict(_secret("AWS Access Key", line=3))
+    b = dict(_secret("AWS Access Key", line=30))
+    c = dict(_secret("AWS Access Key", file="app/other.py"))
+
+    assert fingerprint("security", a) == fingerprint("security", b)
+    assert fingerprint("security", a) != fingerprint("security", c)
+
+
+def test_different_snippets_at_the_same_location_do_not_merge():
+    ctx = FileContext.from_text("app/settings.py", (
+        'password = "hunter2"\n'
+        'admin_password = "swordfish"\n'
+        'password = "hunter3"\n'
+    ))
+    findings = find_secrets(ctx)
+
+    merged = dedupe_findings(findings, "security")
+
+    assert [f["snippet"] for f in findings] == [
+        'password = "<redacted>"', 'admin_password = "<redacted>"', 'password = "<redacted>"',
+    ]
+    assert [(m["snippet"], m["lines"]) for m in merged] == [
+        ('password = "<redacted>"', [1, 3]),
+        ('admin_password = "<redacted>"', [2]),
+    ]
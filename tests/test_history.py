@@ -0,0 +1,96 @@
+from reposage.history import RunStore
+from reposage.output.result import build_result
+
+REPO = "https://example.com/org/service.git"
+
+
+def _result(security=(), performance=()):
+    return build_result({
+        "scan_repository": {"repo_path": "/tmp/service", "total_files_scanned": 10,
+                            "entry_points": ["main.py"], "dependency_files": ["requirements.txt"]},
+        "analyze_architecture": {"architecture_type": "layered", "detected_design_patterns": ["MVC"]},
+        "security_analysis": {"issues": [
+            {"issue": issue, "severity": severity, "affected_files": [file]}
+            for issue, severity, file in security
+        ]},
+        "performance_analysis": {"issues": [
+            {"issue": issue, "severity": severity, "affected_file": file}
+            for issue, severity, file in performance
+        ]},
+    })
+
+
+def _record(store, created, **kwargs):
+    return store.record(_result(**kwargs), repo=REPO, commit_sha=f"c{created}", created=created)
+
+
+def test_delta_reports_new_and_resolved_findings(tmp_path):
+    with RunStore(str(tmp_path / "history.sqlite")) as store:
+        _record(store, 1, security=[
+            ("SQL injection in search endpoint", "High", "app/search.py"),
+            ("Debug mode enabled in production", "Medium", "app/settings.py"),
+        ])
+        run_id = _record(store, 2, security=[
+            ("Debug mode enabled in production", "Medium", "app/settings.py"),
+            ("Hardcoded AWS credentials", "High", "app/settings.py"),
+        ])
+
+        delta = store.delta(REPO)
+
+    assert delta["run"]["id"] == run_id
+    assert [f["issue"] for f in delta["new_findings"]] == ["Hardcoded AWS credentials"]
+    assert [f["issue"] for f in delta["resolved_findings"]] == ["SQL injection in search endpoint"]
+    assert delta["score_change"] == delta["breakdown_change"]["security"]
+
+
+def test_fixing_one_of_two_issues_in_a_file_is_a_resolved_finding(tmp_path):
+    with RunStore(str(tmp_path / "history.sqlite")) as store:
+        _record(store, 1, security=[
+            ("SQL injection in search endpoint", "High", "app/views.py"),
+            ("Debug mode enabled in production", "Medium", "app/views.py"),
+        ])
+        _record(store, 2, security=[
+            ("Debug mode enabled in production", "Medium", "app/views.py"),
+        ])
+
+        delta = store.delta(REPO)
+
+    assert [f["issue"] for f in delta["resolved_findings"]] == ["SQL injection in search endpoint"]
+    assert delta["new_findings"] == []
+
+
+def test_trend_and_regressions(tmp_path):
+    with RunStore(str(tmp_path / "history.sqlite")) as store:
+        _record(store, 100)
+        _record(store, 200, security=[("Hardcoded AWS credentials", "High", "a.py")])
+
+        trend = store.trend(REPO)
+        regressions = store.regressions(since=150)
+
+    assert [run["findings"] for run in trend] == [0, 1]
+    assert [r["repo"] for r in regressions] == [REPO]
+    assert regressions[0]["score_change"] == trend[1]["score"] - trend[0]["score"] < 0
+
+
+def test_findings_filters(tmp_path):
+    with RunStore(str(tmp_path / "history.sqlite")) as store:
+        _record(store, 1, security=[("Hardcoded AWS credentials", "High", "a.py")],
+                performance=[("Blocking synchronous I/O", "Low", "b.py")])
+
+        assert [f["file"] for f in store.findings(severity="High")] == ["a.py"]
+        assert [f["family"] for f in store.findings(file="b.py")] == ["performance"]
+        assert store.findings(repo="other") == []
+
+
+def test_scoring_inputs_count_each_issue_once(tmp_path):
+    with RunStore(str(tmp_path / "history.sqlite")) as store:
+        store.record(build_result({
+            "security_analysis": {"issues": [
+                {"issue": "Hardcoded AWS credentials", "severity": "High", "affected_files": ["a.py", "b.py"]},
+            ]},
+        }), repo=REPO, commit_sha="c1", created=1)
+
+        runs, findings = store.scoring_inputs()
+
+    assert len(runs) == 1
+    assert findings == [(0, "security", "High")]
@@ -0,0 +1,88 @@
+import threading
+
+from reposage.service.job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue
+
+
+def test_submit_deduplicates_by_commit(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job, existing = queue.submit("https://example.com/a.git", True, commit_sha="abc")
+    again, existing_again = queue.submit("https://example.com/a.git", True, commit_sha="abc")
+
+    assert not existing and existing_again
+    assert again["id"] == job["id"]
+
+    forced, existing_forced = queue.submit("https://example.com/a.git", True, commit_sha="abc", force=True)
+    assert not existing_forced and forced["id"] != job["id"]
+
+
+def test_failed_jobs_are_not_reused(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job, _ = queue.submit("/repo", False, commit_sha="abc")
+    queue.update(queue.claim(timeout=0)["id"], status=FAILED, error="boom")
+
+    retry, existing = queue.submit("/repo", False, commit_sha="abc")
+    assert not existing and retry["id"] != job["id"]
+
+
+def test_claim_takes_oldest_and_times_out(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    first, _ = queue.submit("/a", False)
+    queue.submit("/b", False)
+
+    claimed = queue.claim(timeout=0)
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == RUNNING and claimed["attempts"] == 1
+
+    queue.claim(timeout=0)
+    assert queue.claim(timeout=0.01) is None
+
+
+def test_claim_wakes_on_submit(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    claimed = []
+    worker = threading.Thread(target=lambda: claimed.append(queue.claim(timeout=5)))
+    worker.start()
+    job, _ = queue.submit("/a", False)
+    worker.join()
+
+    assert claimed[0]["id"] == job["id"]
+
+
+def test_running_jobs_are_requeued_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path)
+    job, _ = queue.submit("/a", False)
+    queue.claim(timeout=0)
+    queue.update(job["id"], stage="crew")
+    queue.close()
+
+    restarted = JobQueue(path)
+    assert restarted.get(job["id"])["status"] == QUEUED
+    assert restarted.get(job["id"])["stage"] is None
+
+
+def test_finished_jobs_get_a_finish_time(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job, _ = queue.submit("/a", False)
+    queue.claim(timeout=0)
+    queue.update(job["id"], status=SUCCEEDED)
+
+    assert queue.get(job["id"])["finished"] is not None
+    assert queue.counts() == {SUCCEEDED: 1}
+
+
+def test_jobs_interrupted_too_often_fail(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    job, _ = JobQueue(path).submit("/a", False)
+
+    for _ in range(2):
+        queue = JobQueue(path, max_attempts=2)
+        assert queue.get(job["id"])["status"] == QUEUED
+        queue.claim(timeout=0)
+        queue.close()
+
+    restarted = JobQueue(path, max_attempts=2)
+    failed = restarted.get(job["id"])
+    assert failed["status"] == FAILED
+    assert failed["error"] == "Interrupted 2 times"
+    assert restarted.claim(timeout=0) is None
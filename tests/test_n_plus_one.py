@@ -0,0 +1,87 @@
+import textwrap
+
+import pytest
+
+from reposage.tools.file_context import FileContext
+from reposage.tools.performance.n_plus_one import find_n_plus_one
+
+
+def _findings(source):
+    return find_n_plus_one(FileContext.from_text("app.py", textwrap.dedent(source)))
+
+
+@pytest.mark.parametrize("source", [
+    """
+    for user_id in ids:
+        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    """,
+    """
+    for order in orders:
+        items = db.session.query(Item).filter(Item.order_id == order.id).all()
+    """,
+    """
+    for order in orders:
+        customer = Customer.objects.get(id=order.customer_id)
+    """,
+    """
+    names = [users_collection.find_one({"_id": i})["name"] for i in ids]
+    """,
+    """
+    for user_id in ids:
+        User.query.filter_by(id=user_id).first()
+    """,
+    """
+    for row in rows:
+        self.conn.execute("UPDATE t SET x = 1 WHERE id = ?", (row,))
+    """,
+])
+def test_query_calls_in_loops_are_reported(source):
+    findings = _findings(source)
+    assert [f["issue"] for f in findings] == ["Database query inside a loop (N+1)"]
+
+
+def test_nested_loops_are_high_severity():
+    findings = _findings("""
+    for a in accounts:
+        for u in a.users:
+            cursor.execute("SELECT 1 WHERE id = ?", (u,))
+    """)
+    assert [(f["severity"], f["line_start"], f["line_end"]) for f in findings] == [("High", 3, 4)]
+
+
+@pytest.mark.parametrize("source", [
+    # str.find
+    """
+    cursor.execute("SELECT 1")
+    for line in lines:
+        if line.find("x") >= 0:
+            print(line)
+    """,
+    # pandas
+    """
+    rows = cursor.execute("SELECT * FROM t").fetchall()
+    for name in names:
+        subset = df.query(f"name == '{name}'").filter(items=["a"])
+    """,
+    # filter on arbitrary objects
+    """
+    cursor.execute("SELECT 1")
+    for group in groups:
+        visible = group.filter(lambda x: x.visible)
+        text = pattern.raw(group)
+    """,
+    # query before the loop
+    """
+    users = db.session.query(User).all()
+    for user in users:
+        print(user.name)
+    """,
+    # a query inside a function defined in a loop runs when called
+    """
+    for name in names:
+        def load():
+            return cursor.execute("SELECT 1")
+    """,
+])
+def test_non_query_calls_are_not_reported(source):
+    assert _findings(source) == []
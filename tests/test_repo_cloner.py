@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from conftest import commit, git
+from reposage.tools import repo_cloner
+from reposage.tools.repo_cloner import clone_repository, fetch_commit, resolve_commit
+
+
+@pytest.fixture(autouse=True)
+def no_checkouts(monkeypatch):
+    monkeypatch.setattr(repo_cloner, "_checkouts", {})
+
+
+@pytest.fixture
+def remote(make_repo, tmp_path):
+    """A bare repository served over file:// and the work repo that feeds it."""
+    work = make_repo("work", {"app.py": "v1\n"})
+    bare = tmp_path / "remote.git"
+    git(tmp_path, "clone", "-q", "--bare", str(work), str(bare))
+    git(work, "remote", "add", "origin", str(bare))
+    return work, f"file://{bare}"
+
+
+def test_clone_checks_out_default_branch(remote, tmp_path):
+    _, url = remote
+    path = clone_repository(url, str(tmp_path / "cache"))
+    assert open(f"{path}/app.py").read() == "v1\n"
+
+
+def test_repeat_clone_fetches_new_commits(remote, tmp_path):
+    work, url = remote
+    clone_repository(url, str(tmp_path / "cache"))
+
+    commit(work, {"app.py": "v2\n"})
+    git(work, "push", "-q", "origin", "main")
+    path = clone_repository(url, str(tmp_path / "cache"))
+
+    assert open(f"{path}/app.py").read() == "v2\n"
+    assert len(list((tmp_path / "cache" / "mirrors").iterdir())) == 1
+
+
+def test_clone_and_fetch_by_sha(remote, tmp_path):
+    work, url = remote
+    first = git(work, "rev-parse", "HEAD")
+    second = commit(work, {"app.py": "v2\n"})
+    git(work, "push", "-q", "origin", "main")
+
+    path = clone_repository(url, str(tmp_path / "cache"), ref=first)
+    assert open(f"{path}/app.py").read() == "v1\n"
+    assert git(path, "rev-parse", "HEAD") == first
+
+    assert fetch_commit(url, second, str(tmp_path / "cache")) == second
+
+
+def test_least_recently_used_repo_is_evicted(make_repo, tmp_path):
+    cache = tmp_path / "cache"
+    urls = []
+    for name in ("old", "new"):
+        work = make_repo(name)
+        bare = tmp_path / f"{name}.git"
+        git(tmp_path, "clone", "-q", "--bare", str(work), str(bare))
+        urls.append(f"file://{bare}")
+
+    clone_repository(urls[0], str(cache))
+    repo_cloner.release_checkout(urls[0])
+    clone_repository(urls[1], str(cache), max_cache_bytes=1)
+
+    index = json.loads((cache / "cache_index.json").read_text())
+    assert [entry["url"] for entry in index.values()] == [urls[1]]
+    assert not (cache / "mirrors" / f"{repo_cloner._cache_key(urls[0])}.git").exists()
+
+
+def test_checked_out_repos_are_not_evicted(make_repo, tmp_path):
+    cache = tmp_path / "cache"
+    urls = []
+    for name in ("busy", "new"):
+        work = make_repo(name)
+        bare = tmp_path / f"{name}.git"
+        git(tmp_path, "clone", "-q", "--bare", str(work), str(bare))
+        urls.append(f"file://{bare}")
+
+    busy = clone_repository(urls[0], str(cache))
+    clone_repository(urls[1], str(cache), max_cache_bytes=1)
+
+    index = json.loads((cache / "cache_index.json").read_text())
+    assert sorted(entry["url"] for entry in index.values()) == sorted(urls)
+    assert open(f"{busy}/README.md").read() == "hello\n"
+
+
+def test_resolve_commit_errors(remote, tmp_path):
+    work, url = remote
+
+    assert resolve_commit(url, "main") == git(work, "rev-parse", "HEAD")
+    with pytest.raises(ValueError):
+        resolve_commit(url, "no-such-branch")
+    with pytest.raises(RuntimeError):
+        resolve_commit(f"file://{tmp_path}/missing.git", timeout=5)
+
+
+def test_cache_key_only_strips_a_git_suffix():
+    assert repo_cloner._cache_key("https://example.com/org/foo.github.io").startswith("foo.github.io-")
+    assert repo_cloner._cache_key("https://example.com/org/foo.git").startswith("foo-")
@@ -0,0 +1,33 @@
+from reposage.health.risky_files import risk_aggregator
+from reposage.tools.file_scanner import estimate_lines, scan_repo_path
+from reposage.tools.file_triage import BINARY, GENERATED, TEXT
+
+
+def test_scan_counts_lines_of_small_files(tmp_path):
+    (tmp_path / "five.py").write_text("a = 1\n" * 4 + "b = 2")
+    (tmp_path / "long_lines.py").write_text(("x" * 200 + "\n") * 3)
+
+    scan = scan_repo_path(str(tmp_path))
+
+    assert scan["file_lines"] == {"five.py": 5, "long_lines.py": 3}
+
+
+def test_large_files_are_extrapolated_from_their_head():
+    head = b"0123456789\n" * 100
+
+    assert estimate_lines(TEXT, len(head) * 10, head) == 1000
+    assert estimate_lines(GENERATED, 4000, b"") == 100
+    assert estimate_lines(BINARY, 4000, b"\n" * 4000) == 0
+
+
+def test_risky_files_rank_by_density_of_estimated_lines():
+    security = {"issues": [
+        {"issue": "a", "severity": "High", "affected_files": ["big.py"]},
+        {"issue": "b", "severity": "High", "affected_files": ["small.py"]},
+    ]}
+
+    aggregator = risk_aggregator(security, {}, {}, {"big.py": 2000, "small.py": 20})
+    top = aggregator.top_files(2)
+
+    assert [f["file"] for f in top] == ["small.py", "big.py"]
+    assert [f["estimated_lines"] for f in top] == [20, 2000]
@@ -0,0 +1,97 @@
+import os
+
+from reposage import sharding
+from reposage.output.result import build_result
+from reposage.sharding import ROOT_SHARD, analyze_shards, find_shards, reroot_outputs
+from reposage.tools.git_index import IndexEntry
+
+SECRET = 'password = "hunter2"\n'
+
+
+def _entries(paths):
+    return [IndexEntry(p, 10, None) for p in paths]
+
+
+def test_find_shards_splits_at_outermost_manifests():
+    paths = [f"svc/api/m{i}.py" for i in range(5)] + ["svc/api/requirements.txt"]
+    paths += [f"svc/api/pkg/sub{i}.py" for i in range(2)] + ["svc/api/pkg/setup.py"]
+    paths += [f"web/src/{i}.js" for i in range(5)] + ["web/package.json"]
+    paths += ["tiny/go.mod", "tiny/main.go", "README.md"]
+
+    shards = {s["name"]: s for s in find_shards(_entries(paths))}
+
+    assert sorted(shards) == [ROOT_SHARD, "svc/api", "web"]
+    assert "svc/api/pkg/sub0.py" in shards["svc/api"]["files"]
+    assert shards[ROOT_SHARD]["files"] == ["README.md", "tiny/go.mod", "tiny/main.go"]
+
+
+def test_reroot_outputs_makes_crew_paths_repository_relative():
+    outputs = {
+        "security_analysis": {"issues": [
+            {"issue": "a", "affected_files": ["app/db.py", "svc/app/x.py", "/repo/svc/y.py"]},
+        ]},
+        "performance_analysis": {"issues": [{"issue": "b", "affected_file": "./app/db.py"}]},
+        "scan_repository": {"file_summaries": {"app/db.py": "db layer"}},
+    }
+
+    rerooted = reroot_outputs(outputs, "svc", "/repo")
+
+    assert rerooted["security_analysis"]["issues"][0]["affected_files"] == [
+        os.path.join("svc", "app", "db.py"), os.path.join("svc", "app", "x.py"), os.path.join("svc", "y.py"),
+    ]
+    assert rerooted["performance_analysis"]["issues"][0]["affected_file"] == os.path.join("svc", "app", "db.py")
+    assert list(rerooted["scan_repository"]["file_summaries"]) == [os.path.join("svc", "app", "db.py")]
+
+
+def _monorepo(tmp_path):
+    for name in ("api", "web"):
+        root = tmp_path / name
+        (root / "app").mkdir(parents=True)
+        (root / "requirements.txt").write_text("flask\n")
+        for i in range(5):
+            (root / "app" / f"m{i}.py").write_text(f"x = {i}\n")
+    (tmp_path / "api" / "app" / "db.py").write_text(SECRET * 20)
+    return tmp_path
+
+
+def test_crew_paths_match_detector_paths_after_merge(tmp_path, monkeypatch):
+    repo = _monorepo(tmp_path)
+
+    def run_crew(prepared, **kwargs):
+        shard_path = prepared["inputs"]["repo"]
+        issues = []
+        if shard_path.endswith("api"):
+            # the crew reports paths relative to the shard it scanned
+            issues = [{"issue": "Hardcoded password in the db module", "severity": "High",
+                       "affected_files": ["app/db.py"], "recommended_fix": "env"}]
+        return {
+            "scan_repository": dict(prepared["scan"], repo_path=shard_path),
+            "security_analysis": {"issues": issues},
+            "performance_analysis": {"issues": []},
+            "detector_findings": {
+                "security": prepared["prepass"]["security"],
+                "performance": prepared["prepass"]["performance"],
+            },
+        }
+
+    monkeypatch.setattr(sharding, "run_crew", run_crew)
+    merged = analyze_shards(path=str(repo), cache_dir=None, workers=1)
+    result = build_result(merged["outputs"], shards=merged["shards"])
+
+    db = os.path.join("api", "app", "db.py")
+    assert [i["affected_files"] for i in result.security_issues] == [[db]]
+    assert [f["file"] for f in result.risky_files] == [db]
+    assert result.risky_files[0]["security_issues"] == 1
+    assert result.risky_files[0]["estimated_lines"] > 0
+
+
+def test_detector_only_shards_keep_their_paths(tmp_path):
+    repo = _monorepo(tmp_path)
+
+    merged = analyze_shards(path=str(repo), cache_dir=None, workers=1, no_llm=True)
+    result = build_result(merged["outputs"], shards=merged["shards"])
+
+    assert {f for i in result.security_issues for f in i["affected_files"]} == {
+        os.path.join("api", "app", "db.py")
+    }
+    assert sorted(s["name"] for s in merged["shards"]) == ["api", "web"]